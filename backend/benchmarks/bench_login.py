@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+로그인 폭주 벤치마크 (동시 로그인 처리량 및 이벤트 루프 지연 측정)
+실행: python benchmarks/bench_login.py [동시요청수] [총요청수]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# 임시 DB 사용 (main 임포트 전에 설정)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+from main import app, init_database, verified_logins  # noqa: E402
+
+CREDENTIALS = {"username": "fjrzl7979", "password": "79797979"}
+
+
+async def measure_loop_lag(stop, samples, interval=0.01):
+    """이벤트 루프가 예정 시각보다 얼마나 늦게 깨어나는지 기록"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def storm(concurrency, total, use_cache):
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                if not use_cache:
+                    verified_logins.invalidate()
+                response = await client.post("/api/auth/login", json=CREDENTIALS)
+                statuses.append(response.status_code)
+
+        stop = asyncio.Event()
+        lag = []
+        lag_task = asyncio.create_task(measure_loop_lag(stop, lag))
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await lag_task
+
+    lag.sort()
+    label = "캐시 사용" if use_cache else "캐시 미사용"
+    print(f"[{label}] {total}건 / 동시 {concurrency}: {total / elapsed:,.1f} 로그인/초, "
+          f"실패 {sum(1 for s in statuses if s != 200)}건")
+    if lag:
+        print(f"  루프 지연 p50={lag[len(lag) // 2] * 1000:.1f}ms "
+              f"p99={lag[int(len(lag) * 0.99)] * 1000:.1f}ms max={lag[-1] * 1000:.1f}ms")
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    init_database()
+    asyncio.run(storm(concurrency, total, use_cache=False))
+    asyncio.run(storm(concurrency, total, use_cache=True))
+
+
+if __name__ == "__main__":
+    main()
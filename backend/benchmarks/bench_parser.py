@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SMS 파서 마이크로벤치마크
+실행: python benchmarks/bench_parser.py [반복횟수]
+"""
+
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import BANK_NAMES, SMSParser  # noqa: E402
+
+# 실제 규격 메시지 샘플 (setup-guide의 expected_format 기준)
+CORPUS = [
+    "[Web발신]\n농협 출금700,000원\n06/27 13:00 302-****-5080-61 신주일 잔액307,006원",
+    "[Web발신]\n농협 입금1,250,000원\n06/27 13:05 302-****-5080-61 김철수 잔액1,557,006원",
+    "[Web발신]\n신한 입금50,000원\n06/27 14:12 110-***-123456 홍길동 잔액2,050,000원",
+    "[Web발신]\n국민 출금32,000원\n06/28 09:01 123-45-****-678 이영희 잔액818,000원",
+    "[Web발신]\n카카오뱅크 입금3,000,000원\n06/28 10:30 333-**-**1234 PARK JIMIN 잔액3,120,500원",
+    "[Web발신]\n토스뱅크 입금 15,000원 잔액 215,000원",
+    "[Web발신]\n우리은행 인증번호[123456]",
+]
+
+
+def legacy_parse(message):
+    """기존 파서 (비교 기준)"""
+    result = {"transaction_type": None, "bank_name": None, "amount": 0.0, "balance": 0.0,
+              "sender_name": None, "account_number": None}
+    for bank in BANK_NAMES:
+        if bank in message:
+            result["bank_name"] = bank
+            break
+    if "입금" in message:
+        result["transaction_type"] = "deposit"
+    elif "출금" in message:
+        result["transaction_type"] = "withdrawal"
+    amount_match = re.search(r"([입출금]\s*)([\d,]+)원", message)
+    if amount_match:
+        result["amount"] = float(amount_match.group(2).replace(",", ""))
+    balance_match = re.search(r"잔액\s*([\d,]+)원", message)
+    if balance_match:
+        result["balance"] = float(balance_match.group(1).replace(",", ""))
+    name_match = re.search(r"[\d*-]+\s+([가-힣A-Za-z\s]+)\s+잔액", message)
+    if name_match:
+        result["sender_name"] = name_match.group(1).strip()
+    account_match = re.search(r"(\d{2,3}-[\d*-]+)", message)
+    if account_match:
+        result["account_number"] = account_match.group(1)
+    return result
+
+
+def check_equivalence():
+    """새 파서와 기존 파서의 결과 비교"""
+    for message in CORPUS:
+        parsed = SMSParser.parse_message(message)
+        expected = legacy_parse(message)
+        actual = {key: getattr(parsed, key) for key in expected}
+        if parsed.balance is None and expected["balance"] == 0.0:
+            expected["balance"] = None  # 잔액이 없는 문자는 0 대신 None으로 저장
+        if actual != expected:
+            raise AssertionError(f"결과 불일치: {message!r}\n기존: {expected}\n신규: {actual}")
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    check_equivalence()
+
+    for name, func in (("legacy", legacy_parse), ("SMSParser", SMSParser.parse_message)):
+        elapsed = min(timeit.repeat(lambda: [func(m) for m in CORPUS], number=number, repeat=3))
+        per_message = elapsed / (number * len(CORPUS)) * 1e6
+        print(f"{name:>10}: {per_message:.2f} us/message ({number * len(CORPUS)} messages)")
+
+
+if __name__ == "__main__":
+    main()
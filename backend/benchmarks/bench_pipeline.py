@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+웹훅 → 저장 → WebSocket 브로드캐스트 파이프라인 부하 테스트
+기본은 임시 DB로 앱을 같은 프로세스의 uvicorn(127.0.0.1 임의 포트)에 띄워 실행하고,
+--url 지정 시 이미 실행 중인 서버를 대상으로 함 (외부 네트워크 불필요)
+실행: python benchmarks/bench_pipeline.py [--messages 2000] [--concurrency 20] [--admin-clients 5]
+결과는 benchmarks/results/pipeline_<커밋>_<시각>.json에 저장 (git에서 제외, --compare 이전결과.json으로 비교)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+# SMSParser가 처리하는 형식 (표준 템플릿 + 계좌/이름 없는 짧은 형식)
+BANKS = ("농협", "신한", "국민", "우리", "하나", "기업", "카카오뱅크", "토스뱅크")
+NAMES = ("신주일", "김철수", "홍길동", "이영희", "PARK JIMIN")
+STANDARD_FORMAT = "[Web발신]\n{bank} {kind}{amount:,}원\n{stamp} {account} {name} 잔액{balance:,}원"
+SHORT_FORMAT = "[Web발신]\n{bank} {kind} {amount:,}원 잔액 {balance:,}원"
+
+# 결과 비교 시 표시할 지표 (이름, 높을수록 좋은지)
+COMPARE_METRICS = (
+    ("throughput_per_sec", True),
+    ("ingest_latency_ms.p50", False),
+    ("ingest_latency_ms.p99", False),
+    ("broadcast_latency_ms.admin.p50", False),
+    ("broadcast_latency_ms.admin.p99", False),
+    ("broadcast_latency_ms.company.p99", False),
+    ("db_size_bytes", False),
+)
+
+
+def synthetic_message(rng, sequence):
+    """합성 은행 문자 (sequence로 금액을 달리해 중복 수신 판정을 피함)"""
+    values = {
+        "bank": rng.choice(BANKS),
+        "kind": rng.choice(("입금", "입금", "출금")),
+        "amount": 1000 * rng.randint(1, 5000) + sequence % 1000,
+        "balance": rng.randint(0, 50_000_000),
+        "stamp": f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}",
+        "account": f"{rng.randint(100, 999)}-****-{rng.randint(1000, 9999)}-{rng.randint(10, 99)}",
+        "name": rng.choice(NAMES),
+    }
+    template = SHORT_FORMAT if rng.random() < 0.1 else STANDARD_FORMAT
+    return template.format(**values)
+
+
+def percentiles(samples):
+    """밀리초 단위 p50/p95/p99/max"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 3)
+
+    return {"count": len(ordered), "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99),
+            "max": round(ordered[-1] * 1000, 3)}
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Subscriber:
+    """WebSocket 구독 클라이언트 (거래 ID별 첫 수신 시각 기록, ping에는 pong 응답)"""
+
+    def __init__(self, kind, url):
+        self.kind = kind
+        self.url = url
+        self.arrivals = {}
+        self.ready = asyncio.Event()
+        self.closed_reason = None
+
+    async def run(self):
+        import websockets
+
+        try:
+            async with websockets.connect(self.url, max_queue=None) as ws:
+                async for raw in ws:
+                    received = time.perf_counter()
+                    message = json.loads(raw)
+                    kind = message.get("type")
+                    if kind == "ping":
+                        await ws.send(json.dumps({"type": "pong"}))
+                    elif kind == "snapshot":
+                        self.ready.set()
+                    elif kind == "new_transaction":
+                        self.arrivals.setdefault(message["data"]["id"], received)
+                    elif kind == "new_transactions":
+                        for item in message["data"]:
+                            self.arrivals.setdefault(item["id"], received)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.closed_reason = repr(e)
+        finally:
+            self.ready.set()
+
+
+async def run_benchmark(args, base_url, db_path):
+    import httpx
+
+    ws_base = "ws" + base_url[len("http"):]
+    rng = random.Random(args.seed)
+    run_id = f"{int(time.time())}{rng.randint(0, 9999)}"
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        response = await client.post("/api/auth/login", json={"username": args.username, "password": args.password})
+        response.raise_for_status()
+        admin_token = response.json()["access_token"]
+        admin_headers = {"Authorization": f"Bearer {admin_token}"}
+
+        # 업체 생성 및 업체 계정 로그인
+        companies = []
+        for index in range(args.companies):
+            login_id = f"bench{run_id}_{index}"
+            response = await client.post("/api/admin/companies", headers=admin_headers, json={
+                "company_name": f"벤치 {index}", "login_id": login_id, "password": "bench-password",
+                "bank_name": "농협", "account_number": "000-0000", "account_holder": "벤치마크",
+                "fee_rate": 0.03
+            })
+            response.raise_for_status()
+            created = response.json()
+            response = await client.post("/api/auth/login", json={"username": login_id, "password": "bench-password"})
+            response.raise_for_status()
+            companies.append({**created, "token": response.json()["access_token"]})
+
+        # 기존 데이터량 재현 (측정 전 배치 웹훅으로 적재)
+        sequence = 0
+        for start in range(0, args.preload_rows, 500):
+            items = []
+            for _ in range(min(500, args.preload_rows - start)):
+                sequence += 1
+                items.append({"date": f"preload-{run_id}-{sequence}", "message": synthetic_message(rng, sequence)})
+            company = companies[start // 500 % len(companies)]
+            response = await client.post(f"/api/webhook/{company['api_key']}/batch", json=items)
+            response.raise_for_status()
+
+        # 구독자 연결
+        subscribers = [Subscriber("admin", f"{ws_base}/ws/admin?token={admin_token}")
+                       for _ in range(args.admin_clients)]
+        for company in companies:
+            subscribers += [
+                Subscriber(f"company:{company['id']}",
+                           f"{ws_base}/ws/company/{company['id']}?token={company['token']}")
+                for _ in range(args.company_clients)
+            ]
+        tasks = [asyncio.create_task(subscriber.run()) for subscriber in subscribers]
+        await asyncio.wait_for(asyncio.gather(*(s.ready.wait() for s in subscribers)), timeout=30)
+
+        # 부하 발생
+        semaphore = asyncio.Semaphore(args.concurrency)
+        ingest_latency = []
+        sent_at = {}
+        owner = {}
+        statuses = {}
+
+        async def send(request_index):
+            nonlocal sequence
+            company = companies[request_index % len(companies)]
+            items = []
+            for _ in range(args.batch_size):
+                sequence += 1
+                items.append({"date": f"bench-{run_id}-{sequence}", "message": synthetic_message(rng, sequence)})
+
+            async with semaphore:
+                started = time.perf_counter()
+                if args.batch_size == 1:
+                    response = await client.post(f"/api/webhook/{company['api_key']}", json=items[0])
+                else:
+                    response = await client.post(f"/api/webhook/{company['api_key']}/batch", json=items)
+                ingest_latency.append(time.perf_counter() - started)
+
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code != 200:
+                return
+            body = response.json()
+            results = body.get("results", [body])
+            for result in results:
+                if result.get("status") == "success" and result.get("transaction_id"):
+                    sent_at[result["transaction_id"]] = started
+                    owner[result["transaction_id"]] = company["id"]
+
+        requests_total = max(1, args.messages // args.batch_size)
+        started = time.perf_counter()
+        await asyncio.gather(*(send(index) for index in range(requests_total)))
+        elapsed = time.perf_counter() - started
+
+        # 브로드캐스트가 모두 도착할 때까지 대기 (최대 drain_timeout초)
+        def expected_for(subscriber):
+            if subscriber.kind == "admin":
+                return set(sent_at)
+            company_id = int(subscriber.kind.split(":")[1])
+            return {tid for tid, cid in owner.items() if cid == company_id}
+
+        deadline = time.perf_counter() + args.drain_timeout
+        while time.perf_counter() < deadline:
+            if all(expected_for(s) <= s.arrivals.keys() or s.closed_reason for s in subscribers):
+                break
+            await asyncio.sleep(0.05)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    broadcast = {"admin": [], "company": []}
+    expected_total = delivered_total = 0
+    for subscriber in subscribers:
+        group = "admin" if subscriber.kind == "admin" else "company"
+        expected = expected_for(subscriber)
+        expected_total += len(expected)
+        for transaction_id in expected:
+            arrived = subscriber.arrivals.get(transaction_id)
+            if arrived is not None:
+                delivered_total += 1
+                broadcast[group].append(arrived - sent_at[transaction_id])
+
+    db_size = None
+    if db_path:
+        db_size = sum(os.path.getsize(path) for path in (db_path, db_path + "-wal") if os.path.exists(path))
+
+    return {
+        "messages": len(sent_at),
+        "requests": requests_total,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "elapsed_sec": round(elapsed, 3),
+        "throughput_per_sec": round(len(sent_at) / elapsed, 1) if elapsed else None,
+        "ingest_latency_ms": percentiles(ingest_latency),
+        "broadcast_latency_ms": {group: percentiles(samples) for group, samples in broadcast.items()},
+        "broadcast_delivery_ratio": round(delivered_total / expected_total, 4) if expected_total else None,
+        "subscriber_errors": [s.closed_reason for s in subscribers if s.closed_reason],
+        "db_size_bytes": db_size,
+    }
+
+
+async def run_in_process(args):
+    """임시 DB로 앱을 같은 이벤트 루프의 uvicorn에서 실행"""
+    import uvicorn
+
+    from main import SMSParser, app
+
+    rng = random.Random(args.seed)
+    for sequence in range(200):
+        message = synthetic_message(rng, sequence)
+        if not SMSParser.parse_message(message).parsed:
+            raise AssertionError(f"합성 메시지 파싱 실패: {message!r}")
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        if serve_task.done():
+            serve_task.result()
+        await asyncio.sleep(0.05)
+    try:
+        return await run_benchmark(args, f"http://127.0.0.1:{port}", args.db_path)
+    finally:
+        server.should_exit = True
+        await serve_task
+
+
+def lookup(results, dotted):
+    value = results
+    for key in dotted.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def compare(previous, current):
+    """이전 결과 대비 주요 지표 변화 출력"""
+    print(f"\n비교 기준: {previous.get('commit')} ({previous.get('timestamp')})")
+    for metric, higher_is_better in COMPARE_METRICS:
+        before, after = lookup(previous["results"], metric), lookup(current["results"], metric)
+        if not before or after is None:
+            continue
+        change = (after - before) / before * 100
+        worse = change < 0 if higher_is_better else change > 0
+        marker = " ← 악화" if worse and abs(change) >= 10 else ""
+        print(f"  {metric:<36} {before:>12} → {after:>12} ({change:+.1f}%){marker}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="웹훅 → 브로드캐스트 파이프라인 부하 테스트")
+    parser.add_argument("--url", help="실행 중인 서버 주소 (예: http://127.0.0.1:8000, 기본: 프로세스 내 실행)")
+    parser.add_argument("--username", default="fjrzl7979")
+    parser.add_argument("--password", default="79797979")
+    parser.add_argument("--messages", type=int, default=2000, help="측정 구간 전송 건수")
+    parser.add_argument("--batch-size", type=int, default=1, help="1이면 단건 웹훅, 그 이상이면 배치 웹훅")
+    parser.add_argument("--concurrency", type=int, default=20, help="동시 요청 수")
+    parser.add_argument("--companies", type=int, default=4)
+    parser.add_argument("--admin-clients", type=int, default=5, help="/ws/admin 구독자 수")
+    parser.add_argument("--company-clients", type=int, default=1, help="업체별 /ws/company/{id} 구독자 수")
+    parser.add_argument("--preload-rows", type=int, default=0, help="측정 전 적재할 거래 수")
+    parser.add_argument("--drain-timeout", type=float, default=10.0, help="브로드캐스트 수신 대기 시간(초)")
+    parser.add_argument("--db-path", help="DB 크기를 잴 SQLite 파일 (--url 사용 시)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="결과 JSON 경로 (기본: benchmarks/results/, git에서 제외)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    args = parser.parse_args()
+
+    if not args.url:
+        # 임시 DB, 구독자 수만큼 채널 상한 확장 (main 임포트 전에 설정)
+        workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+        args.db_path = os.path.join(workdir, "bench.db")
+        os.environ["DATABASE_URL"] = "sqlite:///" + args.db_path
+        os.environ["ARCHIVE_DIR"] = os.path.join(workdir, "archive")
+        os.environ.setdefault("WS_MAX_CONNECTIONS_PER_CHANNEL", str(max(50, args.admin_clients, args.company_clients)))
+        # 파이프라인 자체를 재기 위해 수신 제한은 끔 (제한 동작을 재려면 환경 변수로 지정)
+        for name in ("WEBHOOK_RATE_PER_KEY", "WEBHOOK_RATE_PER_IP", "WEBHOOK_MAX_IN_FLIGHT"):
+            os.environ.setdefault(name, "0")
+        sys.path.insert(0, BACKEND_DIR)
+        results = asyncio.run(run_in_process(args))
+    else:
+        results = asyncio.run(run_benchmark(args, args.url.rstrip("/"), args.db_path))
+
+    commit = current_commit()
+    timestamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+    report = {
+        "benchmark": "pipeline",
+        "commit": commit,
+        "timestamp": timestamp,
+        "params": {key: value for key, value in vars(args).items() if key not in ("password", "output", "compare")},
+        "results": results,
+    }
+
+    output = args.output or os.path.join(BENCH_DIR, "results", f"pipeline_{commit or 'unknown'}_{timestamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    print(f"\n결과 저장: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
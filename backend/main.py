@@ -7,26 +7,40 @@ Pay System v4.0 - Enterprise Settlement Backend
 
 import os
 import asyncio
+import bisect
 import logging
+import math
+import queue
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, AsyncIterator
 import secrets
 import hashlib
+import hmac
 
-from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect, Header
+from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import HTMLResponse, JSONResponse
-from pydantic import BaseModel, EmailStr
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, PlainTextResponse
+from starlette.websockets import WebSocketState
+from pydantic import BaseModel, EmailStr, Field
 import uvicorn
 
 # Database
 import sqlite3
 from contextlib import contextmanager
+from collections import OrderedDict, deque
 import json
+import csv
+import gzip
+import io
+from dataclasses import dataclass
 
 # JWT
 import jwt
+from passlib.context import CryptContext
 from datetime import timedelta
 
 # SMS Parser
@@ -42,7 +56,43 @@ logger = logging.getLogger(__name__)
 # 환경 변수
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./settlement.db")
 JWT_SECRET = os.getenv("JWT_SECRET", "your-super-secret-key-change-in-production")
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_VERIFY_CACHE_TTL = float(os.getenv("PASSWORD_VERIFY_CACHE_TTL", "300"))
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000,https://your-frontend.vercel.app").split(",")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "20000"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+COMPANY_CACHE_SIZE = int(os.getenv("COMPANY_CACHE_SIZE", "1024"))
+COMPANY_CACHE_TTL = float(os.getenv("COMPANY_CACHE_TTL", "300"))  # 무효화 없이 DB를 직접 수정한 경우의 최대 지연(초)
+DEDUP_CACHE_SIZE = int(os.getenv("DEDUP_CACHE_SIZE", "10000"))
+DEDUP_CACHE_TTL = float(os.getenv("DEDUP_CACHE_TTL", "3600"))
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "coalesce")  # coalesce | drop_oldest | disconnect
+WS_HEARTBEAT_INTERVAL = float(os.getenv("WS_HEARTBEAT_INTERVAL", "25"))
+WS_HEARTBEAT_TIMEOUT = float(os.getenv("WS_HEARTBEAT_TIMEOUT", "60"))
+WS_MAX_CONNECTIONS_PER_CHANNEL = int(os.getenv("WS_MAX_CONNECTIONS_PER_CHANNEL", "50"))
+WS_REPLAY_BUFFER_SIZE = int(os.getenv("WS_REPLAY_BUFFER_SIZE", "256"))
+BROADCAST_BACKEND = os.getenv("BROADCAST_BACKEND", "memory")  # memory | sqlite (다중 워커)
+BROADCAST_POLL_INTERVAL = float(os.getenv("BROADCAST_POLL_INTERVAL", "0.1"))
+INGEST_MODE = os.getenv("INGEST_MODE", "sync")  # sync | queue (대기열 저장 후 202 응답)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "100"))
+INGEST_POLL_INTERVAL = float(os.getenv("INGEST_POLL_INTERVAL", "0.5"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+RAW_MESSAGE_RETENTION_DAYS = int(os.getenv("RAW_MESSAGE_RETENTION_DAYS", "90"))
+ARCHIVE_CACHE_MEMBERS = int(os.getenv("ARCHIVE_CACHE_MEMBERS", "8"))  # 캐시할 보관 파일 멤버(최대 archive-raw 묶음 크기) 수
+WEBHOOK_RATE_PER_KEY = float(os.getenv("WEBHOOK_RATE_PER_KEY", "20"))  # 초당 요청 수, 0이면 제한 없음
+WEBHOOK_BURST_PER_KEY = float(os.getenv("WEBHOOK_BURST_PER_KEY", "100"))
+WEBHOOK_RATE_PER_IP = float(os.getenv("WEBHOOK_RATE_PER_IP", "50"))
+WEBHOOK_BURST_PER_IP = float(os.getenv("WEBHOOK_BURST_PER_IP", "200"))
+WEBHOOK_MAX_IN_FLIGHT = int(os.getenv("WEBHOOK_MAX_IN_FLIGHT", "64"))  # 0이면 제한 없음
+WEBHOOK_MAX_BATCH_SIZE = int(os.getenv("WEBHOOK_MAX_BATCH_SIZE", "500"))
+RATE_LIMIT_IDLE_SECONDS = float(os.getenv("RATE_LIMIT_IDLE_SECONDS", "300"))
+BALANCE_CHAIN_WARM_DAYS = int(os.getenv("BALANCE_CHAIN_WARM_DAYS", "31"))  # BROADCAST_BACKEND=memory에서만 사용
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "false").lower() == "true"  # 프록시 뒤에서 X-Forwarded-For 사용
 
 # FastAPI 앱 초기화
 app = FastAPI(
@@ -66,12 +116,9 @@ app.add_middleware(
 class SMSWebhookData(BaseModel):
     """문자자동전달앱에서 오는 데이터 모델 (공식 규격)"""
     date: str
-    from_: str = None  # 'from'은 예약어라 from_으로 받음
-    to: str = None
+    from_: Optional[str] = Field(None, alias="from")  # 'from'은 예약어라 from_으로 받음
+    to: Optional[str] = None
     message: str
-    
-    class Config:
-        fields = {'from_': 'from'}
 
 class CompanyCreate(BaseModel):
     company_name: str
@@ -86,222 +133,3259 @@ class LoginRequest(BaseModel):
     username: str
     password: str
 
+class ParseTemplateCreate(BaseModel):
+    shape_signature: str
+    pattern: str  # type, amount 그룹 필수 (balance, account, name 선택)
+    bank_name: Optional[str] = None  # 메시지에서 은행명을 찾지 못할 때 사용
+
 class TransactionResponse(BaseModel):
     id: int
     transaction_type: str
     bank_name: str
     sender_name: str
-    amount: float
-    balance: Optional[float]
-    fee_amount: float
+    amount: int
+    balance: Optional[int]
+    fee_amount: int
     created_at: str
     is_rolling: bool = False
 
-# 데이터베이스 초기화
-def init_database():
-    """데이터베이스 초기화"""
-    conn = sqlite3.connect("settlement.db")
-    cursor = conn.cursor()
-    
-    # 업체 테이블
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS companies (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            company_name TEXT NOT NULL,
-            login_id TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            api_key TEXT UNIQUE NOT NULL,
-            bank_name TEXT NOT NULL,
-            account_number TEXT NOT NULL,
-            account_holder TEXT NOT NULL,
-            fee_rate REAL DEFAULT 0.03,
-            is_active BOOLEAN DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # 거래 테이블
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            company_id INTEGER NOT NULL,
-            transaction_type TEXT NOT NULL,
-            bank_name TEXT NOT NULL,
-            sender_name TEXT,
-            account_number TEXT,
-            amount DECIMAL(15,2) NOT NULL,
-            balance DECIMAL(15,2),
-            fee_amount DECIMAL(15,2) DEFAULT 0,
-            raw_message TEXT NOT NULL,
-            is_rolling BOOLEAN DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (company_id) REFERENCES companies(id)
-        )
-    """)
-    
-    # 관리자 테이블
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS admins (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            is_active BOOLEAN DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+# 메트릭 (Prometheus 텍스트 형식, /metrics)
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+    
+    def __init__(self, histogram: "Histogram", labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+class Metric:
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        metrics_registry.append(self)
+    
+    def _labels(self, values: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{str(value).replace(chr(34), "")}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+    
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+    
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(f"{line}\n" for line in self.samples())
+
+class Counter(Metric):
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[tuple, float] = {}
+    
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+    
+    def samples(self) -> List[str]:
+        return [f"{self.name}{self._labels(labels)} {value}" for labels, value in self.values.items()]
+
+class Gauge(Metric):
+    """수집 시점에 collect()로 값을 계산하는 게이지"""
+    kind = "gauge"
+    
+    def __init__(self, name: str, documentation: str, labelnames: tuple,
+                 collect: Callable[[], Dict[tuple, float]]):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+    
+    def samples(self) -> List[str]:
+        return [f"{self.name}{self._labels(labels)} {value}" for labels, value in self.collect().items()]
+
+class Histogram(Metric):
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        self.values: Dict[tuple, list] = {}  # labels -> [버킷별 개수(누적 아님), 합계, 개수]
+    
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+    
+    def time(self, *labels) -> _Timer:
+        return _Timer(self, labels)
+    
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total, count) in list(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                bucket_labels = self._labels(labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {total}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {count}")
+        return lines
+
+metrics_registry: List[Metric] = []
+
+REQUEST_SECONDS = Histogram(
+    "pay_http_request_duration_seconds", "HTTP 요청 처리 시간", ("method", "route", "status")
+)
+INGEST_STAGE_SECONDS = Histogram(
+    "pay_ingest_stage_duration_seconds", "SMS 수신 단계별 처리 시간", ("stage",)
+)
+DB_QUERY_SECONDS = Histogram(
+    "pay_db_query_duration_seconds", "DB 작업 시간 (연결 대기 포함)", ("operation",)
+)
+PARSE_FAILURES = Counter(
+    "pay_sms_parse_failures_total", "SMS 파싱 실패 건수", ("bank",)
+)
+WEBSOCKET_CLOSED = Counter(
+    "pay_websocket_closed_total", "서버가 종료한 WebSocket 연결 수", ("reason",)
+)
+WEBHOOK_REJECTED = Counter(
+    "pay_webhook_rejected_total", "수신 제한으로 거절한 웹훅 요청 수", ("reason",)
+)
+
+class MetricsMiddleware:
+    """라우트 템플릿별 요청 지연 시간 기록 (순수 ASGI 미들웨어)"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        status = [500]
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                scope["method"], route.path if route else "unmatched", status[0]
+            )
+
+# 웹훅 수신 제한 (API 키/IP별 토큰 버킷 + 동시 처리 상한)
+class TokenBucketLimiter:
+    """
+    키별 토큰 버킷 (rate: 초당 충전 토큰, burst: 최대 토큰)
+    최근 요청 순으로 유지하고 idle_seconds 동안 요청이 없던 키는 제거 (상태 크기 = 활성 키 수)
+    """
+    
+    def __init__(self, rate: float, burst: float, idle_seconds: float = 300.0):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        # 가득 찰 때까지 걸리는 시간보다 먼저 지우면 제거가 토큰을 더 주는 셈이 되므로 그 이상 유지
+        self.idle_seconds = max(idle_seconds, self.burst / rate) if rate > 0 else idle_seconds
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()  # 키 -> (남은 토큰, 갱신 시각)
+    
+    def acquire(self, key: str, cost: float = 1.0) -> float:
+        """토큰을 차감하고 0 반환, 부족하면 차감 없이 다시 시도할 수 있을 때까지의 초 반환"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._evict(now)
+        
+        entry = self._buckets.pop(key, None)
+        tokens = self.burst if entry is None else min(self.burst, entry[0] + (now - entry[1]) * self.rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        return wait
+    
+    def _evict(self, now: float):
+        while self._buckets:
+            key, (_, updated_at) = next(iter(self._buckets.items()))
+            if now - updated_at < self.idle_seconds:
+                break
+            del self._buckets[key]
+    
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+class WebhookAdmissionMiddleware:
+    """
+    POST /api/webhook/{api_key}[/batch] 수신 제한 (순수 ASGI 미들웨어, 본문을 읽기 전에 판단)
+    IP/API 키별 초당 요청 초과 시 429, 처리 중인 요청이 상한이면 503 (둘 다 Retry-After 포함)
+    """
+    
+    def __init__(self, app, key_limiter: TokenBucketLimiter, ip_limiter: TokenBucketLimiter,
+                 max_in_flight: int, trust_forwarded_for: bool = False):
+        self.app = app
+        self.key_limiter = key_limiter
+        self.ip_limiter = ip_limiter
+        self.max_in_flight = max_in_flight
+        self.trust_forwarded_for = trust_forwarded_for
+        self.in_flight = 0
+    
+    @staticmethod
+    def _api_key(scope) -> Optional[str]:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return None
+        parts = scope["path"].split("/")  # ["", "api", "webhook", api_key(, "batch")]
+        if len(parts) in (4, 5) and parts[1:3] == ["api", "webhook"] and parts[3] and parts[4:] in ([], ["batch"]):
+            return parts[3]
+        return None
+    
+    def _client_ip(self, scope) -> str:
+        if self.trust_forwarded_for:
+            for name, value in scope.get("headers", ()):
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+    
+    async def _reject(self, scope, receive, send, status_code: int, reason: str, retry_after: float):
+        WEBHOOK_REJECTED.inc(reason)
+        response = JSONResponse(
+            status_code=status_code,
+            content={"detail": "요청이 너무 많습니다" if status_code == 429 else "서버가 바쁩니다", "reason": reason},
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
         )
-    """)
+        await response(scope, receive, send)
+    
+    async def __call__(self, scope, receive, send):
+        api_key = self._api_key(scope)
+        if api_key is None:
+            await self.app(scope, receive, send)
+            return
+        
+        wait = self.ip_limiter.acquire(self._client_ip(scope))
+        if wait:
+            await self._reject(scope, receive, send, 429, "ip_rate_limited", wait)
+            return
+        wait = self.key_limiter.acquire(api_key)
+        if wait:
+            await self._reject(scope, receive, send, 429, "key_rate_limited", wait)
+            return
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            await self._reject(scope, receive, send, 503, "overloaded", 1)
+            return
+        
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+webhook_key_limiter = TokenBucketLimiter(WEBHOOK_RATE_PER_KEY, WEBHOOK_BURST_PER_KEY, RATE_LIMIT_IDLE_SECONDS)
+webhook_ip_limiter = TokenBucketLimiter(WEBHOOK_RATE_PER_IP, WEBHOOK_BURST_PER_IP, RATE_LIMIT_IDLE_SECONDS)
+
+Gauge(
+    "pay_webhook_rate_limit_keys", "수신 제한 상태를 유지 중인 키 수", ("scope",),
+    lambda: {("api_key",): len(webhook_key_limiter), ("ip",): len(webhook_ip_limiter)}
+)
+
+# MetricsMiddleware가 바깥에서 거절 응답까지 기록하도록 먼저 등록
+app.add_middleware(
+    WebhookAdmissionMiddleware,
+    key_limiter=webhook_key_limiter,
+    ip_limiter=webhook_ip_limiter,
+    max_in_flight=WEBHOOK_MAX_IN_FLIGHT,
+    trust_forwarded_for=TRUST_FORWARDED_FOR
+)
+app.add_middleware(MetricsMiddleware)
+
+# 데이터베이스 연결 풀
+def sqlite_path(database_url: str) -> str:
+    """DATABASE_URL에서 SQLite 파일 경로 추출 (sqlite:///./settlement.db -> ./settlement.db)"""
+    prefix = "sqlite:///"
+    if not database_url.startswith(prefix):
+        raise ValueError(f"지원하지 않는 DATABASE_URL입니다: {database_url}")
+    return database_url[len(prefix):]
+
+class ConnectionPool:
+    """WAL 모드 SQLite 연결 풀 (최대 size개 연결 재사용)"""
     
-    # 기본 관리자 생성
-    admin_password = hashlib.sha256("79797979".encode()).hexdigest()
-    cursor.execute("""
-        INSERT OR IGNORE INTO admins (username, password_hash) 
-        VALUES (?, ?)
-    """, ("fjrzl7979", admin_password))
+    def __init__(self, path: str, size: int = 8, timeout: float = 30.0):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
     
-    conn.commit()
-    conn.close()
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # WAL에서는 NORMAL로도 커밋 내구성 유지
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+    
+    def acquire(self) -> sqlite3.Connection:
+        """연결 대여 (release로 반환)"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise RuntimeError("데이터베이스 연결 풀 대기 시간 초과")
+    
+    def release(self, conn: sqlite3.Connection):
+        # 커밋되지 않은 작업은 버리고 반환
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+    
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+    
+    def close(self):
+        """유휴 연결 모두 종료"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+# SQLite 전용 (PostgreSQL 사용 시 None)
+db_pool = ConnectionPool(sqlite_path(DATABASE_URL), DB_POOL_SIZE) if DATABASE_URL.startswith("sqlite:///") else None
+
+# 연결 수와 같은 크기의 전용 스레드 풀 (이벤트 루프 블로킹 방지)
+db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="db")
+
+@contextmanager
+def get_db():
+    """데이터베이스 연결 (풀에서 대여)"""
+    if db_pool is None:
+        raise RuntimeError("SQLite DATABASE_URL에서만 사용할 수 있습니다")
+    with db_pool.connection() as conn:
+        yield conn
+
+async def run_db(func: Callable[[sqlite3.Connection], Any], name: Optional[str] = None) -> Any:
+    """func(conn)을 DB 스레드 풀에서 실행 (name 또는 함수명으로 소요 시간 기록)"""
+    def task():
+        with DB_QUERY_SECONDS.time(name or func.__name__):
+            with get_db() as conn:
+                return func(conn)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, task)
+
+async def stream_db(sql: str, params: Any = (), chunk_size: int = 1000):
+    """
+    쿼리 결과를 chunk_size행 단위로 비동기 스트리밍
+    스트림이 끝날 때까지 연결 하나를 점유하므로 호출 측에서 동시 실행 수를 제한할 것
+    """
+    loop = asyncio.get_running_loop()
+    conn = await loop.run_in_executor(db_executor, db_pool.acquire)
+    try:
+        cursor = await loop.run_in_executor(db_executor, conn.execute, sql, params)
+        while True:
+            rows = await loop.run_in_executor(db_executor, cursor.fetchmany, chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        await loop.run_in_executor(db_executor, db_pool.release, conn)
+
+# 데이터베이스 초기화
+def init_database():
+    """데이터베이스 초기화"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        
+        # 업체 테이블
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS companies (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                company_name TEXT NOT NULL,
+                login_id TEXT UNIQUE NOT NULL,
+                password_hash TEXT NOT NULL,
+                api_key TEXT UNIQUE NOT NULL,
+                bank_name TEXT NOT NULL,
+                account_number TEXT NOT NULL,
+                account_holder TEXT NOT NULL,
+                fee_rate REAL DEFAULT 0.03,
+                is_active BOOLEAN DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # 거래 테이블
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                company_id INTEGER NOT NULL,
+                transaction_type TEXT NOT NULL,
+                bank_name TEXT NOT NULL,
+                sender_name TEXT,
+                account_number TEXT,
+                amount DECIMAL(15,2) NOT NULL,
+                balance DECIMAL(15,2),
+                fee_amount DECIMAL(15,2) DEFAULT 0,
+                raw_message TEXT NOT NULL,
+                is_rolling BOOLEAN DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (company_id) REFERENCES companies(id)
+            )
+        """)
+        
+        # 관리자 테이블
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS admins (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                password_hash TEXT NOT NULL,
+                is_active BOOLEAN DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # 기본 관리자 생성 (없을 때만 해시 계산)
+        cursor.execute("SELECT 1 FROM admins WHERE username = ?", ("fjrzl7979",))
+        if not cursor.fetchone():
+            cursor.execute("""
+                INSERT OR IGNORE INTO admins (username, password_hash) 
+                VALUES (?, ?)
+            """, ("fjrzl7979", hash_password("79797979")))
+        
+        conn.commit()
+        apply_migrations(conn)
     logger.info("데이터베이스 초기화 완료")
 
+# 스키마 마이그레이션 (PRAGMA user_version 이후 항목을 순서대로 적용)
+MIGRATIONS = [
+    # 1: 조회용 인덱스 및 영업일(로컬 날짜) 컬럼
+    """
+    ALTER TABLE transactions ADD COLUMN business_date TEXT;
+    UPDATE transactions SET business_date = DATE(created_at, 'localtime');
+    CREATE INDEX IF NOT EXISTS idx_transactions_company_created
+        ON transactions (company_id, created_at);
+    CREATE INDEX IF NOT EXISTS idx_transactions_business_date
+        ON transactions (business_date, company_id);
+    """,
+    # 2: 업체별 일일 집계 테이블 (거래 저장과 같은 트랜잭션에서 갱신)
+    """
+    CREATE TABLE IF NOT EXISTS daily_company_stats (
+        business_date TEXT NOT NULL,
+        company_id INTEGER NOT NULL,
+        deposits DECIMAL(15,2) DEFAULT 0,
+        withdrawals DECIMAL(15,2) DEFAULT 0,
+        fees DECIMAL(15,2) DEFAULT 0,
+        transaction_count INTEGER DEFAULT 0,
+        PRIMARY KEY (business_date, company_id),
+        FOREIGN KEY (company_id) REFERENCES companies(id)
+    );
+    INSERT INTO daily_company_stats
+    SELECT
+        business_date, company_id,
+        SUM(CASE WHEN transaction_type = 'deposit' THEN amount ELSE 0 END),
+        SUM(CASE WHEN transaction_type = 'withdrawal' THEN amount ELSE 0 END),
+        SUM(fee_amount),
+        COUNT(*)
+    FROM transactions
+    GROUP BY business_date, company_id;
+    """,
+    # 3: 프로세스 간 WebSocket 브로드캐스트 전달용 이벤트 테이블 (BROADCAST_BACKEND=sqlite)
+    """
+    CREATE TABLE IF NOT EXISTS broadcast_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        origin TEXT NOT NULL,
+        channel TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+    # 4: 수신 대기열 (INGEST_MODE=queue)
+    """
+    CREATE TABLE IF NOT EXISTS ingest_queue (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        api_key TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER DEFAULT 0,
+        transaction_id INTEGER,
+        error TEXT,
+        received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        claimed_at TIMESTAMP,
+        processed_at TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_ingest_queue_status ON ingest_queue (status, id);
+    """,
+    # 5: 중복 수신 방지 키 (NULL은 서로 다른 값으로 취급되므로 기존 행은 영향 없음)
+    """
+    ALTER TABLE transactions ADD COLUMN dedup_key TEXT;
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_dedup_key ON transactions (dedup_key);
+    """,
+    # 6: 금액을 원 단위 정수로 변환 (DECIMAL 선언은 NUMERIC 친화성이라 정수 값은 그대로 정확히 저장됨)
+    # 기존 수수료는 부동소수 오차(20999.999999...)를 소수 6자리 반올림으로 걷어낸 뒤 원 미만 절사
+    """
+    UPDATE transactions SET
+        amount = CAST(ROUND(amount) AS INTEGER),
+        balance = CAST(ROUND(balance) AS INTEGER),
+        fee_amount = CAST(ROUND(fee_amount, 6) AS INTEGER);
+    DELETE FROM daily_company_stats;
+    INSERT INTO daily_company_stats
+    SELECT
+        business_date, company_id,
+        SUM(CASE WHEN transaction_type = 'deposit' THEN amount ELSE 0 END),
+        SUM(CASE WHEN transaction_type = 'withdrawal' THEN amount ELSE 0 END),
+        SUM(fee_amount),
+        COUNT(*)
+    FROM transactions
+    GROUP BY business_date, company_id;
+    """,
+    # 7: raw_message 보관 월 (값이 있으면 원문은 보관 파일에 있고 raw_message는 빈 문자열)
+    """
+    ALTER TABLE transactions ADD COLUMN archived_month TEXT;
+    """,
+    # 8: 파싱 실패 격리 및 형태별 템플릿
+    """
+    CREATE TABLE IF NOT EXISTS parse_quarantine (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        shape_signature TEXT NOT NULL,
+        shape TEXT NOT NULL,
+        company_id INTEGER,
+        bank_name TEXT,
+        raw_message TEXT NOT NULL,
+        received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_parse_quarantine_shape ON parse_quarantine (shape_signature, id);
+    CREATE TABLE IF NOT EXISTS sms_templates (
+        shape_signature TEXT PRIMARY KEY,
+        pattern TEXT NOT NULL,
+        bank_name TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+    # 9: 잔액 연쇄 검증 플래그 (같은 거래/종류는 한 번만 기록)
+    """
+    CREATE TABLE IF NOT EXISTS balance_flags (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transaction_id INTEGER NOT NULL,
+        previous_transaction_id INTEGER,
+        company_id INTEGER NOT NULL,
+        bank_name TEXT,
+        account_number TEXT,
+        kind TEXT NOT NULL,
+        expected_balance INTEGER,
+        actual_balance INTEGER,
+        difference INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (transaction_id, kind)
+    );
+    CREATE INDEX IF NOT EXISTS idx_balance_flags_company ON balance_flags (company_id, id);
+    """,
+    # 10: 새 거래 조회(since_id)용 업체별 ID 순 인덱스
+    """
+    CREATE INDEX IF NOT EXISTS idx_transactions_company_id ON transactions (company_id, id);
+    """,
+    # 11: reconcile-balances 진행 위치 (중단 후 같은 --since로 다시 실행하면 이어서 검증)
+    """
+    CREATE TABLE IF NOT EXISTS balance_reconcile_progress (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        since_date TEXT,
+        last_id INTEGER NOT NULL,
+        checked INTEGER NOT NULL,
+        flags TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+]
+
+def apply_migrations(conn: sqlite3.Connection):
+    """미적용 마이그레이션 실행"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+        # executescript는 자체적으로 COMMIT하므로 버전 갱신까지 한 스크립트로 실행
+        conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {number};\nCOMMIT;")
+        logger.info(f"스키마 마이그레이션 {number} 적용")
+
 # SMS 파싱 엔진
+BANK_NAMES = (
+    "농협", "신한", "국민", "우리", "하나", "기업",
+    "SC제일", "씨티", "대구", "부산", "광주", "전북",
+    "경남", "새마을", "신협", "우체국", "카카오뱅크", "토스뱅크"
+)
+
+# 은행명 탐지용 단일 패턴 (긴 이름 우선으로 alternation 구성, 템플릿에 맞지 않는 메시지에만 사용)
+BANK_PATTERN = re.compile("|".join(
+    re.escape(bank) for bank in sorted(BANK_NAMES, key=len, reverse=True)
+))
+
+# 필드별 보조 패턴 (템플릿 불일치 시 사용)
+AMOUNT_PATTERN = re.compile(r"([입출금]\s*)([\d,]+)원")
+BALANCE_PATTERN = re.compile(r"잔액\s*([\d,]+)원")
+NAME_PATTERN = re.compile(r"[\d*-]+\s+([가-힣A-Za-z\s]+)\s+잔액")
+ACCOUNT_PATTERN = re.compile(r"(\d{2,3}-[\d*-]+)")
+
+# 표준 메시지 템플릿: "농협 출금700,000원\n06/27 13:00 302-****-5080-61 신주일 잔액307,006원"
+STANDARD_TEMPLATE = (
+    r"(?P<type>입금|출금)\s*(?P<amount>[\d,]+)원"
+    r".*?(?P<account>\d{2,3}-[\d*-]+)\s+(?P<name>[가-힣A-Za-z\s]+?)\s+"
+    r"잔액\s*(?P<balance>[\d,]+)원"
+)
+
+# 은행별 메시지 템플릿 (은행명 뒤에 오는 부분, 은행명과 선택적 "은행" 접미사는 등록 시 앞에 붙음)
+# type, amount 그룹 필수, balance, account, name 그룹 선택
+BANK_TEMPLATES: Dict[str, str] = {bank: STANDARD_TEMPLATE for bank in BANK_NAMES}
+# "토스뱅크 입금 15,000원 잔액 215,000원" (계좌번호/이름 없음)
+BANK_TEMPLATES["토스뱅크"] = r"(?P<type>입금|출금)\s*(?P<amount>[\d,]+)원\s*잔액\s*(?P<balance>[\d,]+)원"
+
+TRANSACTION_TYPES = {"입금": "deposit", "출금": "withdrawal"}
+
+# 메시지 형태 서명: 숫자(쉼표/날짜/시각 포함)는 9, 은행명/거래 키워드가 아닌 단어(이름 등)는 *로 가림
+SHAPE_NUMBER_PATTERN = re.compile(r"\d+(?:[,.:/]\d+)*")
+SHAPE_WORD_PATTERN = re.compile(r"[가-힣A-Za-z]+")
+SHAPE_MASK_RUN_PATTERN = re.compile(r"\*+(?:\s+\*+)*")
+SHAPE_KEYWORDS = ("입금", "출금", "잔액", "이체", "은행", "Web발신", *BANK_NAMES)
+
+def _shape_word(match: "re.Match[str]") -> str:
+    word = match.group()
+    if word in TRANSACTION_TYPES:
+        return "입출금"  # 입금/출금 메시지는 같은 형식으로 취급
+    return word if word == "원" or word.startswith(SHAPE_KEYWORDS) else "*"
+
+def sms_shape(message: str) -> tuple:
+    """
+    같은 형식의 메시지가 같은 값이 되도록 정규화한 형태와 서명
+    예: "농협 출금700,000원 ... 신주일 잔액307,006원" -> "농협 입출금9원 ... * 잔액9원"
+    반환: (서명, 형태)
+    """
+    shape = SHAPE_NUMBER_PATTERN.sub("9", message)
+    shape = SHAPE_WORD_PATTERN.sub(_shape_word, shape)
+    shape = SHAPE_MASK_RUN_PATTERN.sub("*", " ".join(shape.split()))
+    return hashlib.sha1(shape.encode("utf-8")).hexdigest()[:16], shape
+
+def compile_template(pattern: str) -> "re.Pattern[str]":
+    """템플릿 컴파일 (type, amount 그룹이 없으면 ValueError)"""
+    compiled = re.compile(pattern, re.DOTALL)
+    missing = {"type", "amount"} - compiled.groupindex.keys()
+    if missing:
+        raise ValueError(f"필수 그룹 누락: {', '.join(sorted(missing))}")
+    return compiled
+
+TEMPLATE_GROUP_PATTERN = re.compile(r"\(\?P<(\w+)>")
+
+def compile_bank_templates(templates: Dict[str, str]) -> tuple:
+    """
+    은행별 템플릿을 은행명으로 시작하는 분기로 묶어 단일 패턴으로 컴파일 (은행 판별과 필드 추출을 한 번에)
+    같은 템플릿을 쓰는 은행은 한 분기의 은행명 alternation으로 합침 (분기 수 = 서로 다른 템플릿 수)
+    분기 i의 그룹은 b{i}_ 접두사로 이름을 바꾸고 분기 전체를 b{i} 그룹으로 감쌈 (match.lastgroup이 일치한 분기)
+    반환: (컴파일된 패턴, 분기 이름 -> (은행명 그룹 번호, {필드: 그룹 번호}))
+    """
+    banks_by_template: Dict[str, List[str]] = {}
+    for bank, pattern in templates.items():
+        compile_template(pattern)
+        banks_by_template.setdefault(pattern, []).append(bank)
+    
+    branches = []
+    for i, (pattern, banks) in enumerate(banks_by_template.items()):
+        names = "|".join(re.escape(bank) for bank in sorted(banks, key=len, reverse=True))
+        body = TEMPLATE_GROUP_PATTERN.sub(lambda match: f"(?P<b{i}_{match.group(1)}>", pattern)
+        branches.append(f"(?P<b{i}>(?P<b{i}_bank>{names})(?:은행)?\\s*{body})")
+    compiled = re.compile("|".join(branches), re.DOTALL)
+    
+    groups = {}
+    for i in range(len(branches)):
+        prefix = f"b{i}_"
+        fields = {group[len(prefix):]: index for group, index in compiled.groupindex.items() if group.startswith(prefix)}
+        groups[f"b{i}"] = (fields.pop("bank"), fields)
+    return compiled, groups
+
+
+@dataclass(slots=True)
+class ParsedSMS:
+    """SMS 파싱 결과"""
+    transaction_type: Optional[str] = None
+    bank_name: Optional[str] = None
+    amount: int = 0  # 원 단위 정수
+    balance: Optional[int] = None  # 잔액이 없는 문자는 None (잔액 연쇄 검증에서 제외)
+    sender_name: Optional[str] = None
+    account_number: Optional[str] = None
+    parsed: bool = False
+
+
 class SMSParser:
     """SMS 메시지 파싱 엔진"""
-    
-    @staticmethod
-    def parse_message(message: str) -> Dict[str, Any]:
+
+    # 은행별 메시지 템플릿 (은행명 -> 패턴)과 이를 묶은 단일 패턴, 맞지 않으면 필드별 추출
+    bank_templates: Dict[str, str] = dict(BANK_TEMPLATES)
+    bank_template_pattern, bank_template_groups = compile_bank_templates(bank_templates)
+    # 운영 중 등록한 형태별 템플릿 (형태 서명 -> (컴파일된 패턴, 기본 은행명)), 있으면 가장 먼저 확인
+    # 패턴은 type, amount 그룹이 필수이며 balance, account, name 그룹은 선택
+    shape_templates: Dict[str, tuple] = {}
+
+    @classmethod
+    def register_bank_template(cls, bank_name: str, pattern: str):
+        """
+        은행별 템플릿 등록 (은행명 뒤에 오는 부분의 패턴, 같은 은행이면 교체)
+        패턴은 type, amount 그룹이 필수이며 balance, account, name 그룹은 선택
+        """
+        templates = {**cls.bank_templates, bank_name: pattern}
+        cls.bank_template_pattern, cls.bank_template_groups = compile_bank_templates(templates)
+        cls.bank_templates = templates
+
+    @classmethod
+    def register_shape_template(cls, shape_signature: str, pattern: str, bank_name: Optional[str] = None):
+        """형태 서명별 템플릿 등록 (sms_shape 서명이 같으면 은행별 템플릿보다 먼저 사용)"""
+        cls.shape_templates[shape_signature] = (compile_template(pattern), bank_name)
+
+    @classmethod
+    def unregister_shape_template(cls, shape_signature: str):
+        cls.shape_templates.pop(shape_signature, None)
+
+    @classmethod
+    def parse_message(cls, message: str) -> ParsedSMS:
         """
         SMS 메시지 파싱
         예시: "[Web발신]\n농협 출금700,000원\n06/27 13:00 302-****-5080-61 신주일 잔액307,006원"
         """
-        result = {
-            "transaction_type": None,
-            "bank_name": None,
-            "amount": 0.0,
-            "balance": 0.0,
-            "sender_name": None,
-            "account_number": None,
-            "parsed": False
-        }
-        
+        result = ParsedSMS()
+
         try:
-            # 은행명 추출
-            bank_patterns = [
-                r"농협", r"신한", r"국민", r"우리", r"하나", r"기업",
-                r"SC제일", r"씨티", r"대구", r"부산", r"광주", r"전북",
-                r"경남", r"새마을", r"신협", r"우체국", r"카카오뱅크", r"토스뱅크"
-            ]
-            
-            for bank in bank_patterns:
-                if bank in message:
-                    result["bank_name"] = bank
-                    break
-            
-            # 거래 유형 추출
-            if "입금" in message:
-                result["transaction_type"] = "deposit"
-            elif "출금" in message:
-                result["transaction_type"] = "withdrawal"
-            
-            # 금액 추출 (쉼표 포함 숫자)
-            amount_match = re.search(r"([입출금]\s*)([\d,]+)원", message)
-            if amount_match:
-                amount_str = amount_match.group(2).replace(",", "")
-                result["amount"] = float(amount_str)
-            
-            # 잔액 추출
-            balance_match = re.search(r"잔액\s*([\d,]+)원", message)
-            if balance_match:
-                balance_str = balance_match.group(1).replace(",", "")
-                result["balance"] = float(balance_str)
-            
-            # 이름 추출 (계좌번호 다음에 오는 한글/영문)
-            name_match = re.search(r"[\d*-]+\s+([가-힣A-Za-z\s]+)\s+잔액", message)
-            if name_match:
-                result["sender_name"] = name_match.group(1).strip()
-            
-            # 계좌번호 추출 (일부 마스킹된 형태)
-            account_match = re.search(r"(\d{2,3}-[\d*-]+)", message)
-            if account_match:
-                result["account_number"] = account_match.group(1)
-            
-            result["parsed"] = True
-            
+            # 형태별 템플릿 (등록된 것이 있을 때만 서명 계산)
+            fields = None
+            if cls.shape_templates:
+                entry = cls.shape_templates.get(sms_shape(message)[0])
+                match = entry[0].search(message) if entry else None
+                if match:
+                    fields = match.groupdict()
+                    bank_match = BANK_PATTERN.search(message)
+                    result.bank_name = bank_match.group() if bank_match else entry[1]
+
+            # 은행별 템플릿: 은행 판별과 필드 추출을 한 번의 검색으로
+            if fields is None:
+                match = cls.bank_template_pattern.search(message)
+                if match:
+                    bank_group, groups = cls.bank_template_groups[match.lastgroup]
+                    result.bank_name = match.group(bank_group)
+                    fields = {field: match.group(index) for field, index in groups.items()}
+
+            if fields is not None:
+                result.transaction_type = TRANSACTION_TYPES[fields["type"]]
+                result.amount = int(fields["amount"].replace(",", ""))
+                if fields.get("balance"):
+                    result.balance = int(fields["balance"].replace(",", ""))
+                if fields.get("name"):
+                    result.sender_name = fields["name"].strip()
+                if fields.get("account"):
+                    result.account_number = fields["account"]
+            else:
+                bank_match = BANK_PATTERN.search(message)
+                if bank_match:
+                    result.bank_name = bank_match.group()
+                cls._parse_fields(message, result)
+
+            # 거래 유형이나 금액을 찾지 못하면 실패 (격리 대상)
+            result.parsed = bool(result.transaction_type and result.amount)
+
         except Exception as e:
             logger.error(f"SMS 파싱 실패: {e}")
-            result["parsed"] = False
+            result.parsed = False
+
+        return result
+
+    @staticmethod
+    def _parse_fields(message: str, result: ParsedSMS):
+        """템플릿에 맞지 않는 메시지의 필드별 추출"""
+        # 거래 유형 추출
+        if "입금" in message:
+            result.transaction_type = "deposit"
+        elif "출금" in message:
+            result.transaction_type = "withdrawal"
+
+        # 금액 추출 (쉼표 포함 숫자)
+        amount_match = AMOUNT_PATTERN.search(message)
+        if amount_match:
+            result.amount = int(amount_match.group(2).replace(",", ""))
+
+        # 잔액 추출
+        balance_match = BALANCE_PATTERN.search(message)
+        if balance_match:
+            result.balance = int(balance_match.group(1).replace(",", ""))
+
+        # 이름 추출 (계좌번호 다음에 오는 한글/영문)
+        name_match = NAME_PATTERN.search(message)
+        if name_match:
+            result.sender_name = name_match.group(1).strip()
+
+        # 계좌번호 추출 (일부 마스킹된 형태)
+        account_match = ACCOUNT_PATTERN.search(message)
+        if account_match:
+            result.account_number = account_match.group(1)
+
+# 브로드캐스트 백엔드 (워커 간 메시지 전달)
+class BroadcastBackend:
+    """
+    브로드캐스트 백엔드 인터페이스
+    publish된 메시지는 모든 워커의 deliver(channel, text)로 전달되어야 함
+    """
+    
+    def __init__(self):
+        self.deliver: Optional[Callable[[str, str], None]] = None
+    
+    def attach(self, deliver: Callable[[str, str], None]):
+        self.deliver = deliver
+    
+    async def start(self):
+        pass
+    
+    async def stop(self):
+        pass
+    
+    async def publish(self, channel: str, text: str):
+        raise NotImplementedError
+
+class InProcessBroadcast(BroadcastBackend):
+    """단일 프로세스용 (기본값)"""
+    
+    async def publish(self, channel: str, text: str):
+        self.deliver(channel, text)
+
+class SQLiteBroadcast(BroadcastBackend):
+    """
+    공유 SQLite 파일을 통한 다중 워커 전달 (같은 호스트의 uvicorn --workers N)
+    자기 워커에는 즉시 전달하고, 다른 워커는 broadcast_events 테이블을 폴링해 수신
+    내부 채널도 DB를 거침: _dashboard(오늘 누적값), _parser(형태별 템플릿), _company(업체 캐시 무효화)는
+    모든 워커의 메모리 상태를 같게 유지해야 하므로 다른 워커에 전달되어야 함 (_balance는 이 백엔드에서 발행하지 않음)
+    """
+    
+    def __init__(self, poll_interval: float = 0.1, retention_seconds: int = 60):
+        super().__init__()
+        self.origin = secrets.token_hex(8)
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.last_id = 0
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        def fetch_last_id(conn):
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM broadcast_events").fetchone()[0]
+        
+        self.last_id = await run_db(fetch_last_id)
+        self._task = asyncio.create_task(self._poll())
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+    
+    async def publish(self, channel: str, text: str):
+        self.deliver(channel, text)
+        
+        def insert_event(conn):
+            conn.execute(
+                "INSERT INTO broadcast_events (origin, channel, payload) VALUES (?, ?, ?)",
+                (self.origin, channel, text)
+            )
+            conn.commit()
+        
+        await run_db(insert_event)
+    
+    async def _poll(self):
+        last_prune = time.monotonic()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                prune = time.monotonic() - last_prune > self.retention_seconds / 6
+                events = await run_db(lambda conn: self._fetch_events(conn, prune), "fetch_broadcast_events")
+                if prune:
+                    last_prune = time.monotonic()
+                for event_id, channel, payload in events:
+                    self.last_id = event_id
+                    self.deliver(channel, payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"브로드캐스트 이벤트 폴링 실패: {e}")
+    
+    def _fetch_events(self, conn, prune: bool) -> List[tuple]:
+        if prune:
+            conn.execute(
+                "DELETE FROM broadcast_events WHERE created_at < datetime('now', ?)",
+                (f"-{self.retention_seconds} seconds",)
+            )
+            conn.commit()
+        return [tuple(row) for row in conn.execute("""
+            SELECT id, channel, payload FROM broadcast_events
+            WHERE id > ? AND origin != ?
+            ORDER BY id
+            LIMIT 1000
+        """, (self.last_id, self.origin))]
+
+def create_broadcast_backend(name: str) -> BroadcastBackend:
+    """BROADCAST_BACKEND 설정으로 백엔드 생성"""
+    if name == "memory":
+        return InProcessBroadcast()
+    if name == "sqlite":
+        return SQLiteBroadcast(BROADCAST_POLL_INTERVAL)
+    raise ValueError(f"지원하지 않는 BROADCAST_BACKEND입니다: {name}")
+
+# WebSocket 매니저
+def merge_stats_delta(older: dict, newer: dict) -> dict:
+    """
+    아직 보내지 않은 stats_delta에 새 stats_delta 병합
+    행 값이 누적 절대값이라 업체별 최신 행만 남기면 되고, 영업일이 바뀌었으면 새 메시지로 대체
+    """
+    older_data, newer_data = older["data"], newer["data"]
+    if "companies" not in newer_data or older_data["business_date"] != newer_data["business_date"]:
+        return newer
+    companies = {row["id"]: row for row in older_data["companies"]}
+    companies.update((row["id"], row) for row in newer_data["companies"])
+    return {**newer, "data": {**newer_data, "companies": list(companies.values())}}
+
+@dataclass(slots=True)
+class PendingState:
+    """송신 대기 중인 상태 메시지 (stats_delta, ping). 병합되면 text를 비우고 전송 시 다시 직렬화"""
+    kind: str
+    message: Optional[dict]
+    text: Optional[str]
+
+class ConnectionQueue:
+    """
+    연결별 송신 큐 (전용 태스크가 순서대로 전송해 느린 연결이 다른 연결을 막지 않음)
+    거래 알림 등 순번(seq) 메시지는 put, 최신 값만 의미 있는 상태 메시지는 put_state로 추가
+    """
+    
+    def __init__(self, websocket: WebSocket, max_size: int, policy: str,
+                 on_dead: Callable[["ConnectionQueue"], None]):
+        self.websocket = websocket
+        self.max_size = max_size
+        self.policy = policy
+        self.on_dead = on_dead
+        self.pending: deque = deque()
+        self.pending_states: Dict[str, PendingState] = {}  # 종류 -> 아직 보내지 않은 상태 메시지
+        self.dropped = 0
+        self.coalesced = 0
+        self.last_seen = time.monotonic()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+    
+    def put(self, text: str) -> bool:
+        """
+        메시지 추가. 큐가 가득 찬 경우
+        - coalesce/drop_oldest: 가장 오래된 메시지를 버리고 최신 메시지 유지
+          (coalesce는 병합된 대시보드 상태 대신 그다음 메시지를 버림)
+        - disconnect: False 반환 (호출 측에서 연결 제거)
+        """
+        return self._append(text)
+    
+    def put_state(self, kind: str, message: Optional[dict], text: str) -> bool:
+        """
+        상태 메시지 추가 (순번 없음)
+        coalesce 정책이면 아직 보내지 않은 같은 종류 메시지에 병합해 큐 길이가 늘지 않음 (ping은 하나만 유지)
+        """
+        if self.policy == "coalesce":
+            pending = self.pending_states.get(kind)
+            if pending is not None:
+                if message is not None:
+                    pending.message = merge_stats_delta(pending.message, message)
+                    pending.text = None
+                self.coalesced += 1
+                return True
+        entry = PendingState(kind, message, text)
+        if not self._append(entry):
+            return False
+        self.pending_states[kind] = entry
+        return True
+    
+    def _append(self, item) -> bool:
+        if len(self.pending) >= self.max_size:
+            if self.policy == "disconnect":
+                return False
+            index = 0
+            if self.policy == "coalesce" and len(self.pending) > 1 and isinstance(self.pending[0], PendingState) \
+                    and self.pending[0].kind == "stats_delta":
+                index = 1
+            self._forget(self.pending[index])
+            del self.pending[index]
+            self.dropped += 1
+        self.pending.append(item)
+        self._wakeup.set()
+        return True
+    
+    def _forget(self, item):
+        if isinstance(item, PendingState) and self.pending_states.get(item.kind) is item:
+            del self.pending_states[item.kind]
+    
+    def touch(self):
+        """클라이언트로부터 메시지(pong 포함) 수신 시 호출"""
+        self.last_seen = time.monotonic()
+    
+    def close(self):
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+    
+    async def _run(self):
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self.pending:
+                    item = self.pending.popleft()
+                    if isinstance(item, PendingState):
+                        self._forget(item)
+                        text = item.text
+                        if text is None:
+                            text = json.dumps(item.message, ensure_ascii=False, separators=(",", ":"))
+                    else:
+                        text = item
+                    await asyncio.wait_for(self.websocket.send_text(text), WS_SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.on_dead(self)
+
+# 업체별 오늘 통계 (관리자 대시보드 행)
+DASHBOARD_COMPANIES_SQL = """
+    SELECT 
+        c.id, c.company_name, c.login_id, c.fee_rate, c.api_key,
+        COALESCE(s.deposits, 0) as today_deposits,
+        COALESCE(s.withdrawals, 0) as today_withdrawals,
+        COALESCE(s.fees, 0) as today_fees,
+        COALESCE(s.transaction_count, 0) as today_transactions
+    FROM companies c
+    LEFT JOIN daily_company_stats s ON c.id = s.company_id 
+        AND s.business_date = ?
+    WHERE c.is_active
+    ORDER BY today_deposits DESC
+"""
+
+# 대시보드 갱신 내부 채널 (구독자 없음, 각 워커가 상태 반영 후 관리자/업체 채널로 전달)
+DASHBOARD_CHANNEL = "_dashboard"
+# 형태별 템플릿 등록/삭제 내부 채널 (각 워커의 SMSParser에 반영)
+PARSER_CHANNEL = "_parser"
+# 업체 정보 변경 내부 채널 (각 워커의 company_cache에서 해당 API 키 삭제)
+COMPANY_CHANNEL = "_company"
+DASHBOARD_TOTAL_FIELDS = ("today_deposits", "today_withdrawals", "today_fees", "today_transactions")
+
+def dashboard_summary(companies) -> dict:
+    """업체별 오늘 통계 행 합계 (관리자 대시보드 요약)"""
+    companies = list(companies)
+    return {
+        "total_companies": len(companies),
+        "total_deposits": sum(row["today_deposits"] for row in companies),
+        "total_fees": sum(row["today_fees"] for row in companies),
+        "total_transactions": sum(row["today_transactions"] for row in companies)
+    }
+
+class DashboardState:
+    """
+    오늘 업체별 누적 통계의 메모리 스냅샷
+    시작 시 SQLite에서 읽고, 이후에는 저장 직후 발행되는 갱신(누적값)으로만 유지
+    """
+    
+    def __init__(self):
+        self.business_date = ""
+        self.companies: Dict[int, dict] = {}
+    
+    def load(self, business_date: str, rows: List[dict]):
+        """저장소에서 읽은 오늘 통계로 초기화"""
+        self.business_date = business_date
+        self.companies = {row["id"]: dict(row) for row in rows}
+    
+    def _roll_over(self, business_date: str):
+        """영업일이 바뀌면 누적값 초기화"""
+        if business_date > self.business_date:
+            self.business_date = business_date
+            for row in self.companies.values():
+                row.update(dict.fromkeys(DASHBOARD_TOTAL_FIELDS, 0))
+    
+    def apply(self, business_date: str, rows: List[dict]) -> List[dict]:
+        """
+        갱신 행(누적값) 반영 후 반영된 행 반환
+        지난 영업일의 누적값과, 거래 수가 현재보다 적은 누적값(다른 워커에서 늦게 도착한 이전 갱신)은 무시
+        """
+        self._roll_over(business_date)
+        applied = []
+        for update in rows:
+            row = self.companies.setdefault(update["id"], dict.fromkeys(DASHBOARD_TOTAL_FIELDS, 0))
+            if business_date < self.business_date or update.get("today_transactions", 0) < row["today_transactions"]:
+                update = {key: value for key, value in update.items() if key not in DASHBOARD_TOTAL_FIELDS}
+            row.update(update)
+            applied.append(row)
+        return applied
+    
+    def summary(self) -> dict:
+        return dashboard_summary(self.companies.values())
+    
+    def snapshot(self, channel: str) -> Optional[dict]:
+        """채널 구독자에게 보낼 전체 상태 (관리자: /api/admin/dashboard와 같은 형식)"""
+        self._roll_over(business_date_today())
+        if channel == "admin":
+            companies = sorted(self.companies.values(), key=lambda row: row["today_deposits"], reverse=True)
+            return {"business_date": self.business_date, "summary": self.summary(), "companies": companies}
+        if channel.startswith("company_"):
+            return {"business_date": self.business_date, "company": self.companies.get(int(channel[8:]))}
+        return None
+
+# 잔액 연쇄 검증 내부 채널 (BROADCAST_BACKEND=memory에서만 발행, publish_balance_rows 참고)
+BALANCE_CHANNEL = "_balance"
+BALANCE_CHAIN_COLUMNS = ("id", "company_id", "bank_name", "account_number", "transaction_type", "amount", "balance")
+BALANCE_FLAG_FIELDS = (
+    "transaction_id", "previous_transaction_id", "company_id", "bank_name", "account_number",
+    "kind", "expected_balance", "actual_balance", "difference"
+)
+
+class BalanceChainReconciler:
+    """
+    계좌별 잔액 연쇄 검증: 같은 (업체, 은행, 계좌)의 연속 거래는 직전 잔액 ± 금액 = 잔액이어야 함
+    계좌별 마지막 거래만 메모리에 두고 새 거래마다 O(1)로 확인, 끊기면 새 잔액부터 다시 이어감
+    실시간 검증은 저장 순서대로 거래를 받는 단일 프로세스 전제 (publish_balance_rows 참고)
+    플래그 종류: duplicate (직전과 같은 문자 재수신 의심), mismatch (누락된 문자 또는 잘못된 금액/잔액)
+    """
+    
+    def __init__(self):
+        self.heads: Dict[tuple, tuple] = {}  # (업체, 은행, 계좌) -> (거래 ID, 유형, 금액, 잔액)
+    
+    @staticmethod
+    def chain_key(row) -> Optional[tuple]:
+        if not row["account_number"] or row["balance"] is None:
+            return None
+        return row["company_id"], row["bank_name"], row["account_number"]
+    
+    def load(self, rows: List[dict]):
+        """계좌별 최신 거래로 초기화"""
+        self.heads = {}
+        for row in rows:
+            key = self.chain_key(row)
+            if key:
+                self.heads[key] = (row["id"], row["transaction_type"], row["amount"], row["balance"])
+    
+    def check(self, row) -> Optional[dict]:
+        """
+        거래 한 건 반영 후 연쇄가 끊겼으면 플래그(BALANCE_FLAG_FIELDS) 반환
+        직전 거래보다 ID가 작은 늦은 반영분은 건너뜀 (일괄 검증에서 다시 확인)
+        """
+        key = self.chain_key(row)
+        if key is None:
+            return None
+        head = self.heads.get(key)
+        if head is not None and row["id"] <= head[0]:
+            return None
+        self.heads[key] = (row["id"], row["transaction_type"], row["amount"], row["balance"])
+        if head is None:
+            return None
+        
+        previous_id, previous_type, previous_amount, previous_balance = head
+        sign = 1 if row["transaction_type"] == "deposit" else -1
+        expected = previous_balance + sign * row["amount"]
+        if row["balance"] == expected:
+            return None
+        
+        repeated = (row["transaction_type"], row["amount"], row["balance"]) == (previous_type, previous_amount, previous_balance)
+        return {
+            "transaction_id": row["id"],
+            "previous_transaction_id": previous_id,
+            "company_id": key[0],
+            "bank_name": key[1],
+            "account_number": key[2],
+            "kind": "duplicate" if repeated else "mismatch",
+            "expected_balance": expected,
+            "actual_balance": row["balance"],
+            "difference": row["balance"] - expected
+        }
+
+class WebSocketManager:
+    def __init__(self, queue_size: int = 100, policy: str = "coalesce",
+                 backend: Optional[BroadcastBackend] = None,
+                 heartbeat_interval: float = 25.0, heartbeat_timeout: float = 60.0,
+                 max_per_channel: int = 50, dashboard: Optional[DashboardState] = None,
+                 replay_size: int = 256, balances: Optional[BalanceChainReconciler] = None):
+        self.active_connections: Dict[str, List[ConnectionQueue]] = {}
+        self.sequences: Dict[str, int] = {}  # 채널별 마지막 메시지 순번
+        # 채널별 최근 메시지 (seq, 직렬화된 메시지), 재연결 시 누락분 재전송용
+        self.history: Dict[str, deque] = {}
+        self.replay_size = replay_size
+        # 순번은 프로세스마다 따로 매겨지므로 다른 프로세스의 seq로는 이어받지 않음
+        self.epoch = secrets.token_hex(4)
+        self.dashboard = dashboard or DashboardState()
+        self.balances = balances or BalanceChainReconciler()
+        self._flag_tasks: set = set()
+        self.queue_size = queue_size
+        self.policy = policy
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_per_channel = max_per_channel
+        self.backend = backend or InProcessBroadcast()
+        self.backend.attach(self.deliver_local)
+        self._reaper: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        await self.backend.start()
+        self._reaper = asyncio.create_task(self._heartbeat())
+    
+    async def stop(self):
+        if self._reaper:
+            self._reaper.cancel()
+            self._reaper = None
+        await self.backend.stop()
+    
+    async def connect(self, websocket: WebSocket, channel: str, last_seq: Optional[int] = None,
+                      epoch: Optional[str] = None) -> Optional[ConnectionQueue]:
+        """
+        연결 등록. 채널 연결 수 상한 초과 시 1013(잠시 후 재시도)으로 거절하고 None 반환
+        last_seq가 주어지면 그 이후 메시지만 재전송하고, 버퍼에 없으면 스냅샷으로 재동기화
+        """
+        connections = self.active_connections.get(channel, [])
+        if len(connections) >= self.max_per_channel:
+            WEBSOCKET_CLOSED.inc("channel_full")
+            logger.warning(f"WebSocket 연결 수 상한 초과: {channel}")
+            await reject_websocket(websocket, 1013)
+            return None
+        
+        await websocket.accept()
+        connection = ConnectionQueue(
+            websocket, self.queue_size, self.policy,
+            on_dead=lambda dead: self._drop(dead, channel)
+        )
+        self.active_connections.setdefault(channel, []).append(connection)
+        if last_seq is None:
+            self.send_snapshot(connection, channel)
+        elif not self.replay(connection, channel, last_seq, epoch):
+            self.send_snapshot(connection, channel, reason="too_old")
+        else:
+            # 상태 메시지는 재전송 버퍼에 없으므로 현재 상태를 한 번 보냄
+            state = self.dashboard.snapshot(channel)
+            if state is not None:
+                message = {"type": "stats_delta", "data": state}
+                connection.put_state("stats_delta", message, json.dumps(message, ensure_ascii=False, separators=(",", ":")))
+        return connection
+    
+    def replay(self, connection: ConnectionQueue, channel: str, last_seq: int, epoch: Optional[str]) -> bool:
+        """last_seq 이후 메시지 재전송 (버퍼가 이미 지나갔거나 다른 프로세스의 순번이면 False)"""
+        current = self.sequences.get(channel, 0)
+        if epoch != self.epoch or not 0 <= last_seq <= current:
+            return False
+        missed = [text for seq, text in self.history.get(channel, ()) if seq > last_seq]
+        # 버퍼가 한 바퀴 돌았거나 송신 큐에 다 들어가지 않으면 재동기화
+        if len(missed) != current - last_seq or len(missed) > connection.max_size:
+            return False
+        for text in missed:
+            connection.put(text)
+        return True
+    
+    def send_snapshot(self, connection: ConnectionQueue, channel: str, reason: str = "connect"):
+        """현재 상태와 채널 순번 전송 (이후 메시지는 seq+1부터 이어짐)"""
+        snapshot = self.dashboard.snapshot(channel)
+        if snapshot is not None:
+            connection.put(json.dumps({
+                "type": "snapshot", "seq": self.sequences.get(channel, 0), "epoch": self.epoch,
+                "reason": reason, "data": snapshot
+            }, ensure_ascii=False, separators=(",", ":")))
+    
+    def disconnect(self, websocket: WebSocket, channel: str):
+        for connection in self.active_connections.get(channel, []):
+            if connection.websocket is websocket:
+                self._remove(connection, channel)
+                break
+    
+    def _remove(self, connection: ConnectionQueue, channel: str):
+        connections = self.active_connections.get(channel)
+        if connections and connection in connections:
+            connections.remove(connection)
+            connection.close()
+            # 빈 채널 정리
+            if not connections:
+                del self.active_connections[channel]
+    
+    def _drop(self, connection: ConnectionQueue, channel: str):
+        """전송 실패 또는 느린 연결 제거 후 소켓 종료"""
+        self._remove(connection, channel)
+        asyncio.create_task(close_websocket(connection.websocket))
+    
+    async def _heartbeat(self):
+        """주기적으로 ping을 보내고, 제한 시간 동안 응답이 없거나 송신 큐가 가득 찬 연결 정리"""
+        ping = json.dumps({"type": "ping"})
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            now = time.monotonic()
+            for channel, connections in list(self.active_connections.items()):
+                slow_connections = []
+                for connection in list(connections):
+                    if now - connection.last_seen > self.heartbeat_timeout:
+                        logger.info(f"응답 없는 WebSocket 연결 정리: {channel}")
+                        WEBSOCKET_CLOSED.inc("heartbeat_timeout")
+                        self._drop(connection, channel)
+                    elif not connection.put_state("ping", None, ping):
+                        slow_connections.append(connection)
+                self._drop_slow(channel, slow_connections)
+    
+    def _apply_dashboard(self, text: str):
+        """대시보드 갱신을 상태에 반영하고 관리자/업체 채널에 변경분만 전달"""
+        update = json.loads(text)
+        # 송신 대기 중 병합될 수 있으므로 상태 행의 복사본을 보냄
+        rows = [dict(row) for row in self.dashboard.apply(update["business_date"], update["companies"])]
+        business_date = self.dashboard.business_date
+        
+        self.deliver_state("admin", {"type": "stats_delta", "data": {
+            "business_date": business_date, "summary": self.dashboard.summary(), "companies": rows
+        }})
+        for row in rows:
+            self.deliver_state(f"company_{row['id']}", {"type": "stats_delta", "data": {
+                "business_date": business_date, "company": row
+            }})
+    
+    def _apply_balances(self, text: str):
+        """새 거래를 잔액 연쇄에 반영하고, 끊긴 곳은 저장(중복 무시) 후 이 워커의 관리자 연결에 전달"""
+        flags = [flag for flag in map(self.balances.check, json.loads(text)["rows"]) if flag]
+        if not flags:
+            return
+        for flag in flags:
+            logger.warning(
+                f"잔액 연쇄 불일치 ({flag['kind']}): 거래 {flag['transaction_id']}, "
+                f"예상 {flag['expected_balance']} / 실제 {flag['actual_balance']}"
+            )
+        task = asyncio.get_running_loop().create_task(save_balance_flags(flags))
+        self._flag_tasks.add(task)
+        task.add_done_callback(self._flag_tasks.discard)
+        self.deliver_local("admin", json.dumps(
+            {"type": "balance_flags", "data": flags}, ensure_ascii=False, separators=(",", ":")
+        ))
+    
+    def _apply_template_update(self, text: str):
+        """형태별 템플릿 등록(pattern)/삭제(pattern 없음)를 이 워커의 파서에 반영"""
+        update = json.loads(text)
+        if update.get("pattern") is None:
+            SMSParser.unregister_shape_template(update["shape_signature"])
+        else:
+            SMSParser.register_shape_template(update["shape_signature"], update["pattern"], update.get("bank_name"))
+    
+    async def broadcast_to_channel(self, channel: str, message: dict):
+        """메시지를 한 번만 직렬화해 백엔드로 발행 (각 워커가 자기 연결에 전달)"""
+        text = json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+        await self.backend.publish(channel, text)
+    
+    def deliver_local(self, channel: str, text: str):
+        """이 워커의 연결 송신 큐에 추가 (전송 완료를 기다리지 않음)"""
+        if channel == DASHBOARD_CHANNEL:
+            self._apply_dashboard(text)
+            return
+        if channel == PARSER_CHANNEL:
+            self._apply_template_update(text)
+            return
+        if channel == BALANCE_CHANNEL:
+            self._apply_balances(text)
+            return
+        if channel == COMPANY_CHANNEL:
+            company_cache.invalidate(json.loads(text)["api_key"])
+            return
+        
+        # 채널 순번 부여 (직렬화된 객체 앞에 삽입)
+        seq = self.sequences.get(channel, 0) + 1
+        self.sequences[channel] = seq
+        text = f'{{"seq":{seq},' + text[1:]
+        history = self.history.get(channel)
+        if history is None:
+            history = self.history[channel] = deque(maxlen=self.replay_size)
+        history.append((seq, text))
+        
+        connections = self.active_connections.get(channel)
+        if not connections:
+            return
+        
+        self._drop_slow(channel, [connection for connection in connections if not connection.put(text)])
+    
+    def deliver_state(self, channel: str, message: dict):
+        """
+        상태 메시지(stats_delta)를 순번 없이 이 워커의 연결에 전달
+        재연결 시 재전송 대상이 아니며(replay 후 현재 상태를 따로 보냄), 송신 대기 중이면 병합됨
+        """
+        connections = self.active_connections.get(channel)
+        if not connections:
+            return
+        text = json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+        self._drop_slow(channel, [
+            connection for connection in connections if not connection.put_state(message["type"], message, text)
+        ])
+    
+    def _drop_slow(self, channel: str, slow_connections: List[ConnectionQueue]):
+        """느린 연결 제거 (disconnect 정책)"""
+        for connection in slow_connections:
+            logger.warning(f"느린 WebSocket 연결 종료: {channel}")
+            WEBSOCKET_CLOSED.inc("slow_consumer")
+            self._drop(connection, channel)
+
+dashboard_state = DashboardState()
+balance_reconciler = BalanceChainReconciler()
+manager = WebSocketManager(
+    WS_SEND_QUEUE_SIZE, WS_SLOW_CONSUMER_POLICY, create_broadcast_backend(BROADCAST_BACKEND),
+    WS_HEARTBEAT_INTERVAL, WS_HEARTBEAT_TIMEOUT, WS_MAX_CONNECTIONS_PER_CHANNEL, dashboard_state,
+    WS_REPLAY_BUFFER_SIZE, balance_reconciler
+)
+
+async def publish_balance_rows(rows: List[dict]):
+    """
+    저장 직후 새 거래를 잔액 연쇄 실시간 검증에 반영 (BROADCAST_BACKEND=memory 단일 프로세스에서만)
+    sqlite 백엔드의 다른 워커 거래는 폴링 주기만큼 늦게 도착해 ID 순서로 확인할 수 없으므로
+    다중 워커에서는 실시간 검증을 하지 않고 reconcile-balances 일괄 검증에 맡김
+    """
+    if rows and BROADCAST_BACKEND == "memory":
+        await manager.broadcast_to_channel(BALANCE_CHANNEL, {"rows": rows})
+
+async def invalidate_company(api_key: str):
+    """
+    업체 정보(수수료율, 예금주, 활성 여부 등)를 바꾼 뒤 호출: 모든 워커의 company_cache에서 삭제
+    DB를 직접 수정한 경우는 COMPANY_CACHE_TTL 안에 반영됨
+    """
+    await manager.broadcast_to_channel(COMPANY_CHANNEL, {"api_key": api_key})
+
+async def publish_dashboard_update(business_date: str, rows: List[Optional[dict]]):
+    """저장 직후 업체별 오늘 누적값 발행 (모든 워커의 대시보드 상태에 반영)"""
+    rows = [row for row in rows if row]
+    if rows:
+        await manager.broadcast_to_channel(DASHBOARD_CHANNEL, {"business_date": business_date, "companies": rows})
+
+Gauge(
+    "pay_websocket_connections", "채널별 WebSocket 연결 수", ("channel",),
+    lambda: {(channel,): len(connections) for channel, connections in manager.active_connections.items()}
+)
+
+# 업체 캐시 (API 키 -> 업체 정보)
+@dataclass(slots=True, frozen=True)
+class CompanyRecord:
+    """웹훅 처리에 필요한 업체 정보"""
+    id: int
+    company_name: str
+    fee_rate: float
+    account_holder: str
+    is_active: bool
+
+class LRUCache:
+    """크기 제한 + TTL LRU 캐시 (적중/미스 횟수 집계)"""
+    
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    def put(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, key: Optional[str] = None):
+        """key 항목 삭제 (None이면 전체 삭제)"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+# API 키 -> CompanyRecord (조회 실패는 캐시하지 않음), 업체 수정/비활성화 시 invalidate_company 호출
+company_cache = LRUCache(COMPANY_CACHE_SIZE, COMPANY_CACHE_TTL)
+
+# 최근 수신 중복 키 -> 원본 거래 ID (DB 고유 인덱스 앞단의 빠른 확인용)
+recent_dedup_keys = LRUCache(DEDUP_CACHE_SIZE, DEDUP_CACHE_TTL)
+
+# 유틸리티 함수들
+# bcrypt 해시 (기존 SHA-256 해시는 로그인 성공 시 bcrypt로 재해시)
+pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=PASSWORD_BCRYPT_ROUNDS)
+LEGACY_HASH_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+# bcrypt는 GIL을 풀고 실행되므로 전용 스레드 풀에서 돌려 이벤트 루프 블로킹 방지
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password")
+
+# 최근 검증 성공 캐시 (키: 서버 비밀키 HMAC(아이디, 저장된 해시, 비밀번호))
+verified_logins = LRUCache(1024, PASSWORD_VERIFY_CACHE_TTL)
+
+def hash_password(password: str) -> str:
+    """비밀번호 해시"""
+    return pwd_context.hash(password)
+
+def verify_password(password: str, hashed: str) -> tuple:
+    """비밀번호 검증 (상수 시간 비교), (일치 여부, 재해시 값 또는 None) 반환"""
+    if LEGACY_HASH_PATTERN.fullmatch(hashed):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        if hmac.compare_digest(legacy, hashed):
+            return True, hash_password(password)
+        return False, None
+    return pwd_context.verify_and_update(password, hashed)
+
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, hash_password, password)
+
+async def verify_password_async(username: str, password: str, hashed: Optional[str]) -> tuple:
+    """
+    비밀번호 검증을 전용 스레드 풀에서 실행
+    hashed가 None(없는 계정)이어도 같은 비용의 검증을 수행해 응답 시간으로 계정 존재가 드러나지 않게 함
+    """
+    cache_key = None
+    if hashed:
+        cache_key = hmac.new(
+            JWT_SECRET.encode(), "\x1f".join((username, hashed, password)).encode(), hashlib.sha256
+        ).hexdigest()
+        if verified_logins.get(cache_key):
+            return True, None
+    
+    loop = asyncio.get_running_loop()
+    verified, new_hash = await loop.run_in_executor(
+        password_executor, verify_password, password, hashed or DUMMY_PASSWORD_HASH
+    )
+    if verified and hashed and not new_hash:
+        verified_logins.put(cache_key, True)
+    return verified and bool(hashed), new_hash
+
+DUMMY_PASSWORD_HASH = hash_password(secrets.token_urlsafe(16))
+
+def generate_api_key() -> str:
+    """API 키 생성"""
+    return secrets.token_urlsafe(32)
+
+def create_jwt_token(data: dict) -> str:
+    """JWT 토큰 생성"""
+    expire = datetime.utcnow() + timedelta(hours=24)
+    data.update({"exp": expire})
+    return jwt.encode(data, JWT_SECRET, algorithm="HS256")
+
+# 거래 저장 SQL
+INSERT_TRANSACTION_SQL = """
+    INSERT INTO transactions (
+        company_id, transaction_type, bank_name, sender_name,
+        account_number, amount, balance, fee_amount, raw_message, is_rolling,
+        business_date, dedup_key
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# 일일 집계 누적 SQL
+UPSERT_DAILY_STATS_SQL = """
+    INSERT INTO daily_company_stats (
+        business_date, company_id, deposits, withdrawals, fees, transaction_count
+    ) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (business_date, company_id) DO UPDATE SET
+        deposits = daily_company_stats.deposits + excluded.deposits,
+        withdrawals = daily_company_stats.withdrawals + excluded.withdrawals,
+        fees = daily_company_stats.fees + excluded.fees,
+        transaction_count = daily_company_stats.transaction_count + excluded.transaction_count
+    RETURNING deposits, withdrawals, fees, transaction_count
+"""
+
+def business_date_today() -> str:
+    """영업일 (서버 로컬 날짜)"""
+    return datetime.now().date().isoformat()
+
+# 금액은 원 단위 정수, 수수료율은 백만분율(ppm) 정수로 바꿔 정수로만 계산 (원 미만 절사)
+FEE_RATE_SCALE = 1_000_000
+
+def fee_rate_ppm(fee_rate: float) -> int:
+    """수수료율 0.03 -> 30000"""
+    return round(fee_rate * FEE_RATE_SCALE)
+
+def calculate_fee(amount: int, rate_ppm: int) -> int:
+    """입금 수수료 (원 미만 절사)"""
+    return amount * rate_ppm // FEE_RATE_SCALE
+
+def calculate_settlement(company: CompanyRecord, parsed_data: ParsedSMS) -> tuple:
+    """수수료 및 롤링 여부(지정계좌) 계산"""
+    fee_amount = (
+        calculate_fee(parsed_data.amount, fee_rate_ppm(company.fee_rate))
+        if parsed_data.transaction_type == "deposit" else 0
+    )
+    is_rolling = bool(parsed_data.sender_name and company.account_holder in parsed_data.sender_name)
+    return fee_amount, is_rolling
+
+def transaction_row(company: CompanyRecord, parsed_data: ParsedSMS, fee_amount: int, is_rolling: bool,
+                    raw_message: str, business_date: str, dedup_key: Optional[str] = None) -> tuple:
+    """INSERT_TRANSACTION_SQL 파라미터 생성"""
+    return (
+        company.id,
+        parsed_data.transaction_type,
+        parsed_data.bank_name,
+        parsed_data.sender_name,
+        parsed_data.account_number,
+        parsed_data.amount,
+        parsed_data.balance,
+        fee_amount,
+        raw_message,
+        is_rolling,
+        business_date,
+        dedup_key
+    )
+
+def webhook_dedup_key(api_key: str, date: Optional[str], sender: Optional[str], message: str) -> str:
+    """중복 수신 판별 키 (API 키, 수신 시각, 발신번호, 공백 정규화한 본문)"""
+    normalized = " ".join(message.split())
+    raw = "\x1f".join((api_key, date or "", sender or "", normalized))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def daily_stats_delta(parsed_data: ParsedSMS, fee_amount: int) -> tuple:
+    """거래 한 건의 (입금, 출금, 수수료) 집계 증가분"""
+    deposit = parsed_data.amount if parsed_data.transaction_type == "deposit" else 0
+    withdrawal = parsed_data.amount if parsed_data.transaction_type == "withdrawal" else 0
+    return deposit, withdrawal, fee_amount
+
+def transaction_event_data(transaction_id: int, company: CompanyRecord, parsed_data: ParsedSMS,
+                           fee_amount: int, is_rolling: bool) -> dict:
+    """WebSocket 알림용 거래 데이터"""
+    return {
+        "id": transaction_id,
+        "company_id": company.id,
+        "transaction_type": parsed_data.transaction_type,
+        "bank_name": parsed_data.bank_name,
+        "sender_name": parsed_data.sender_name,
+        "amount": parsed_data.amount,
+        "balance": parsed_data.balance,
+        "fee_amount": fee_amount,
+        "is_rolling": is_rolling,
+        "created_at": datetime.now().isoformat()
+    }
+
+class TransactionBatch:
+    """
+    한 업체의 거래 여러 건을 한 트랜잭션으로 저장 (executemany + 일일 집계 1회 갱신)
+    같은 중복 키는 배치 안에서 한 번만 추가되고, 이미 저장된 키는 저장 시 건너뜀
+    """
+    
+    def __init__(self, company: CompanyRecord, business_date: str):
+        self.company = company
+        self.business_date = business_date
+        self.rows: List[tuple] = []
+        self.parsed: List[tuple] = []  # (파싱 결과, 수수료, 롤링 여부)
+        self.dedup_keys: List[Optional[str]] = []
+        self.ids: List[int] = []
+        self.duplicates: set = set()  # 이미 저장되어 있던 위치
+        self.daily_totals: Optional[tuple] = None  # 저장 후 오늘 누적 (입금, 출금, 수수료, 건수)
+        self.failures: List[tuple] = []  # 파싱 실패 (INSERT_QUARANTINE_SQL 파라미터)
+        self._positions: Dict[str, int] = {}
+    
+    def add(self, message: str, dedup_key: Optional[str] = None) -> Optional[int]:
+        """
+        메시지 파싱 후 추가, 배치 내 위치 반환 (파싱 실패 시 None)
+        같은 dedup_key가 이미 추가되어 있으면 기존 위치 반환
+        """
+        if dedup_key and dedup_key in self._positions:
+            return self._positions[dedup_key]
+        
+        with INGEST_STAGE_SECONDS.time("parse"):
+            parsed_data = SMSParser.parse_message(message)
+        
+        # NOT NULL 컬럼이 비면 배치 전체가 롤백되므로 항목 단위로 실패 처리
+        if not parsed_data.parsed or not parsed_data.transaction_type or not parsed_data.bank_name:
+            shape_signature, shape = sms_shape(message)
+            self.failures.append((shape_signature, shape, self.company.id, parsed_data.bank_name, message))
+            PARSE_FAILURES.inc(parsed_data.bank_name or "unknown")
+            logger.warning(f"SMS 파싱 실패 (은행: {parsed_data.bank_name}, 형태: {shape_signature}, 길이: {len(message)})")
+            logger.debug(f"파싱 실패 원문: {message}")
+            return None
+        
+        fee_amount, is_rolling = calculate_settlement(self.company, parsed_data)
+        self.rows.append(transaction_row(
+            self.company, parsed_data, fee_amount, is_rolling, message, self.business_date, dedup_key
+        ))
+        self.parsed.append((parsed_data, fee_amount, is_rolling))
+        self.dedup_keys.append(dedup_key)
+        if dedup_key:
+            self._positions[dedup_key] = len(self.rows) - 1
+        return len(self.rows) - 1
+    
+    def save(self, conn: sqlite3.Connection):
+        """거래 및 일일 집계 저장 (커밋은 호출 측에서)"""
+        if not self.rows:
+            return
+        # 중복 확인과 저장 사이에 다른 쓰기가 끼어들지 않도록 쓰기 잠금 선점
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        cursor = conn.cursor()
+        
+        existing: Dict[str, int] = {}
+        keys = [key for key in self.dedup_keys if key]
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            cursor.execute(
+                f"SELECT id, dedup_key FROM transactions WHERE dedup_key IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            existing.update({key: transaction_id for transaction_id, key in cursor.fetchall()})
+        
+        rows = []
+        for position, (row, key) in enumerate(zip(self.rows, self.dedup_keys)):
+            if key in existing:
+                self.duplicates.add(position)
+                continue
+            rows.append(row)
+        
+        next_id = 0
+        if rows:
+            cursor.executemany(INSERT_TRANSACTION_SQL, rows)
+            # 한 트랜잭션 안에서 AUTOINCREMENT ID는 연속으로 할당됨
+            cursor.execute("SELECT last_insert_rowid()")
+            next_id = cursor.fetchone()[0] - len(rows) + 1
+            cursor.execute(UPSERT_DAILY_STATS_SQL, (
+                self.business_date, self.company.id, *self.delta_totals()
+            ))
+            self.daily_totals = tuple(cursor.fetchone())
+        
+        self.ids = []
+        for position, key in enumerate(self.dedup_keys):
+            if position in self.duplicates:
+                self.ids.append(existing[key])
+            else:
+                self.ids.append(next_id)
+                next_id += 1
+    
+    def delta_totals(self) -> tuple:
+        """새로 저장되는 거래의 일일 집계 증가분 (입금, 출금, 수수료, 건수)"""
+        totals = [0, 0, 0]
+        count = 0
+        for position, (parsed_data, fee_amount, _) in enumerate(self.parsed):
+            if position in self.duplicates:
+                continue
+            count += 1
+            for i, value in enumerate(daily_stats_delta(parsed_data, fee_amount)):
+                totals[i] += value
+        return (*totals, count)
+    
+    def transaction_id(self, position: int) -> int:
+        return self.ids[position]
+    
+    def remember_keys(self):
+        """저장된 중복 키를 최근 키 캐시에 등록"""
+        for position, key in enumerate(self.dedup_keys):
+            if key:
+                recent_dedup_keys.put(key, self.ids[position])
+    
+    def dashboard_row(self) -> Optional[dict]:
+        """대시보드 상태 갱신용 업체 행 (새로 저장된 거래가 없으면 None)"""
+        if self.daily_totals is None:
+            return None
+        deposits, withdrawals, fees, count = self.daily_totals
+        return {
+            "id": self.company.id,
+            "today_deposits": deposits,
+            "today_withdrawals": withdrawals,
+            "today_fees": fees,
+            "today_transactions": count
+        }
+    
+    def balance_rows(self) -> List[dict]:
+        """새로 저장된 거래의 잔액 연쇄 검증용 행 (BALANCE_CHAIN_COLUMNS, 계좌번호 없는 거래 제외)"""
+        return [
+            {
+                "id": self.transaction_id(position),
+                "company_id": self.company.id,
+                "bank_name": parsed_data.bank_name,
+                "account_number": parsed_data.account_number,
+                "transaction_type": parsed_data.transaction_type,
+                "amount": parsed_data.amount,
+                "balance": parsed_data.balance
+            }
+            for position, (parsed_data, _, _) in enumerate(self.parsed)
+            if position not in self.duplicates and parsed_data.account_number
+        ]
+    
+    def events(self) -> List[dict]:
+        """새로 저장된 거래의 WebSocket 알림 데이터"""
+        return [
+            transaction_event_data(self.transaction_id(position), self.company, *parsed)
+            for position, parsed in enumerate(self.parsed)
+            if position not in self.duplicates
+        ]
+
+async def ingest_webhook_items(api_key: str, company: CompanyRecord,
+                               items: List[SMSWebhookData]) -> tuple:
+    """
+    웹훅 항목 파싱/중복 제거/저장 후 (항목별 결과, 알림 데이터) 반환
+    결과 status: success | duplicate (원본 transaction_id 포함) | failed
+    """
+    batch = TransactionBatch(company, business_date_today())
+    plan = []  # 항목별 ("cached", 거래 ID) 또는 ("batch", 위치, 배치 내 첫 등장 여부) 또는 None
+    
+    for data in items:
+        dedup_key = webhook_dedup_key(api_key, data.date, data.from_, data.message)
+        cached_id = recent_dedup_keys.get(dedup_key)
+        if cached_id is not None:
+            plan.append(("cached", cached_id))
+            continue
+        rows_before = len(batch.rows)
+        position = batch.add(data.message, dedup_key)
+        if position is None:
+            plan.append(("failed", batch.failures[-1][0]))
+        else:
+            plan.append(("batch", position, len(batch.rows) > rows_before))
+    
+    if batch.rows:
+        with INGEST_STAGE_SECONDS.time("insert"):
+            await repository.save_batch(batch)
+        batch.remember_keys()
+        await publish_dashboard_update(batch.business_date, [batch.dashboard_row()])
+        await publish_balance_rows(batch.balance_rows())
+    if batch.failures:
+        await repository.quarantine_messages(batch.failures)
+    
+    results = []
+    for entry in plan:
+        if entry[0] == "failed":
+            results.append({"status": "failed", "reason": "parsing_failed", "shape_signature": entry[1]})
+        elif entry[0] == "cached":
+            results.append({"status": "duplicate", "transaction_id": entry[1]})
+        else:
+            _, position, first_seen = entry
+            status = "success" if first_seen and position not in batch.duplicates else "duplicate"
+            results.append({"status": status, "transaction_id": batch.transaction_id(position)})
+    
+    return results, batch.events()
+
+# 저장소 (업체/거래/관리자)
+# SQL은 ? 자리표시자로 작성하고, PostgreSQL 구현이 $1, $2...로 변환
+class DuplicateError(Exception):
+    """고유 제약 위반 (로그인 ID, API 키 등)"""
+
+LOGIN_ACCOUNTS_SQL = """
+    SELECT 'admin' as role, id, username as login, password_hash, 0 as priority
+    FROM admins WHERE username = ?
+    UNION ALL
+    SELECT 'company' as role, id, login_id as login, password_hash, 1 as priority
+    FROM companies WHERE login_id = ?
+    ORDER BY priority
+"""
+
+INSERT_COMPANY_SQL = """
+    INSERT INTO companies (
+        company_name, login_id, password_hash, api_key,
+        bank_name, account_number, account_holder, fee_rate
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    RETURNING id
+"""
+
+COMPANY_BY_API_KEY_SQL = """
+    SELECT id, company_name, fee_rate, account_holder, is_active
+    FROM companies WHERE api_key = ?
+"""
+
+TRANSACTION_LIST_COLUMNS = (
+    "id", "transaction_type", "bank_name", "sender_name", "account_number",
+    "amount", "balance", "fee_amount", "is_rolling", "created_at"
+)
+
+EXPORT_COLUMNS = (
+    "id", "company_id", "business_date", "created_at", "transaction_type", "bank_name",
+    "sender_name", "account_number", "amount", "balance", "fee_amount", "is_rolling"
+)
+
+def transaction_list_query(company_id: int, limit: int, page_cursor: Optional[tuple] = None,
+                           since: Any = None, until: Any = None,
+                           transaction_type: Optional[str] = None, since_id: Optional[int] = None) -> tuple:
+    """
+    업체 거래 목록 SQL과 파라미터
+    기본은 최신순 keyset 페이지네이션 (created_at, id), since_id 지정 시 새 거래만 오래된 순
+    다음 페이지 존재 여부 확인을 위해 limit + 1건 조회
+    """
+    conditions = ["company_id = ?"]
+    params: List[Any] = [company_id]
+    
+    if since:
+        conditions.append("created_at >= ?")
+        params.append(since)
+    if until:
+        conditions.append("created_at < ?")
+        params.append(until)
+    if transaction_type:
+        conditions.append("transaction_type = ?")
+        params.append(transaction_type)
+    
+    if since_id is not None:
+        conditions.append("id > ?")
+        params.append(since_id)
+        order = "id ASC"
+    else:
+        if page_cursor:
+            cursor_created_at, cursor_id = page_cursor
+            # 행 값 비교라야 (company_id, created_at) 인덱스 범위 검색이 됨 (OR로 풀면 업체 전체를 훑음)
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend([cursor_created_at, cursor_id])
+        order = "created_at DESC, id DESC"
+    
+    sql = f"""
+        SELECT {", ".join(TRANSACTION_LIST_COLUMNS)}
+        FROM transactions
+        WHERE {" AND ".join(conditions)}
+        ORDER BY {order}
+        LIMIT ?
+    """
+    return sql, [*params, limit + 1]
+
+# 원문 조회 시 함께 읽는 열 (archived_month는 restore_raw_messages에서 제거)
+RAW_MESSAGE_COLUMNS = ("raw_message", "archived_month")
+
+TRANSACTION_DETAIL_SQL = f"""
+    SELECT {", ".join(EXPORT_COLUMNS + RAW_MESSAGE_COLUMNS)}
+    FROM transactions WHERE id = ?
+"""
+
+def export_query(start_date: str, end_date: str, company_id: Optional[int] = None,
+                 include_raw: bool = False) -> tuple:
+    """정산 내보내기 SQL과 파라미터 (영업일, 업체, ID 순)"""
+    columns = EXPORT_COLUMNS + RAW_MESSAGE_COLUMNS if include_raw else EXPORT_COLUMNS
+    sql = f"""
+        SELECT {", ".join(columns)}
+        FROM transactions
+        WHERE business_date BETWEEN ? AND ?
+    """
+    params: List[Any] = [start_date, end_date]
+    if company_id is not None:
+        # 단항 +로 company_id 인덱스 선택을 막아 (business_date, company_id) 인덱스 순서대로 읽음
+        # (업체 인덱스를 타면 결과 전체를 임시 B-tree에서 정렬해 스트리밍 메모리가 커짐)
+        sql += " AND +company_id = ?"
+        params.append(company_id)
+    sql += " ORDER BY business_date, company_id, id"
+    return sql, params
+
+INSERT_QUARANTINE_SQL = """
+    INSERT INTO parse_quarantine (shape_signature, shape, company_id, bank_name, raw_message)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+# 형태별 실패 건수 (최근 원문 1건과 템플릿 등록 여부 포함)
+PARSE_FAILURE_SHAPES_SQL = """
+    SELECT
+        s.shape_signature, s.shape, s.bank_name, s.failures, s.companies,
+        s.first_seen, s.last_seen, q.raw_message as sample,
+        t.pattern as template
+    FROM (
+        SELECT
+            shape_signature, MAX(shape) as shape, MAX(bank_name) as bank_name,
+            COUNT(*) as failures, COUNT(DISTINCT company_id) as companies,
+            MIN(received_at) as first_seen, MAX(received_at) as last_seen, MAX(id) as latest_id
+        FROM parse_quarantine
+        GROUP BY shape_signature
+    ) s
+    JOIN parse_quarantine q ON q.id = s.latest_id
+    LEFT JOIN sms_templates t ON t.shape_signature = s.shape_signature
+    ORDER BY s.failures DESC
+    LIMIT ?
+"""
+
+QUARANTINE_SAMPLES_SQL = """
+    SELECT raw_message FROM parse_quarantine
+    WHERE shape_signature = ?
+    ORDER BY id DESC
+    LIMIT ?
+"""
+
+UPSERT_SHAPE_TEMPLATE_SQL = """
+    INSERT INTO sms_templates (shape_signature, pattern, bank_name) VALUES (?, ?, ?)
+    ON CONFLICT (shape_signature) DO UPDATE SET pattern = excluded.pattern, bank_name = excluded.bank_name
+"""
+
+# 잔액 연쇄 검증
+INSERT_BALANCE_FLAG_SQL = f"""
+    INSERT INTO balance_flags ({", ".join(BALANCE_FLAG_FIELDS)})
+    VALUES ({", ".join("?" * len(BALANCE_FLAG_FIELDS))})
+    ON CONFLICT (transaction_id, kind) DO NOTHING
+"""
+
+BALANCE_CHAIN_HEADS_SQL = f"""
+    SELECT {", ".join(BALANCE_CHAIN_COLUMNS)} FROM transactions
+    WHERE id IN (
+        SELECT MAX(id) FROM transactions
+        WHERE business_date >= ? AND account_number IS NOT NULL AND account_number != '' AND balance IS NOT NULL
+        GROUP BY company_id, bank_name, account_number
+    )
+"""
+
+# reconcile-balances 재개용: 진행 위치(ID)까지의 계좌별 마지막 거래
+BALANCE_CHAIN_HEADS_UNTIL_SQL = f"""
+    SELECT {", ".join(BALANCE_CHAIN_COLUMNS)} FROM transactions
+    WHERE id IN (
+        SELECT MAX(id) FROM transactions
+        WHERE business_date >= ? AND id <= ? AND account_number IS NOT NULL AND account_number != ''
+            AND balance IS NOT NULL
+        GROUP BY company_id, bank_name, account_number
+    )
+"""
+
+LIST_BALANCE_FLAGS_SQL = f"""
+    SELECT id, {", ".join(BALANCE_FLAG_FIELDS)}, created_at FROM balance_flags
+    WHERE (CAST(? AS BIGINT) IS NULL OR company_id = ?)
+    ORDER BY id DESC
+    LIMIT ?
+"""
+
+def company_record(row) -> CompanyRecord:
+    return CompanyRecord(
+        id=row["id"],
+        company_name=row["company_name"],
+        fee_rate=row["fee_rate"],
+        account_holder=row["account_holder"],
+        is_active=bool(row["is_active"])
+    )
+
+class Repository:
+    """
+    저장소 인터페이스 (DATABASE_URL로 구현 선택)
+    반환 행은 dict, created_at은 'YYYY-MM-DD HH:MM:SS'(UTC) 문자열로 통일
+    """
+    
+    async def start(self):
+        """연결 준비 및 스키마 적용"""
+        raise NotImplementedError
+    
+    async def close(self):
+        pass
+    
+    # 관리자/업체 계정
+    async def find_login_accounts(self, username: str) -> List[dict]:
+        """로그인 ID가 일치하는 계정 (관리자 먼저)"""
+        raise NotImplementedError
+    
+    async def update_password_hash(self, role: str, account_id: int, password_hash: str):
+        raise NotImplementedError
+    
+    # 업체
+    async def create_company(self, values: tuple) -> int:
+        """업체 생성 후 ID 반환 (중복 시 DuplicateError)"""
+        raise NotImplementedError
+    
+    async def get_company_by_api_key(self, api_key: str) -> Optional[CompanyRecord]:
+        raise NotImplementedError
+    
+    async def dashboard_companies(self, business_date: str) -> List[dict]:
+        """활성 업체별 해당 영업일 통계 (입금액 내림차순)"""
+        raise NotImplementedError
+    
+    # 거래
+    async def save_batch(self, batch: "TransactionBatch"):
+        """배치 저장 및 일일 집계 갱신 (batch.ids/duplicates/daily_totals 설정)"""
+        raise NotImplementedError
+    
+    async def list_transactions(self, company_id: int, limit: int, **filters) -> List[dict]:
+        """transaction_list_query 조건으로 최대 limit + 1건 조회"""
+        raise NotImplementedError
+    
+    async def get_transaction(self, transaction_id: int) -> Optional[dict]:
+        """거래 한 건 (TRANSACTION_DETAIL_SQL 열)"""
+        raise NotImplementedError
+    
+    def stream_transactions(self, start_date: str, end_date: str, company_id: Optional[int] = None,
+                            include_raw: bool = False) -> AsyncIterator[List[dict]]:
+        """내보내기 행을 묶음 단위로 스트리밍 (include_raw면 RAW_MESSAGE_COLUMNS 포함)"""
+        raise NotImplementedError
+    
+    # 파싱 실패 격리/형태별 템플릿
+    async def quarantine_messages(self, entries: List[tuple]):
+        """INSERT_QUARANTINE_SQL 파라미터 목록 저장"""
+        raise NotImplementedError
+    
+    async def parse_failure_shapes(self, limit: int) -> List[dict]:
+        raise NotImplementedError
+    
+    async def quarantine_samples(self, shape_signature: str, limit: int) -> List[str]:
+        """형태별 최근 원문"""
+        raise NotImplementedError
+    
+    async def shape_templates(self) -> List[dict]:
+        raise NotImplementedError
+    
+    async def save_shape_template(self, shape_signature: str, pattern: str, bank_name: Optional[str]):
+        raise NotImplementedError
+    
+    async def delete_shape_template(self, shape_signature: str) -> bool:
+        raise NotImplementedError
+    
+    # 잔액 연쇄 검증
+    async def save_balance_flags(self, flags: List[dict]):
+        """BalanceChainReconciler 플래그 저장 (같은 거래/종류는 한 번만)"""
+        raise NotImplementedError
+    
+    async def list_balance_flags(self, company_id: Optional[int], limit: int) -> List[dict]:
+        """최근 플래그 (ID 내림차순)"""
+        raise NotImplementedError
+    
+    async def balance_chain_heads(self, since_date: str) -> List[dict]:
+        """since_date 이후 거래가 있는 계좌별 마지막 거래 (BALANCE_CHAIN_COLUMNS)"""
+        raise NotImplementedError
+
+class SQLiteRepository(Repository):
+    """SQLite 구현 (연결 풀 + DB 스레드 풀)"""
+    
+    async def start(self):
+        await asyncio.get_running_loop().run_in_executor(db_executor, init_database)
+    
+    async def close(self):
+        db_pool.close()
+    
+    async def find_login_accounts(self, username: str) -> List[dict]:
+        def fetch_accounts(conn):
+            return [dict(row) for row in conn.execute(LOGIN_ACCOUNTS_SQL, (username, username))]
+        return await run_db(fetch_accounts)
+    
+    async def update_password_hash(self, role: str, account_id: int, password_hash: str):
+        table = "admins" if role == "admin" else "companies"
+        
+        def update_password_hash(conn):
+            conn.execute(f"UPDATE {table} SET password_hash = ? WHERE id = ?", (password_hash, account_id))
+            conn.commit()
+        
+        await run_db(update_password_hash)
+    
+    async def create_company(self, values: tuple) -> int:
+        def insert_company(conn):
+            company_id = conn.execute(INSERT_COMPANY_SQL, values).fetchone()[0]
+            conn.commit()
+            return company_id
+        
+        try:
+            return await run_db(insert_company)
+        except sqlite3.IntegrityError as e:
+            raise DuplicateError(str(e))
+    
+    async def get_company_by_api_key(self, api_key: str) -> Optional[CompanyRecord]:
+        def fetch_company(conn):
+            return conn.execute(COMPANY_BY_API_KEY_SQL, (api_key,)).fetchone()
+        
+        row = await run_db(fetch_company)
+        return company_record(row) if row else None
+    
+    async def dashboard_companies(self, business_date: str) -> List[dict]:
+        def fetch_dashboard(conn):
+            return [dict(row) for row in conn.execute(DASHBOARD_COMPANIES_SQL, (business_date,))]
+        return await run_db(fetch_dashboard)
+    
+    async def save_batch(self, batch: "TransactionBatch"):
+        def insert_transactions(conn):
+            batch.save(conn)
+            conn.commit()
+        await run_db(insert_transactions)
+    
+    async def list_transactions(self, company_id: int, limit: int, **filters) -> List[dict]:
+        sql, params = transaction_list_query(company_id, limit, **filters)
+        
+        def fetch_transactions(conn):
+            return [dict(row) for row in conn.execute(sql, params)]
+        return await run_db(fetch_transactions)
+    
+    async def get_transaction(self, transaction_id: int) -> Optional[dict]:
+        def fetch_transaction(conn):
+            return conn.execute(TRANSACTION_DETAIL_SQL, (transaction_id,)).fetchone()
+        
+        row = await run_db(fetch_transaction)
+        return dict(row) if row else None
+    
+    async def stream_transactions(self, start_date: str, end_date: str, company_id: Optional[int] = None,
+                                  include_raw: bool = False) -> AsyncIterator[List[dict]]:
+        sql, params = export_query(start_date, end_date, company_id, include_raw)
+        async for rows in stream_db(sql, params):
+            yield [dict(row) for row in rows]
+    
+    async def quarantine_messages(self, entries: List[tuple]):
+        def insert_quarantine(conn):
+            conn.executemany(INSERT_QUARANTINE_SQL, entries)
+            conn.commit()
+        await run_db(insert_quarantine)
+    
+    async def parse_failure_shapes(self, limit: int) -> List[dict]:
+        def fetch_parse_failures(conn):
+            return [dict(row) for row in conn.execute(PARSE_FAILURE_SHAPES_SQL, (limit,))]
+        return await run_db(fetch_parse_failures)
+    
+    async def quarantine_samples(self, shape_signature: str, limit: int) -> List[str]:
+        def fetch_samples(conn):
+            return [row[0] for row in conn.execute(QUARANTINE_SAMPLES_SQL, (shape_signature, limit))]
+        return await run_db(fetch_samples)
+    
+    async def shape_templates(self) -> List[dict]:
+        def fetch_templates(conn):
+            return [dict(row) for row in conn.execute("SELECT shape_signature, pattern, bank_name FROM sms_templates")]
+        return await run_db(fetch_templates)
+    
+    async def save_shape_template(self, shape_signature: str, pattern: str, bank_name: Optional[str]):
+        def save_template(conn):
+            conn.execute(UPSERT_SHAPE_TEMPLATE_SQL, (shape_signature, pattern, bank_name))
+            conn.commit()
+        await run_db(save_template)
+    
+    async def delete_shape_template(self, shape_signature: str) -> bool:
+        def delete_template(conn):
+            deleted = conn.execute("DELETE FROM sms_templates WHERE shape_signature = ?", (shape_signature,)).rowcount
+            conn.commit()
+            return deleted > 0
+        return await run_db(delete_template)
+    
+    async def save_balance_flags(self, flags: List[dict]):
+        def insert_flags(conn):
+            conn.executemany(INSERT_BALANCE_FLAG_SQL, [
+                tuple(flag[field] for field in BALANCE_FLAG_FIELDS) for flag in flags
+            ])
+            conn.commit()
+        await run_db(insert_flags)
+    
+    async def list_balance_flags(self, company_id: Optional[int], limit: int) -> List[dict]:
+        def fetch_flags(conn):
+            return [dict(row) for row in conn.execute(LIST_BALANCE_FLAGS_SQL, (company_id, company_id, limit))]
+        return await run_db(fetch_flags)
+    
+    async def balance_chain_heads(self, since_date: str) -> List[dict]:
+        def fetch_heads(conn):
+            return [dict(row) for row in conn.execute(BALANCE_CHAIN_HEADS_SQL, (since_date,))]
+        return await run_db(fetch_heads)
+
+# PostgreSQL 스키마 (schema_migrations에 적용 버전 기록)
+POSTGRES_MIGRATIONS = [
+    # 1: SQLite 스키마(마이그레이션 5까지)와 같은 구조. created_at은 초 단위 UTC
+    """
+    CREATE TABLE IF NOT EXISTS companies (
+        id BIGSERIAL PRIMARY KEY,
+        company_name TEXT NOT NULL,
+        login_id TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        api_key TEXT UNIQUE NOT NULL,
+        bank_name TEXT NOT NULL,
+        account_number TEXT NOT NULL,
+        account_holder TEXT NOT NULL,
+        fee_rate DOUBLE PRECISION DEFAULT 0.03,
+        is_active BOOLEAN DEFAULT TRUE,
+        created_at TIMESTAMP(0) DEFAULT (NOW() AT TIME ZONE 'UTC')
+    );
+    CREATE TABLE IF NOT EXISTS transactions (
+        id BIGSERIAL PRIMARY KEY,
+        company_id BIGINT NOT NULL REFERENCES companies(id),
+        transaction_type TEXT NOT NULL,
+        bank_name TEXT NOT NULL,
+        sender_name TEXT,
+        account_number TEXT,
+        amount DOUBLE PRECISION NOT NULL,
+        balance DOUBLE PRECISION,
+        fee_amount DOUBLE PRECISION DEFAULT 0,
+        raw_message TEXT NOT NULL,
+        is_rolling BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP(0) DEFAULT (NOW() AT TIME ZONE 'UTC'),
+        business_date TEXT,
+        dedup_key TEXT UNIQUE
+    );
+    CREATE INDEX IF NOT EXISTS idx_transactions_company_created ON transactions (company_id, created_at);
+    CREATE INDEX IF NOT EXISTS idx_transactions_business_date ON transactions (business_date, company_id);
+    CREATE TABLE IF NOT EXISTS admins (
+        id BIGSERIAL PRIMARY KEY,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        is_active BOOLEAN DEFAULT TRUE,
+        created_at TIMESTAMP(0) DEFAULT (NOW() AT TIME ZONE 'UTC')
+    );
+    CREATE TABLE IF NOT EXISTS daily_company_stats (
+        business_date TEXT NOT NULL,
+        company_id BIGINT NOT NULL REFERENCES companies(id),
+        deposits DOUBLE PRECISION DEFAULT 0,
+        withdrawals DOUBLE PRECISION DEFAULT 0,
+        fees DOUBLE PRECISION DEFAULT 0,
+        transaction_count INTEGER DEFAULT 0,
+        PRIMARY KEY (business_date, company_id)
+    );
+    """,
+    # 2: 금액을 원 단위 정수로 변환 (SQLite 마이그레이션 6과 같은 규칙)
+    """
+    ALTER TABLE transactions
+        ALTER COLUMN amount TYPE BIGINT USING ROUND(amount),
+        ALTER COLUMN balance TYPE BIGINT USING ROUND(balance),
+        ALTER COLUMN fee_amount TYPE BIGINT USING TRUNC(ROUND(fee_amount::NUMERIC, 6));
+    ALTER TABLE daily_company_stats
+        ALTER COLUMN deposits TYPE BIGINT USING ROUND(deposits),
+        ALTER COLUMN withdrawals TYPE BIGINT USING ROUND(withdrawals),
+        ALTER COLUMN fees TYPE BIGINT USING ROUND(fees);
+    UPDATE daily_company_stats s SET
+        deposits = t.deposits, withdrawals = t.withdrawals, fees = t.fees, transaction_count = t.transaction_count
+    FROM (
+        SELECT
+            business_date, company_id,
+            SUM(CASE WHEN transaction_type = 'deposit' THEN amount ELSE 0 END) as deposits,
+            SUM(CASE WHEN transaction_type = 'withdrawal' THEN amount ELSE 0 END) as withdrawals,
+            SUM(fee_amount) as fees,
+            COUNT(*) as transaction_count
+        FROM transactions
+        GROUP BY business_date, company_id
+    ) t
+    WHERE s.business_date = t.business_date AND s.company_id = t.company_id;
+    """,
+    # 3: raw_message 보관 월 (SQLite 마이그레이션 7)
+    """
+    ALTER TABLE transactions ADD COLUMN archived_month TEXT;
+    """,
+    # 4: 파싱 실패 격리 및 형태별 템플릿 (SQLite 마이그레이션 8)
+    """
+    CREATE TABLE IF NOT EXISTS parse_quarantine (
+        id BIGSERIAL PRIMARY KEY,
+        shape_signature TEXT NOT NULL,
+        shape TEXT NOT NULL,
+        company_id BIGINT,
+        bank_name TEXT,
+        raw_message TEXT NOT NULL,
+        received_at TIMESTAMP(0) DEFAULT (NOW() AT TIME ZONE 'UTC')
+    );
+    CREATE INDEX IF NOT EXISTS idx_parse_quarantine_shape ON parse_quarantine (shape_signature, id);
+    CREATE TABLE IF NOT EXISTS sms_templates (
+        shape_signature TEXT PRIMARY KEY,
+        pattern TEXT NOT NULL,
+        bank_name TEXT,
+        created_at TIMESTAMP(0) DEFAULT (NOW() AT TIME ZONE 'UTC')
+    );
+    """,
+    # 5: 잔액 연쇄 검증 플래그 (SQLite 마이그레이션 9)
+    """
+    CREATE TABLE IF NOT EXISTS balance_flags (
+        id BIGSERIAL PRIMARY KEY,
+        transaction_id BIGINT NOT NULL,
+        previous_transaction_id BIGINT,
+        company_id BIGINT NOT NULL,
+        bank_name TEXT,
+        account_number TEXT,
+        kind TEXT NOT NULL,
+        expected_balance BIGINT,
+        actual_balance BIGINT,
+        difference BIGINT,
+        created_at TIMESTAMP(0) DEFAULT (NOW() AT TIME ZONE 'UTC'),
+        UNIQUE (transaction_id, kind)
+    );
+    CREATE INDEX IF NOT EXISTS idx_balance_flags_company ON balance_flags (company_id, id);
+    """,
+    # 6: 새 거래 조회(since_id)용 업체별 ID 순 인덱스 (SQLite 마이그레이션 10)
+    """
+    CREATE INDEX IF NOT EXISTS idx_transactions_company_id ON transactions (company_id, id);
+    """,
+]
+
+class PostgresRepository(Repository):
+    """
+    PostgreSQL 구현 (asyncpg 연결 풀, 이벤트 루프에서 직접 실행)
+    중복 수신은 dedup_key 고유 인덱스의 ON CONFLICT로 처리해 테이블 잠금 없이 동시 저장 가능
+    """
+    
+    # 여러 행 INSERT 한 문장의 최대 행 수 (자리표시자 32767개 제한 안쪽)
+    insert_chunk_size = 1000
+    
+    def __init__(self, dsn: str, pool_size: int = 8):
+        self.dsn = dsn
+        self.pool_size = pool_size
+        self.pool = None
+        self._insert_sql: Dict[int, str] = {}
+    
+    @staticmethod
+    def _sql(sql: str) -> str:
+        """? 자리표시자를 $1, $2...로 변환"""
+        counter = iter(range(1, sql.count("?") + 1))
+        return re.sub(r"\?", lambda _: f"${next(counter)}", sql)
+    
+    @staticmethod
+    def _row(record) -> dict:
+        row = dict(record)
+        for key, value in row.items():
+            if isinstance(value, datetime):
+                row[key] = value.strftime("%Y-%m-%d %H:%M:%S")
+        return row
+    
+    @staticmethod
+    def _timestamp(value: Any) -> Any:
+        """created_at 비교용 문자열을 datetime으로 변환"""
+        return datetime.fromisoformat(value) if isinstance(value, str) else value
+    
+    async def start(self):
+        import asyncpg  # PostgreSQL 사용 시에만 필요
+        
+        self.pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=self.pool_size)
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                # 여러 워커가 동시에 시작해도 한 번만 적용
+                await conn.execute("SELECT pg_advisory_xact_lock(7979)")
+                await conn.execute("CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY)")
+                version = await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+                for number, script in enumerate(POSTGRES_MIGRATIONS[version:], start=version + 1):
+                    await conn.execute(script)
+                    await conn.execute("INSERT INTO schema_migrations (version) VALUES ($1)", number)
+                    logger.info(f"PostgreSQL 스키마 마이그레이션 {number} 적용")
+                
+                if not await conn.fetchval("SELECT 1 FROM admins WHERE username = $1", "fjrzl7979"):
+                    await conn.execute("""
+                        INSERT INTO admins (username, password_hash) VALUES ($1, $2)
+                        ON CONFLICT (username) DO NOTHING
+                    """, "fjrzl7979", await hash_password_async("79797979"))
+        logger.info("데이터베이스 초기화 완료 (PostgreSQL)")
+    
+    async def close(self):
+        if self.pool:
+            await self.pool.close()
+    
+    async def find_login_accounts(self, username: str) -> List[dict]:
+        with DB_QUERY_SECONDS.time("fetch_accounts"):
+            records = await self.pool.fetch(self._sql(LOGIN_ACCOUNTS_SQL), username, username)
+        return [dict(record) for record in records]
+    
+    async def update_password_hash(self, role: str, account_id: int, password_hash: str):
+        table = "admins" if role == "admin" else "companies"
+        with DB_QUERY_SECONDS.time("update_password_hash"):
+            await self.pool.execute(f"UPDATE {table} SET password_hash = $1 WHERE id = $2", password_hash, account_id)
+    
+    async def create_company(self, values: tuple) -> int:
+        import asyncpg
+        
+        try:
+            with DB_QUERY_SECONDS.time("insert_company"):
+                return await self.pool.fetchval(self._sql(INSERT_COMPANY_SQL), *values)
+        except asyncpg.UniqueViolationError as e:
+            raise DuplicateError(str(e))
+    
+    async def get_company_by_api_key(self, api_key: str) -> Optional[CompanyRecord]:
+        with DB_QUERY_SECONDS.time("fetch_company"):
+            record = await self.pool.fetchrow(self._sql(COMPANY_BY_API_KEY_SQL), api_key)
+        return company_record(record) if record else None
+    
+    async def dashboard_companies(self, business_date: str) -> List[dict]:
+        with DB_QUERY_SECONDS.time("fetch_dashboard"):
+            records = await self.pool.fetch(self._sql(DASHBOARD_COMPANIES_SQL), business_date)
+        return [dict(record) for record in records]
+    
+    def _insert_rows_sql(self, count: int) -> str:
+        """
+        INSERT_TRANSACTION_SQL에 미리 받은 id를 붙이고 VALUES를 count행으로 늘린 문장
+        RETURNING 순서는 보장되지 않으므로 행마다 id를 정해 넣고, 반환된 id로 저장 여부만 확인 (건너뛴 중복 키는 없음)
+        """
+        sql = self._insert_sql.get(count)
+        if sql is None:
+            head, values = INSERT_TRANSACTION_SQL.rsplit("VALUES", 1)
+            head = head.replace("INSERT INTO transactions (", "INSERT INTO transactions (id, ", 1)
+            group = "(?, " + values.strip()[1:]
+            sql = self._sql(
+                f"{head}VALUES {', '.join([group] * count)} "
+                "ON CONFLICT (dedup_key) DO NOTHING RETURNING id"
+            )
+            self._insert_sql[count] = sql
+        return sql
+    
+    async def save_batch(self, batch: "TransactionBatch"):
+        if not batch.rows:
+            return
+        
+        with DB_QUERY_SECONDS.time("insert_transactions"):
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    # 행마다 id를 먼저 받아 두고 (중복으로 건너뛴 행의 번호는 비어 있게 됨)
+                    reserved = [record[0] for record in await conn.fetch(
+                        "SELECT nextval(pg_get_serial_sequence('transactions', 'id')) FROM generate_series(1, $1)",
+                        len(batch.rows)
+                    )]
+                    inserted: set = set()
+                    for start in range(0, len(batch.rows), self.insert_chunk_size):
+                        chunk = batch.rows[start:start + self.insert_chunk_size]
+                        records = await conn.fetch(self._insert_rows_sql(len(chunk)), *[
+                            value for transaction_id, row in zip(reserved[start:], chunk) for value in (transaction_id, *row)
+                        ])
+                        inserted.update(record["id"] for record in records)
+                    
+                    # 이미 저장되어 있던 중복 키 (같은 배치 안의 중복은 먼저 저장된 행)
+                    missing = [
+                        key for key, transaction_id in zip(batch.dedup_keys, reserved) if transaction_id not in inserted
+                    ]
+                    existing: Dict[str, int] = {}
+                    if missing:
+                        existing = {record["dedup_key"]: record["id"] for record in await conn.fetch(
+                            "SELECT id, dedup_key FROM transactions WHERE dedup_key = ANY($1::text[])", missing
+                        )}
+                    
+                    ids = []
+                    for position, (key, transaction_id) in enumerate(zip(batch.dedup_keys, reserved)):
+                        if transaction_id in inserted:
+                            ids.append(transaction_id)
+                        else:
+                            batch.duplicates.add(position)
+                            ids.append(existing[key])
+                    
+                    deposits, withdrawals, fees, count = batch.delta_totals()
+                    if count:
+                        batch.daily_totals = tuple(await conn.fetchrow(
+                            self._sql(UPSERT_DAILY_STATS_SQL),
+                            batch.business_date, batch.company.id, deposits, withdrawals, fees, count
+                        ))
+        batch.ids = ids
+    
+    async def list_transactions(self, company_id: int, limit: int, **filters) -> List[dict]:
+        for name in ("since", "until"):
+            filters[name] = self._timestamp(filters.get(name))
+        if filters.get("page_cursor"):
+            created_at, cursor_id = filters["page_cursor"]
+            filters["page_cursor"] = (self._timestamp(created_at), cursor_id)
+        sql, params = transaction_list_query(company_id, limit, **filters)
+        
+        with DB_QUERY_SECONDS.time("fetch_transactions"):
+            records = await self.pool.fetch(self._sql(sql), *params)
+        return [self._row(record) for record in records]
+    
+    async def get_transaction(self, transaction_id: int) -> Optional[dict]:
+        with DB_QUERY_SECONDS.time("fetch_transaction"):
+            record = await self.pool.fetchrow(self._sql(TRANSACTION_DETAIL_SQL), transaction_id)
+        return self._row(record) if record else None
+    
+    async def stream_transactions(self, start_date: str, end_date: str, company_id: Optional[int] = None,
+                                  include_raw: bool = False,
+                                  chunk_size: int = 1000) -> AsyncIterator[List[dict]]:
+        sql, params = export_query(start_date, end_date, company_id, include_raw)
+        async with self.pool.acquire() as conn:
+            # 서버 측 커서는 트랜잭션 안에서만 유지됨
+            async with conn.transaction():
+                cursor = await conn.cursor(self._sql(sql), *params)
+                while True:
+                    records = await cursor.fetch(chunk_size)
+                    if not records:
+                        break
+                    yield [self._row(record) for record in records]
+    
+    async def quarantine_messages(self, entries: List[tuple]):
+        with DB_QUERY_SECONDS.time("insert_quarantine"):
+            await self.pool.executemany(self._sql(INSERT_QUARANTINE_SQL), entries)
+    
+    async def parse_failure_shapes(self, limit: int) -> List[dict]:
+        with DB_QUERY_SECONDS.time("fetch_parse_failures"):
+            records = await self.pool.fetch(self._sql(PARSE_FAILURE_SHAPES_SQL), limit)
+        return [self._row(record) for record in records]
+    
+    async def quarantine_samples(self, shape_signature: str, limit: int) -> List[str]:
+        with DB_QUERY_SECONDS.time("fetch_samples"):
+            records = await self.pool.fetch(self._sql(QUARANTINE_SAMPLES_SQL), shape_signature, limit)
+        return [record[0] for record in records]
+    
+    async def shape_templates(self) -> List[dict]:
+        records = await self.pool.fetch("SELECT shape_signature, pattern, bank_name FROM sms_templates")
+        return [dict(record) for record in records]
+    
+    async def save_shape_template(self, shape_signature: str, pattern: str, bank_name: Optional[str]):
+        await self.pool.execute(self._sql(UPSERT_SHAPE_TEMPLATE_SQL), shape_signature, pattern, bank_name)
+    
+    async def delete_shape_template(self, shape_signature: str) -> bool:
+        result = await self.pool.execute("DELETE FROM sms_templates WHERE shape_signature = $1", shape_signature)
+        return result != "DELETE 0"
+    
+    async def save_balance_flags(self, flags: List[dict]):
+        with DB_QUERY_SECONDS.time("insert_balance_flags"):
+            await self.pool.executemany(self._sql(INSERT_BALANCE_FLAG_SQL), [
+                tuple(flag[field] for field in BALANCE_FLAG_FIELDS) for flag in flags
+            ])
+    
+    async def list_balance_flags(self, company_id: Optional[int], limit: int) -> List[dict]:
+        with DB_QUERY_SECONDS.time("fetch_balance_flags"):
+            records = await self.pool.fetch(self._sql(LIST_BALANCE_FLAGS_SQL), company_id, company_id, limit)
+        return [self._row(record) for record in records]
+    
+    async def balance_chain_heads(self, since_date: str) -> List[dict]:
+        records = await self.pool.fetch(self._sql(BALANCE_CHAIN_HEADS_SQL), since_date)
+        return [self._row(record) for record in records]
+
+def create_repository(database_url: str) -> Repository:
+    """DATABASE_URL로 저장소 구현 선택"""
+    if database_url.startswith("sqlite:///"):
+        return SQLiteRepository()
+    if database_url.startswith(("postgresql://", "postgres://")):
+        return PostgresRepository(database_url, DB_POOL_SIZE)
+    raise ValueError(f"지원하지 않는 DATABASE_URL입니다: {database_url}")
+
+repository = create_repository(DATABASE_URL)
+
+async def save_balance_flags(flags: List[dict]):
+    """잔액 연쇄 플래그 저장 (모든 워커가 같은 플래그를 저장하며 중복은 무시됨)"""
+    try:
+        await repository.save_balance_flags(flags)
+    except Exception as e:
+        logger.error(f"잔액 연쇄 플래그 저장 실패: {e}")
+
+# 수신 대기열과 프로세스 간 브로드캐스트는 SQLite 연결 풀 위에서 동작
+if db_pool is None and (INGEST_MODE == "queue" or BROADCAST_BACKEND == "sqlite"):
+    raise ValueError("INGEST_MODE=queue, BROADCAST_BACKEND=sqlite는 SQLite DATABASE_URL에서만 지원합니다")
+
+# raw_message 보관 (정산이 끝난 오래된 원문을 월별 압축 파일로 이동)
+
+class RawMessageArchive:
+    """
+    월별 원문 보관 파일 ({directory}/raw_messages_YYYY-MM.ndjson.gz, 줄마다 {"id", "raw_message"})
+    추가 기록은 gzip 멤버를 이어 붙이고 멤버별 "최소ID 최대ID 위치 길이"를 색인 파일(.idx)에 한 줄씩 기록
+    조회는 요청 ID가 든 멤버만 풀어 읽으므로 메모리는 멤버 크기(archive-raw 묶음 단위)를 넘지 않음
+    """
+    
+    def __init__(self, directory: str, cache_members: int = 8):
+        self.directory = directory
+        # (월, 위치) -> {거래 ID: 원문} (멤버는 기록 후 바뀌지 않으므로 무효화 불필요)
+        self.cache = LRUCache(cache_members, ttl=600.0)
+        self._lock = threading.Lock()
+    
+    def path(self, month: str) -> str:
+        return os.path.join(self.directory, f"raw_messages_{month}.ndjson.gz")
+    
+    def index_path(self, month: str) -> str:
+        return os.path.join(self.directory, f"raw_messages_{month}.idx")
+    
+    def append(self, month: str, entries: List[tuple]):
+        """(거래 ID, 원문) 목록을 멤버 하나로 기록하고 색인까지 디스크에 동기화"""
+        os.makedirs(self.directory, exist_ok=True)
+        payload = "".join(
+            json.dumps({"id": transaction_id, "raw_message": raw_message}, ensure_ascii=False) + "\n"
+            for transaction_id, raw_message in entries
+        )
+        data = gzip.compress(payload.encode("utf-8"))
+        with open(self.path(month), "ab") as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # 색인 기록 전에 중단되면 이 멤버는 조회되지 않지만 DB도 갱신 전이므로 재실행 시 다시 기록됨
+        ids = [transaction_id for transaction_id, _ in entries]
+        with open(self.index_path(month), "a", encoding="utf-8") as f:
+            f.write(f"{min(ids)} {max(ids)} {offset} {len(data)}\n")
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def _read_member(self, month: str, offset: int, length: int) -> Dict[int, str]:
+        key = f"{month}:{offset}"
+        with self._lock:
+            messages = self.cache.get(key)
+        if messages is None:
+            with open(self.path(month), "rb") as f:
+                f.seek(offset)
+                data = gzip.decompress(f.read(length)).decode("utf-8")
+            messages = {}
+            for line in data.splitlines():
+                entry = json.loads(line)
+                messages[entry["id"]] = entry["raw_message"]
+            with self._lock:
+                self.cache.put(key, messages)
+        return messages
+    
+    def load(self, month: str, ids: set) -> Dict[int, str]:
+        """
+        ids의 원문 (같은 ID가 여러 번 기록됐으면 마지막 기록)
+        색인이 없는 파일은 처음부터 스트리밍으로 읽으며 ids만 남김
+        """
+        found: Dict[int, str] = {}
+        if not os.path.exists(self.path(month)):
+            return found
+        
+        if not os.path.exists(self.index_path(month)):
+            with gzip.open(self.path(month), "rt", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry["id"] in ids:
+                        found[entry["id"]] = entry["raw_message"]
+            return found
+        
+        with open(self.index_path(month), encoding="utf-8") as f:
+            members = [tuple(map(int, line.split())) for line in f if line.strip()]
+        remaining = set(ids)
+        # 나중에 기록된 멤버부터 찾아 마지막 기록이 우선
+        for low, high, offset, length in reversed(members):
+            wanted = [transaction_id for transaction_id in remaining if low <= transaction_id <= high]
+            if not wanted:
+                continue
+            messages = self._read_member(month, offset, length)
+            for transaction_id in wanted:
+                if transaction_id in messages:
+                    found[transaction_id] = messages[transaction_id]
+                    remaining.discard(transaction_id)
+            if not remaining:
+                break
+        return found
+
+raw_archive = RawMessageArchive(ARCHIVE_DIR, ARCHIVE_CACHE_MEMBERS)
+
+async def restore_raw_messages(rows: List[dict]) -> List[dict]:
+    """보관된 거래의 raw_message를 보관 파일에서 채우고 archived_month 키 제거"""
+    archived: Dict[str, List[dict]] = {}
+    for row in rows:
+        month = row.pop("archived_month", None)
+        if month:
+            archived.setdefault(month, []).append(row)
+    
+    loop = asyncio.get_running_loop()
+    for month, month_rows in archived.items():
+        messages = await loop.run_in_executor(
+            None, raw_archive.load, month, {row["id"] for row in month_rows}
+        )
+        for row in month_rows:
+            row["raw_message"] = messages.get(row["id"])
+    return rows
+
+def archive_raw_messages(conn: sqlite3.Connection, before_date: str, archive: RawMessageArchive,
+                         chunk_size: int = 5000) -> Dict[str, int]:
+    """
+    영업일이 before_date 이전인 거래의 원문을 월별 보관 파일로 옮기고 DB에서는 비움 (월별 이동 건수 반환)
+    파일 기록(fsync) 후 DB를 갱신하므로 중간에 중단돼도 원문은 잃지 않음 (재실행 시 중복 기록은 읽을 때 무시)
+    """
+    moved: Dict[str, int] = {}
+    while True:
+        rows = conn.execute("""
+            SELECT id, business_date, raw_message FROM transactions
+            WHERE business_date < ? AND archived_month IS NULL
+            ORDER BY id
+            LIMIT ?
+        """, (before_date, chunk_size)).fetchall()
+        if not rows:
+            return moved
+        
+        by_month: Dict[str, List[tuple]] = {}
+        for row in rows:
+            by_month.setdefault(row["business_date"][:7], []).append((row["id"], row["raw_message"]))
+        
+        for month, entries in by_month.items():
+            archive.append(month, entries)
+            conn.executemany(
+                "UPDATE transactions SET raw_message = '', archived_month = ? WHERE id = ?",
+                [(month, transaction_id) for transaction_id, _ in entries]
+            )
+            moved[month] = moved.get(month, 0) + len(entries)
+        conn.commit()
+
+def reconcile_balances(conn: sqlite3.Connection, since_date: Optional[str] = None,
+                       chunk_size: int = 1000, restart: bool = False) -> Dict[str, Any]:
+    """
+    거래를 ID 순으로 chunk_size씩 읽으며 잔액 연쇄 일괄 검증 (실시간 검증과 같은 규칙)
+    since_date가 있으면 그 영업일부터 연쇄를 새로 시작, 기존 플래그는 유지
+    묶음마다 플래그와 진행 위치(마지막 ID)를 커밋하므로 쓰기 잠금은 묶음 하나 동안만 잡음
+    중단 후 같은 since_date로 다시 실행하면 진행 위치부터 이어서 검증 (restart=True면 처음부터)
+    연쇄 상태는 저장하지 않고 진행 위치까지의 계좌별 마지막 거래로 복원
+    """
+    progress = None if restart else conn.execute(
+        "SELECT since_date, last_id, checked, flags FROM balance_reconcile_progress WHERE id = 1"
+    ).fetchone()
+    if progress is not None and progress["since_date"] != since_date:
+        progress = None
+    
+    reconciler = BalanceChainReconciler()
+    last_id, checked, kinds = 0, 0, {}
+    if progress is not None:
+        last_id, checked, kinds = progress["last_id"], progress["checked"], json.loads(progress["flags"])
+        reconciler.load([dict(row) for row in conn.execute(BALANCE_CHAIN_HEADS_UNTIL_SQL, (since_date or "", last_id))])
+    
+    sql = f"SELECT {', '.join(BALANCE_CHAIN_COLUMNS)} FROM transactions WHERE id > ?"
+    if since_date:
+        sql += " AND business_date >= ?"
+    while True:
+        params = (last_id, since_date) if since_date else (last_id,)
+        rows = conn.execute(sql + " ORDER BY id LIMIT ?", (*params, chunk_size)).fetchall()
+        if not rows:
+            break
+        
+        flags = []
+        for row in rows:
+            flag = reconciler.check(row)
+            if flag is not None:
+                kinds[flag["kind"]] = kinds.get(flag["kind"], 0) + 1
+                flags.append(tuple(flag[field] for field in BALANCE_FLAG_FIELDS))
+        checked += len(rows)
+        last_id = rows[-1]["id"]
+        conn.executemany(INSERT_BALANCE_FLAG_SQL, flags)
+        conn.execute("""
+            INSERT OR REPLACE INTO balance_reconcile_progress (id, since_date, last_id, checked, flags, updated_at)
+            VALUES (1, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (since_date, last_id, checked, json.dumps(kinds)))
+        conn.commit()
+    
+    conn.execute("DELETE FROM balance_reconcile_progress")
+    conn.commit()
+    return {
+        "since_date": since_date,
+        "resumed_from": progress["last_id"] if progress is not None else None,
+        "checked": checked,
+        "chains": len(reconciler.heads),
+        "flags": kinds
+    }
+
+# 일일 집계 재계산/검증
+DAILY_STATS_FROM_TRANSACTIONS_SQL = """
+    SELECT
+        business_date, company_id,
+        SUM(CASE WHEN transaction_type = 'deposit' THEN amount ELSE 0 END) as deposits,
+        SUM(CASE WHEN transaction_type = 'withdrawal' THEN amount ELSE 0 END) as withdrawals,
+        SUM(fee_amount) as fees,
+        COUNT(*) as transaction_count
+    FROM transactions
+    WHERE (:business_date IS NULL OR business_date = :business_date)
+    GROUP BY business_date, company_id
+"""
+
+def reconcile_daily_stats(conn: sqlite3.Connection, business_date: Optional[str] = None,
+                          fix: bool = False) -> List[Dict[str, Any]]:
+    """
+    원본 거래에서 일일 집계를 다시 계산해 저장된 값과 비교
+    fix=True이면 불일치한 (영업일, 업체) 행을 재계산 값으로 교체
+    """
+    params = {"business_date": business_date}
+    expected = {
+        (row["business_date"], row["company_id"]): row
+        for row in conn.execute(DAILY_STATS_FROM_TRANSACTIONS_SQL, params)
+    }
+    stored = {
+        (row["business_date"], row["company_id"]): row
+        for row in conn.execute("""
+            SELECT business_date, company_id, deposits, withdrawals, fees, transaction_count
+            FROM daily_company_stats
+            WHERE (:business_date IS NULL OR business_date = :business_date)
+        """, params)
+    }
+    
+    mismatches = []
+    for key in expected.keys() | stored.keys():
+        exp, got = expected.get(key), stored.get(key)
+        columns = ("deposits", "withdrawals", "fees", "transaction_count")
+        if exp and got and all((exp[c] or 0) == (got[c] or 0) for c in columns):
+            continue
+        mismatches.append({
+            "business_date": key[0],
+            "company_id": key[1],
+            "expected": {c: exp[c] for c in columns} if exp else None,
+            "stored": {c: got[c] for c in columns} if got else None
+        })
+    
+    if fix and mismatches:
+        for item in mismatches:
+            conn.execute(
+                "DELETE FROM daily_company_stats WHERE business_date = ? AND company_id = ?",
+                (item["business_date"], item["company_id"])
+            )
+            if item["expected"]:
+                conn.execute("""
+                    INSERT INTO daily_company_stats (
+                        business_date, company_id, deposits, withdrawals, fees, transaction_count
+                    ) VALUES (?, ?, ?, ?, ?, ?)
+                """, (item["business_date"], item["company_id"], *item["expected"].values()))
+        conn.commit()
+    
+    return mismatches
+
+SETTLEMENT_ROWS_SQL = """
+    SELECT t.id, t.company_id, t.transaction_type, t.amount, t.fee_amount, c.fee_rate
+    FROM transactions t
+    JOIN companies c ON c.id = t.company_id
+    WHERE t.business_date = ?
+    ORDER BY t.company_id, t.id
+"""
+
+def settle_columns(company_ids: List[int], types: List[str], amounts: List[int],
+                   rates_ppm: List[int]) -> tuple:
+    """
+    하루치 거래를 열(column) 단위로 한 번에 정산
+    반환: (행별 수수료 열, 업체별 {deposits, withdrawals, fees, transaction_count})
+    """
+    deposits = [amount if kind == "deposit" else 0 for kind, amount in zip(types, amounts)]
+    withdrawals = [amount if kind == "withdrawal" else 0 for kind, amount in zip(types, amounts)]
+    fees = [amount * rate // FEE_RATE_SCALE for amount, rate in zip(deposits, rates_ppm)]
+    
+    # 업체 순으로 정렬된 입력을 구간별로 합산
+    totals: Dict[int, Dict[str, int]] = {}
+    start = 0
+    for end in range(1, len(company_ids) + 1):
+        if end == len(company_ids) or company_ids[end] != company_ids[start]:
+            totals[company_ids[start]] = {
+                "deposits": sum(deposits[start:end]),
+                "withdrawals": sum(withdrawals[start:end]),
+                "fees": sum(fees[start:end]),
+                "transaction_count": end - start
+            }
+            start = end
+    return fees, totals
+
+def settle_business_day(conn: sqlite3.Connection, business_date: str) -> Dict[str, Any]:
+    """
+    영업일 정산 일괄 계산 후 저장된 행별 수수료 및 일일 집계와 대조
+    현재 수수료율로 계산하므로 당일 수수료율이 바뀐 업체는 행별 불일치로 표시됨
+    """
+    rows = conn.execute(SETTLEMENT_ROWS_SQL, (business_date,)).fetchall()
+    ids = [row["id"] for row in rows]
+    company_ids = [row["company_id"] for row in rows]
+    stored_fees = [row["fee_amount"] for row in rows]
+    fees, totals = settle_columns(
+        company_ids,
+        [row["transaction_type"] for row in rows],
+        [row["amount"] for row in rows],
+        [fee_rate_ppm(row["fee_rate"]) for row in rows]
+    )
+    
+    fee_mismatches = [
+        {"id": transaction_id, "company_id": company_id, "expected": fee, "stored": stored}
+        for transaction_id, company_id, fee, stored in zip(ids, company_ids, fees, stored_fees)
+        if fee != stored
+    ]
+    stats = {
+        row["company_id"]: {column: row[column] for column in ("deposits", "withdrawals", "fees", "transaction_count")}
+        for row in conn.execute("""
+            SELECT company_id, deposits, withdrawals, fees, transaction_count
+            FROM daily_company_stats WHERE business_date = ?
+        """, (business_date,))
+    }
+    # 집계 테이블은 저장된 행별 수수료의 합이므로 수수료 대신 저장값 합계로 비교
+    stored_fee_sums: Dict[int, int] = {}
+    for company_id, stored in zip(company_ids, stored_fees):
+        stored_fee_sums[company_id] = stored_fee_sums.get(company_id, 0) + (stored or 0)
+    stats_mismatches = [
+        company_id for company_id in totals.keys() | stats.keys()
+        if company_id not in totals or stats.get(company_id) != {
+            **totals[company_id], "fees": stored_fee_sums[company_id]
+        }
+    ]
+    
+    return {
+        "business_date": business_date,
+        "companies": totals,
+        "fee_mismatches": fee_mismatches,
+        "stats_mismatches": sorted(stats_mismatches)
+    }
+
+# 수신 대기열 (INGEST_MODE=queue)
+class IngestQueue:
+    """
+    SMS 수신 영구 대기열
+    웹훅은 원본만 ingest_queue에 저장하고 즉시 응답, 백그라운드 워커가 일괄 파싱/저장/알림 처리
+    """
+    
+    def __init__(self, workers: int = 2, batch_size: int = 100, poll_interval: float = 0.5,
+                 claim_timeout: int = 300, max_attempts: int = 5, retention_hours: int = 24):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self.max_attempts = max_attempts
+        self.retention_hours = retention_hours
+        self.processed = 0
+        self.failed = 0
+        self.last_batch_seconds = 0.0
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+    
+    async def enqueue(self, api_key: str, items: List[SMSWebhookData]) -> List[int]:
+        """원본 저장 후 대기열 ID 반환"""
+        payloads = [
+            (api_key, json.dumps({"date": data.date, "from": data.from_, "to": data.to, "message": data.message},
+                                 ensure_ascii=False))
+            for data in items
+        ]
         
-        return result
-
-# WebSocket 매니저
-class WebSocketManager:
-    def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+        def insert_payloads(conn):
+            cursor = conn.cursor()
+            cursor.executemany("INSERT INTO ingest_queue (api_key, payload) VALUES (?, ?)", payloads)
+            cursor.execute("SELECT last_insert_rowid()")
+            last_id = cursor.fetchone()[0]
+            conn.commit()
+            return list(range(last_id - len(payloads) + 1, last_id + 1))
+        
+        queue_ids = await run_db(insert_payloads)
+        self._wakeup.set()
+        return queue_ids
     
-    async def connect(self, websocket: WebSocket, channel: str):
-        await websocket.accept()
-        if channel not in self.active_connections:
-            self.active_connections[channel] = []
-        self.active_connections[channel].append(websocket)
+    async def start(self):
+        await run_db(self._maintain)
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
     
-    def disconnect(self, websocket: WebSocket, channel: str):
-        if channel in self.active_connections:
-            if websocket in self.active_connections[channel]:
-                self.active_connections[channel].remove(websocket)
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
     
-    async def broadcast_to_channel(self, channel: str, message: dict):
-        if channel in self.active_connections:
-            dead_connections = []
-            for connection in self.active_connections[channel]:
-                try:
-                    await connection.send_json(message)
-                except:
-                    dead_connections.append(connection)
+    async def _worker(self, number: int):
+        last_maintenance = time.monotonic()
+        while True:
+            try:
+                handled = await self.process_batch()
+                if number == 0 and time.monotonic() - last_maintenance > 60:
+                    await run_db(self._maintain)
+                    last_maintenance = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"수신 대기열 처리 실패: {e}")
+                handled = 0
             
-            # 죽은 연결 제거
-            for dead_conn in dead_connections:
-                self.active_connections[channel].remove(dead_conn)
+            # 대기열이 비었으면 새 메시지 또는 폴링 주기까지 대기 (다른 워커 프로세스가 넣은 메시지 대비)
+            if handled < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+    
+    def _maintain(self, conn: sqlite3.Connection):
+        """처리 중 멈춘 항목 재시도 전환, 오래된 완료 항목 정리"""
+        conn.execute("""
+            UPDATE ingest_queue
+            SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                error = CASE WHEN attempts >= ? THEN 'max_attempts' ELSE error END
+            WHERE status = 'processing' AND claimed_at < datetime('now', ?)
+        """, (self.max_attempts, self.max_attempts, f"-{self.claim_timeout} seconds"))
+        conn.execute("""
+            DELETE FROM ingest_queue
+            WHERE status IN ('done', 'duplicate', 'failed') AND processed_at < datetime('now', ?)
+        """, (f"-{self.retention_hours} hours",))
+        conn.commit()
+    
+    def _claim(self, conn: sqlite3.Connection) -> List[sqlite3.Row]:
+        rows = conn.execute("""
+            UPDATE ingest_queue
+            SET status = 'processing', claimed_at = CURRENT_TIMESTAMP, attempts = attempts + 1
+            WHERE id IN (
+                SELECT id FROM ingest_queue WHERE status = 'pending' ORDER BY id LIMIT ?
+            )
+            RETURNING id, api_key, payload
+        """, (self.batch_size,)).fetchall()
+        conn.commit()
+        return sorted(rows, key=lambda row: row["id"])
+    
+    async def process_batch(self) -> int:
+        """대기 항목 최대 batch_size건 처리 후 처리 건수 반환"""
+        rows = await run_db(self._claim)
+        if not rows:
+            return 0
+        started = time.perf_counter()
+        
+        groups: Dict[str, List[sqlite3.Row]] = {}
+        for row in rows:
+            groups.setdefault(row["api_key"], []).append(row)
+        
+        business_date = business_date_today()
+        batches = []  # (TransactionBatch, 대기열 행, 배치 내 위치)
+        invalid_ids = []
+        for api_key, group in groups.items():
+            company = await get_company_by_api_key(api_key)
+            if not company or not company.is_active:
+                invalid_ids.extend(row["id"] for row in group)
+                continue
+            batch = TransactionBatch(company, business_date)
+            positions = []  # (배치 내 위치, 배치 내 첫 등장 여부)
+            for row in group:
+                payload = json.loads(row["payload"])
+                dedup_key = webhook_dedup_key(api_key, payload["date"], payload["from"], payload["message"])
+                rows_before = len(batch.rows)
+                position = batch.add(payload["message"], dedup_key)
+                positions.append((position, len(batch.rows) > rows_before))
+            batches.append((batch, group, positions))
+        
+        def store(conn):
+            updates = [("failed", None, "invalid_api_key", queue_id) for queue_id in invalid_ids]
+            for batch, group, positions in batches:
+                batch.save(conn)
+                conn.executemany(INSERT_QUARANTINE_SQL, batch.failures)
+                for row, (position, first_seen) in zip(group, positions):
+                    if position is None:
+                        updates.append(("failed", None, "parsing_failed", row["id"]))
+                    elif not first_seen or position in batch.duplicates:
+                        updates.append(("duplicate", batch.transaction_id(position), None, row["id"]))
+                    else:
+                        updates.append(("done", batch.transaction_id(position), None, row["id"]))
+            conn.executemany("""
+                UPDATE ingest_queue
+                SET status = ?, transaction_id = ?, error = ?, processed_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, updates)
+            conn.commit()
+        
+        await run_db(store)
+        for batch, _, _ in batches:
+            batch.remember_keys()
+        await publish_dashboard_update(business_date, [batch.dashboard_row() for batch, _, _ in batches])
+        await publish_balance_rows([row for batch, _, _ in batches for row in batch.balance_rows()])
+        
+        # 채널별로 한 번만 알림
+        admin_events = []
+        for batch, _, _ in batches:
+            events = batch.events()
+            if events:
+                admin_events.extend(events)
+                await manager.broadcast_to_channel(
+                    f"company_{batch.company.id}", {"type": "new_transactions", "data": events}
+                )
+        if admin_events:
+            await manager.broadcast_to_channel("admin", {"type": "new_transactions", "data": admin_events})
+        
+        self.processed += len(admin_events)
+        self.failed += len(invalid_ids) + sum(
+            1 for _, _, positions in batches for position, _ in positions if position is None
+        )
+        self.last_batch_seconds = time.perf_counter() - started
+        return len(rows)
+    
+    async def stats(self) -> Dict[str, Any]:
+        def fetch_stats(conn):
+            return conn.execute("""
+                SELECT
+                    COUNT(*) as depth,
+                    SUM(CASE WHEN status = 'processing' THEN 1 ELSE 0 END) as processing,
+                    (julianday('now') - julianday(MIN(received_at))) * 86400 as lag_seconds
+                FROM ingest_queue
+                WHERE status IN ('pending', 'processing')
+            """).fetchone()
+        
+        row = await run_db(fetch_stats)
+        return {
+            "mode": INGEST_MODE,
+            "depth": row["depth"],
+            "processing": row["processing"] or 0,
+            "lag_seconds": round(row["lag_seconds"] or 0.0, 3),
+            "processed": self.processed,
+            "failed": self.failed,
+            "last_batch_seconds": round(self.last_batch_seconds, 4),
+            "workers": len(self._tasks)
+        }
 
-manager = WebSocketManager()
+ingest_queue = IngestQueue(INGEST_WORKERS, INGEST_BATCH_SIZE, INGEST_POLL_INTERVAL)
 
-# 유틸리티 함수들
-def hash_password(password: str) -> str:
-    """비밀번호 해시"""
-    return hashlib.sha256(password.encode()).hexdigest()
+# 인증 의존성
+security = HTTPBearer()
 
-def verify_password(password: str, hashed: str) -> bool:
-    """비밀번호 검증"""
-    return hash_password(password) == hashed
+# 검증된 토큰 클레임 캐시 (항목별로 토큰 만료 시각까지만 유효)
+token_claims_cache = LRUCache(TOKEN_CACHE_SIZE, ttl=3600)
 
-def generate_api_key() -> str:
-    """API 키 생성"""
-    return secrets.token_urlsafe(32)
+def verify_token(token: str) -> dict:
+    """JWT 검증 (캐시 적중 시 서명 검증 생략)"""
+    cached = token_claims_cache.get(token)
+    if cached and cached["exp"] > time.time():
+        return cached
+    
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        token_claims_cache.invalidate(token)
+        raise HTTPException(status_code=401, detail="토큰이 만료되었습니다")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="유효하지 않은 토큰입니다")
+    
+    if "exp" in payload:
+        token_claims_cache.put(token, payload)
+    return payload
 
-def create_jwt_token(data: dict) -> str:
-    """JWT 토큰 생성"""
-    expire = datetime.utcnow() + timedelta(hours=24)
-    data.update({"exp": expire})
-    return jwt.encode(data, JWT_SECRET, algorithm="HS256")
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """현재 사용자 확인"""
+    return verify_token(credentials.credentials)
 
-@contextmanager
-def get_db():
-    """데이터베이스 연결"""
-    conn = sqlite3.connect("settlement.db")
-    conn.row_factory = sqlite3.Row
+async def reject_websocket(websocket: WebSocket, code: int):
+    """
+    핸드셰이크를 수락한 뒤 종료 코드로 닫음
+    수락 전에 닫으면 서버가 HTTP 403으로 응답해 브라우저는 종료 코드 없이 1006만 받음
+    """
+    await websocket.accept()
+    await websocket.close(code=code)
+
+async def close_websocket(websocket: WebSocket, code: int = 1000):
+    """소켓 종료 (이미 닫힌 소켓은 건너뜀, 전송 실패는 무시)"""
+    if websocket.application_state != WebSocketState.CONNECTED:
+        return
     try:
-        yield conn
-    finally:
-        conn.close()
+        await websocket.close(code=code)
+    except Exception:
+        pass
 
-# 인증 의존성
-security = HTTPBearer()
+async def authenticate_websocket(websocket: WebSocket, company_id: Optional[int] = None) -> Optional[dict]:
+    """
+    WebSocket 핸드셰이크 인증 (?token=JWT)
+    관리자는 모든 채널, 업체는 자기 채널만 구독 가능. 실패 시 1008(정책 위반)로 닫고 None 반환
+    """
+    try:
+        claims = verify_token(websocket.query_params.get("token", ""))
+    except HTTPException:
+        await reject_websocket(websocket, 1008)
+        return None
+    
+    role = claims.get("role")
+    if role != "admin" and not (role == "company" and company_id is not None and claims.get("company_id") == company_id):
+        await reject_websocket(websocket, 1008)
+        return None
+    return claims
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """현재 사용자 확인"""
+async def serve_websocket(websocket: WebSocket, channel: str, claims: dict):
+    """채널 구독 유지 (토큰 만료 시 연결 종료), 재연결 시 ?last_seq=N&epoch=E로 누락분 이어받기"""
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=["HS256"])
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="토큰이 만료되었습니다")
-    except jwt.JWTError:
-        raise HTTPException(status_code=401, detail="유효하지 않은 토큰입니다")
+        last_seq = int(websocket.query_params["last_seq"])
+    except (KeyError, ValueError):
+        last_seq = None
+    connection = await manager.connect(websocket, channel, last_seq, websocket.query_params.get("epoch"))
+    if not connection:
+        return
+    close_code = None
+    try:
+        # 하트비트 정리 등으로 서버가 소켓을 닫으면 더 받지 않음
+        while websocket.application_state == WebSocketState.CONNECTED:
+            remaining = claims["exp"] - time.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            data = await asyncio.wait_for(websocket.receive_text(), remaining)
+            # 클라이언트 메시지(pong 등)는 생존 신호로 사용
+            connection.touch()
+            # 순번 누락을 감지한 클라이언트는 resync로 스냅샷 재요청
+            try:
+                message = json.loads(data)
+            except ValueError:
+                continue
+            if isinstance(message, dict) and message.get("type") == "resync":
+                manager.send_snapshot(connection, channel, reason="resync")
+    except asyncio.TimeoutError:
+        close_code = 1008  # 토큰 만료
+    except WebSocketDisconnect:
+        pass
+    finally:
+        manager.disconnect(websocket, channel)
+        # 하트비트가 이미 닫은 소켓은 다시 닫지 않음
+        if close_code:
+            await close_websocket(websocket, close_code)
 
 # API 엔드포인트들
 
@@ -315,48 +3399,61 @@ async def root():
         "docs": "/docs"
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 메트릭"""
+    return PlainTextResponse(
+        "".join(metric.render() for metric in metrics_registry),
+        media_type="text/plain; version=0.0.4"
+    )
+
 @app.post("/api/auth/login")
 async def login(request: LoginRequest):
     """로그인 (관리자/업체 통합)"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        # 관리자 확인
-        cursor.execute("SELECT * FROM admins WHERE username = ?", (request.username,))
-        admin = cursor.fetchone()
-        
-        if admin and verify_password(request.password, admin["password_hash"]):
-            token = create_jwt_token({
-                "user_id": admin["id"],
-                "username": admin["username"],
-                "role": "admin"
-            })
-            return {
-                "access_token": token,
-                "token_type": "bearer",
-                "role": "admin",
-                "redirect": "/admin"
-            }
-        
-        # 업체 확인
-        cursor.execute("SELECT * FROM companies WHERE login_id = ?", (request.username,))
-        company = cursor.fetchone()
-        
-        if company and verify_password(request.password, company["password_hash"]):
-            token = create_jwt_token({
-                "user_id": company["id"],
-                "username": company["login_id"],
-                "role": "company",
-                "company_id": company["id"]
-            })
-            return {
-                "access_token": token,
-                "token_type": "bearer",
-                "role": "company",
-                "redirect": "/company"
-            }
-        
+    # 관리자 → 업체 순으로 한 번에 조회
+    accounts = await repository.find_login_accounts(request.username)
+    
+    account = None
+    for candidate in accounts or [None]:
+        verified, new_hash = await verify_password_async(
+            request.username, request.password, candidate["password_hash"] if candidate else None
+        )
+        if verified:
+            account = candidate
+            break
+    
+    if not account:
         raise HTTPException(status_code=401, detail="잘못된 로그인 정보입니다")
+    
+    # 기존 SHA-256 해시 등은 bcrypt로 교체
+    if new_hash:
+        await repository.update_password_hash(account["role"], account["id"], new_hash)
+    
+    if account["role"] == "admin":
+        token = create_jwt_token({
+            "user_id": account["id"],
+            "username": account["login"],
+            "role": "admin"
+        })
+        return {
+            "access_token": token,
+            "token_type": "bearer",
+            "role": "admin",
+            "redirect": "/admin"
+        }
+    
+    token = create_jwt_token({
+        "user_id": account["id"],
+        "username": account["login"],
+        "role": "company",
+        "company_id": account["id"]
+    })
+    return {
+        "access_token": token,
+        "token_type": "bearer",
+        "role": "company",
+        "redirect": "/company"
+    }
 
 @app.post("/api/admin/companies")
 async def create_company(company_data: CompanyCreate, current_user: dict = Depends(get_current_user)):
@@ -365,52 +3462,65 @@ async def create_company(company_data: CompanyCreate, current_user: dict = Depen
         raise HTTPException(status_code=403, detail="관리자만 접근 가능합니다")
     
     api_key = generate_api_key()
-    password_hash = hash_password(company_data.password)
+    password_hash = await hash_password_async(company_data.password)
     
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                INSERT INTO companies (
-                    company_name, login_id, password_hash, api_key,
-                    bank_name, account_number, account_holder, fee_rate
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                company_data.company_name,
-                company_data.login_id,
-                password_hash,
-                api_key,
-                company_data.bank_name,
-                company_data.account_number,
-                company_data.account_holder,
-                company_data.fee_rate
-            ))
-            
-            company_id = cursor.lastrowid
-            conn.commit()
-            
-            # WebSocket으로 관리자에게 알림
-            await manager.broadcast_to_channel("admin", {
-                "type": "company_created",
-                "data": {
-                    "id": company_id,
-                    "company_name": company_data.company_name,
-                    "api_key": api_key
-                }
-            })
-            
-            return {
-                "id": company_id,
-                "company_name": company_data.company_name,
-                "login_id": company_data.login_id,
-                "api_key": api_key,
-                "webhook_url": f"/api/webhook/{api_key}",
-                "created_at": datetime.now().isoformat()
-            }
-            
-        except sqlite3.IntegrityError:
-            raise HTTPException(status_code=400, detail="이미 존재하는 로그인 ID입니다")
+    try:
+        company_id = await repository.create_company((
+            company_data.company_name,
+            company_data.login_id,
+            password_hash,
+            api_key,
+            company_data.bank_name,
+            company_data.account_number,
+            company_data.account_holder,
+            company_data.fee_rate
+        ))
+    except DuplicateError:
+        raise HTTPException(status_code=400, detail="이미 존재하는 로그인 ID입니다")
+    
+    # 새 API 키는 아직 어느 워커의 캐시에도 없으므로 무효화 불필요
+    await publish_dashboard_update(business_date_today(), [{
+        "id": company_id,
+        "company_name": company_data.company_name,
+        "login_id": company_data.login_id,
+        "fee_rate": company_data.fee_rate,
+        "api_key": api_key,
+        "today_deposits": 0,
+        "today_withdrawals": 0,
+        "today_fees": 0,
+        "today_transactions": 0
+    }])
+    
+    # WebSocket으로 관리자에게 알림
+    await manager.broadcast_to_channel("admin", {
+        "type": "company_created",
+        "data": {
+            "id": company_id,
+            "company_name": company_data.company_name,
+            "api_key": api_key
+        }
+    })
+    
+    return {
+        "id": company_id,
+        "company_name": company_data.company_name,
+        "login_id": company_data.login_id,
+        "api_key": api_key,
+        "webhook_url": f"/api/webhook/{api_key}",
+        "created_at": datetime.now().isoformat()
+    }
+
+async def get_company_by_api_key(api_key: str) -> Optional[CompanyRecord]:
+    """API 키로 업체 조회 (캐시 우선)"""
+    company = company_cache.get(api_key)
+    if company:
+        return company
+    
+    company = await repository.get_company_by_api_key(api_key)
+    if not company:
+        return None
+    company_cache.put(api_key, company)
+    return company
 
 @app.post("/api/webhook/{api_key}")
 async def receive_sms(api_key: str, data: SMSWebhookData):
@@ -420,108 +3530,132 @@ async def receive_sms(api_key: str, data: SMSWebhookData):
     """
     
     # API 키로 업체 확인
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM companies WHERE api_key = ? AND is_active = 1", (api_key,))
-        company = cursor.fetchone()
-        
-        if not company:
-            raise HTTPException(status_code=404, detail="Invalid API key")
-        
-        # SMS 파싱
-        parsed_data = SMSParser.parse_message(data.message)
-        
-        if not parsed_data["parsed"]:
-            logger.warning(f"SMS 파싱 실패: {data.message}")
-            return {"status": "failed", "reason": "parsing_failed"}
-        
-        # 수수료 계산
-        fee_amount = parsed_data["amount"] * company["fee_rate"] if parsed_data["transaction_type"] == "deposit" else 0.0
-        
-        # 롤링 여부 확인 (지정계좌)
-        is_rolling = False
-        if parsed_data["sender_name"] and company["account_holder"] in parsed_data["sender_name"]:
-            is_rolling = True
-        
-        # 거래 저장
-        cursor.execute("""
-            INSERT INTO transactions (
-                company_id, transaction_type, bank_name, sender_name,
-                account_number, amount, balance, fee_amount, raw_message, is_rolling
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            company["id"],
-            parsed_data["transaction_type"],
-            parsed_data["bank_name"],
-            parsed_data["sender_name"],
-            parsed_data["account_number"],
-            parsed_data["amount"],
-            parsed_data["balance"],
-            fee_amount,
-            data.message,
-            is_rolling
-        ))
-        
-        transaction_id = cursor.lastrowid
-        conn.commit()
-        
+    with INGEST_STAGE_SECONDS.time("company_lookup"):
+        company = await get_company_by_api_key(api_key)
+    
+    if not company or not company.is_active:
+        raise HTTPException(status_code=404, detail="Invalid API key")
+    
+    # 대기열 모드: 원본만 저장하고 즉시 응답 (최근 중복은 바로 응답, 나머지는 워커가 확인)
+    if INGEST_MODE == "queue":
+        cached_id = recent_dedup_keys.get(webhook_dedup_key(api_key, data.date, data.from_, data.message))
+        if cached_id is not None:
+            return {"status": "duplicate", "transaction_id": cached_id}
+        queue_ids = await ingest_queue.enqueue(api_key, [data])
+        return JSONResponse(status_code=202, content={"status": "queued", "queue_id": queue_ids[0]})
+    
+    # 파싱, 중복 확인, 거래 저장 및 일일 집계 갱신
+    results, events = await ingest_webhook_items(api_key, company, [data])
+    result = results[0]
+    
+    if result["status"] == "duplicate":
+        logger.info(f"중복 SMS 무시: transaction_id={result['transaction_id']}")
+    
+    if events:
         # WebSocket 실시간 알림
-        transaction_data = {
-            "type": "new_transaction",
-            "data": {
-                "id": transaction_id,
-                "company_id": company["id"],
-                "transaction_type": parsed_data["transaction_type"],
-                "bank_name": parsed_data["bank_name"],
-                "sender_name": parsed_data["sender_name"],
-                "amount": parsed_data["amount"],
-                "balance": parsed_data["balance"],
-                "fee_amount": fee_amount,
-                "is_rolling": is_rolling,
-                "created_at": datetime.now().isoformat()
-            }
-        }
+        transaction_data = {"type": "new_transaction", "data": events[0]}
         
         # 관리자와 해당 업체에 알림
-        await manager.broadcast_to_channel("admin", transaction_data)
-        await manager.broadcast_to_channel(f"company_{company['id']}", transaction_data)
-        
-        return {"status": "success", "transaction_id": transaction_id}
+        with INGEST_STAGE_SECONDS.time("broadcast_admin"):
+            await manager.broadcast_to_channel("admin", transaction_data)
+        with INGEST_STAGE_SECONDS.time("broadcast_company"):
+            await manager.broadcast_to_channel(f"company_{company.id}", transaction_data)
+    
+    return result
+
+@app.post("/api/webhook/{api_key}/batch")
+async def receive_sms_batch(api_key: str, items: List[SMSWebhookData]):
+    """
+    SMS 웹훅 일괄 수신 (전달 앱이 쌓아둔 문자를 한 번에 재전송할 때 사용)
+    전체를 하나의 트랜잭션으로 저장하고 항목별 결과를 반환
+    최대 WEBHOOK_MAX_BATCH_SIZE건 (초과 시 413), API 키 수신 제한은 항목 수만큼 차감 (최대 버스트 크기)
+    """
+    if len(items) > WEBHOOK_MAX_BATCH_SIZE:
+        WEBHOOK_REJECTED.inc("batch_too_large")
+        raise HTTPException(
+            status_code=413,
+            detail=f"한 번에 최대 {WEBHOOK_MAX_BATCH_SIZE}건까지 보낼 수 있습니다 (받은 건수: {len(items)})"
+        )
+    # 미들웨어가 요청 1건분을 이미 차감했으므로 나머지 항목분만 추가 차감
+    extra = min(len(items), webhook_key_limiter.burst) - 1
+    wait = webhook_key_limiter.acquire(api_key, extra) if extra > 0 else 0
+    if wait:
+        WEBHOOK_REJECTED.inc("key_rate_limited")
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "요청이 너무 많습니다", "reason": "key_rate_limited"},
+            headers={"Retry-After": str(max(1, math.ceil(wait)))}
+        )
+    
+    with INGEST_STAGE_SECONDS.time("company_lookup"):
+        company = await get_company_by_api_key(api_key)
+    
+    if not company or not company.is_active:
+        raise HTTPException(status_code=404, detail="Invalid API key")
+    
+    # 대기열 모드: 원본만 저장하고 즉시 응답
+    if INGEST_MODE == "queue":
+        queue_ids = await ingest_queue.enqueue(api_key, items)
+        return JSONResponse(status_code=202, content={
+            "status": "queued",
+            "received": len(items),
+            "results": [
+                {"index": index, "status": "queued", "queue_id": queue_id}
+                for index, queue_id in enumerate(queue_ids)
+            ]
+        })
+    
+    results, events = await ingest_webhook_items(api_key, company, items)
+    results = [{"index": index, **result} for index, result in enumerate(results)]
+    
+    # 채널별로 한 번만 알림
+    if events:
+        batch_data = {"type": "new_transactions", "data": events}
+        with INGEST_STAGE_SECONDS.time("broadcast_admin"):
+            await manager.broadcast_to_channel("admin", batch_data)
+        with INGEST_STAGE_SECONDS.time("broadcast_company"):
+            await manager.broadcast_to_channel(f"company_{company.id}", batch_data)
+    
+    return {
+        "status": "success",
+        "received": len(items),
+        "inserted": len(events),
+        "duplicates": sum(1 for result in results if result["status"] == "duplicate"),
+        "failed": sum(1 for result in results if result["status"] == "failed"),
+        "results": results
+    }
 
 @app.get("/api/webhook/setup-guide/{api_key}")
 async def get_setup_guide(api_key: str):
     """SMS 앱 설정 가이드"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT company_name FROM companies WHERE api_key = ?", (api_key,))
-        company = cursor.fetchone()
-        
-        if not company:
-            raise HTTPException(status_code=404, detail="Invalid API key")
-        
-        base_url = "https://your-backend.railway.app"  # 실제 배포 URL로 변경
-        
-        return {
-            "app_name": "문자자동전달",
-            "company_name": company["company_name"],
-            "webhook_url": f"{base_url}/api/webhook/{api_key}",
-            "method": "POST",
-            "content_type": "application/json",
-            "setup_steps": [
-                "1. 문자자동전달 앱 설치 및 실행",
-                "2. '전달설정' → '새 설정' 선택",
-                "3. '전달 번호' → 'REST API 주소 입력' 선택",
-                f"4. URL 입력: {base_url}/api/webhook/{api_key}",
-                "5. 필터 설정: '입금', '출금', '농협' 등 키워드 추가",
-                "6. 저장 후 테스트 SMS 발송"
-            ],
-            "expected_format": {
-                "date": "2025.06.27 13:00:30",
-                "from": "***-****-****",
-                "to": "***-****-****",
-                "message": "[Web발신]\\n농협 출금700,000원\\n06/27 13:00 302-****-5080-61 신주일 잔액307,006원"
-            }
+    company = await get_company_by_api_key(api_key)
+    
+    if not company:
+        raise HTTPException(status_code=404, detail="Invalid API key")
+    
+    base_url = "https://your-backend.railway.app"  # 실제 배포 URL로 변경
+    
+    return {
+        "app_name": "문자자동전달",
+        "company_name": company.company_name,
+        "webhook_url": f"{base_url}/api/webhook/{api_key}",
+        "method": "POST",
+        "content_type": "application/json",
+        "setup_steps": [
+            "1. 문자자동전달 앱 설치 및 실행",
+            "2. '전달설정' → '새 설정' 선택",
+            "3. '전달 번호' → 'REST API 주소 입력' 선택",
+            f"4. URL 입력: {base_url}/api/webhook/{api_key}",
+            "5. 필터 설정: '입금', '출금', '농협' 등 키워드 추가",
+            "6. 저장 후 테스트 SMS 발송"
+        ],
+        "expected_format": {
+            "date": "2025.06.27 13:00:30",
+            "from": "***-****-****",
+            "to": "***-****-****",
+            "message": "[Web발신]\\n농협 출금700,000원\\n06/27 13:00 302-****-5080-61 신주일 잔액307,006원"
         }
+    }
 
 @app.get("/api/admin/dashboard")
 async def admin_dashboard(current_user: dict = Depends(get_current_user)):
@@ -529,111 +3663,378 @@ async def admin_dashboard(current_user: dict = Depends(get_current_user)):
     if current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="관리자만 접근 가능합니다")
     
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        # 전체 통계
-        cursor.execute("SELECT COUNT(*) as total_companies FROM companies WHERE is_active = 1")
-        total_companies = cursor.fetchone()["total_companies"]
-        
-        cursor.execute("""
-            SELECT 
-                SUM(CASE WHEN transaction_type = 'deposit' THEN amount ELSE 0 END) as total_deposits,
-                SUM(fee_amount) as total_fees,
-                COUNT(*) as total_transactions
-            FROM transactions 
-            WHERE DATE(created_at) = DATE('now', 'localtime')
-        """)
-        daily_stats = cursor.fetchone()
-        
-        # 업체별 오늘 통계
-        cursor.execute("""
-            SELECT 
-                c.id, c.company_name, c.login_id, c.fee_rate, c.api_key,
-                COALESCE(SUM(CASE WHEN t.transaction_type = 'deposit' THEN t.amount ELSE 0 END), 0) as today_deposits,
-                COALESCE(SUM(CASE WHEN t.transaction_type = 'withdrawal' THEN t.amount ELSE 0 END), 0) as today_withdrawals,
-                COALESCE(SUM(t.fee_amount), 0) as today_fees,
-                COUNT(t.id) as today_transactions
-            FROM companies c
-            LEFT JOIN transactions t ON c.id = t.company_id 
-                AND DATE(t.created_at) = DATE('now', 'localtime')
-            WHERE c.is_active = 1
-            GROUP BY c.id
-            ORDER BY today_deposits DESC
-        """)
-        companies = cursor.fetchall()
-        
-        return {
-            "summary": {
-                "total_companies": total_companies,
-                "total_deposits": daily_stats["total_deposits"] or 0,
-                "total_fees": daily_stats["total_fees"] or 0,
-                "total_transactions": daily_stats["total_transactions"] or 0
-            },
-            "companies": [dict(company) for company in companies]
-        }
+    companies = await repository.dashboard_companies(business_date_today())
+    return {"summary": dashboard_summary(companies), "companies": companies}
+
+def parse_transaction_cursor(cursor: str) -> tuple:
+    """페이지 커서 ("created_at|id") 해석"""
+    try:
+        created_at, transaction_id = cursor.rsplit("|", 1)
+        datetime.fromisoformat(created_at)
+        return created_at, int(transaction_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
+
+def normalize_time_filter(value: Optional[str]) -> Optional[str]:
+    """ISO 날짜/시각을 created_at 저장 형식(UTC, 'YYYY-MM-DD HH:MM:SS')으로 변환"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="잘못된 시각 형식입니다")
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
 
 @app.get("/api/companies/{company_id}/transactions")
-async def get_company_transactions(company_id: int, current_user: dict = Depends(get_current_user)):
-    """업체별 거래 내역"""
+async def get_company_transactions(
+    company_id: int,
+    limit: int = Query(100, ge=1, le=500),
+    page_cursor: Optional[str] = Query(None, alias="cursor", description="이전 응답의 next_cursor (더 과거 페이지)"),
+    since: Optional[str] = Query(None, description="이 시각 이후 (UTC, 포함)"),
+    until: Optional[str] = Query(None, description="이 시각 이전 (UTC, 미포함)"),
+    transaction_type: Optional[str] = Query(None, alias="type", pattern="^(deposit|withdrawal)$"),
+    since_id: Optional[int] = Query(None, description="이 ID 이후의 새 거래만 (오래된 순)"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    업체별 거래 내역
+    기본은 최신순 keyset 페이지네이션 (created_at, id), since_id 지정 시 새 거래만 오래된 순으로 반환
+    """
     # 권한 확인
     if current_user.get("role") == "company" and current_user.get("company_id") != company_id:
         raise HTTPException(status_code=403, detail="권한이 없습니다")
     
-    with get_db() as conn:
-        cursor = conn.cursor()
+    transactions = await repository.list_transactions(
+        company_id, limit,
+        page_cursor=parse_transaction_cursor(page_cursor) if page_cursor else None,
+        since=normalize_time_filter(since),
+        until=normalize_time_filter(until),
+        transaction_type=transaction_type,
+        since_id=since_id
+    )
+    has_more = len(transactions) > limit
+    transactions = transactions[:limit]
+    
+    next_cursor = None
+    if has_more and since_id is None:
+        last = transactions[-1]
+        next_cursor = f"{last['created_at']}|{last['id']}"
+    
+    return {
+        "transactions": transactions,
+        "has_more": has_more,
+        "next_cursor": next_cursor
+    }
+
+@app.get("/api/transactions/{transaction_id}")
+async def get_transaction(transaction_id: int, current_user: dict = Depends(get_current_user)):
+    """거래 상세 (SMS 원문 포함, 보관된 원문은 보관 파일에서 조회)"""
+    transaction = await repository.get_transaction(transaction_id)
+    if transaction is None:
+        raise HTTPException(status_code=404, detail="거래를 찾을 수 없습니다")
+    if current_user.get("role") == "company" and current_user.get("company_id") != transaction["company_id"]:
+        raise HTTPException(status_code=403, detail="권한이 없습니다")
+    
+    return (await restore_raw_messages([transaction]))[0]
+
+EXPORT_SUMMARY_COLUMNS = ("company_id", "transaction_count", "deposits", "withdrawals", "fees")
+
+# 내보내기는 스트림 동안 DB 연결을 점유하므로 동시 실행 수 제한
+export_semaphore = asyncio.Semaphore(max(1, DB_POOL_SIZE // 4))
+
+@app.get("/api/export/transactions")
+async def export_transactions(
+    start_date: str = Query(..., pattern=r"^\d{4}-\d{2}-\d{2}$", description="시작 영업일 (포함)"),
+    end_date: str = Query(..., pattern=r"^\d{4}-\d{2}-\d{2}$", description="종료 영업일 (포함)"),
+    company_id: Optional[int] = None,
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    include_raw: bool = Query(False, description="SMS 원문 포함 (보관된 원문은 보관 파일에서 조회)"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    정산용 거래 내보내기 (CSV/NDJSON 스트리밍)
+    거래 행 뒤에 업체별 건수/입금/출금/수수료 합계를 덧붙임
+    """
+    if current_user.get("role") == "company":
+        if company_id is not None and company_id != current_user.get("company_id"):
+            raise HTTPException(status_code=403, detail="권한이 없습니다")
+        company_id = current_user.get("company_id")
+    elif current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="권한이 없습니다")
+    
+    def csv_line(values) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(values)
+        return buffer.getvalue()
+    
+    async def generate():
+        # 업체별 [건수, 입금, 출금, 수수료]
+        totals: Dict[int, List[int]] = {}
         
-        cursor.execute("""
-            SELECT 
-                id, transaction_type, bank_name, sender_name, account_number,
-                amount, balance, fee_amount, is_rolling, created_at
-            FROM transactions 
-            WHERE company_id = ?
-            ORDER BY created_at DESC
-            LIMIT 100
-        """, (company_id,))
+        if export_format == "csv":
+            columns = EXPORT_COLUMNS + ("raw_message",) if include_raw else EXPORT_COLUMNS
+            yield "\ufeff" + csv_line(columns)  # BOM: 엑셀 한글 깨짐 방지
         
-        transactions = cursor.fetchall()
+        async with export_semaphore:
+            async for rows in repository.stream_transactions(start_date, end_date, company_id, include_raw):
+                if include_raw:
+                    rows = await restore_raw_messages(rows)
+                buffer = io.StringIO()
+                writer = csv.writer(buffer) if export_format == "csv" else None
+                for row in rows:
+                    total = totals.setdefault(row["company_id"], [0, 0, 0, 0])
+                    total[0] += 1
+                    if row["transaction_type"] == "deposit":
+                        total[1] += row["amount"] or 0
+                    elif row["transaction_type"] == "withdrawal":
+                        total[2] += row["amount"] or 0
+                    total[3] += row["fee_amount"] or 0
+                    
+                    if writer:
+                        writer.writerow(row.values())
+                    else:
+                        buffer.write(json.dumps(row, ensure_ascii=False))
+                        buffer.write("\n")
+                yield buffer.getvalue()
         
-        return {
-            "transactions": [dict(tx) for tx in transactions]
-        }
+        summary = [(company, *values) for company, values in sorted(totals.items())]
+        if export_format == "csv":
+            yield "\n" + csv_line(EXPORT_SUMMARY_COLUMNS)
+            for values in summary:
+                yield csv_line(values)
+        else:
+            yield json.dumps({
+                "type": "summary",
+                "companies": [dict(zip(EXPORT_SUMMARY_COLUMNS, values)) for values in summary]
+            }, ensure_ascii=False) + "\n"
+    
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    filename = f"transactions_{start_date}_{end_date}.{export_format}"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.get("/api/admin/cache/stats")
+async def cache_stats(current_user: dict = Depends(get_current_user)):
+    """업체/중복 키 캐시 적중/미스 통계 (관리자만)"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="관리자만 접근 가능합니다")
+    
+    return {
+        "company_cache": company_cache.stats(),
+        "dedup_cache": recent_dedup_keys.stats()
+    }
+
+@app.get("/api/admin/ingest/stats")
+async def ingest_stats(current_user: dict = Depends(get_current_user)):
+    """수신 대기열 깊이/지연 통계 (관리자만)"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="관리자만 접근 가능합니다")
+    
+    if db_pool is None:
+        return {"mode": INGEST_MODE}
+    return await ingest_queue.stats()
+
+@app.get("/api/admin/parse-failures")
+async def parse_failures(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(get_current_user)
+):
+    """격리된 파싱 실패 메시지의 형태별 건수 (많은 순, 관리자만)"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="관리자만 접근 가능합니다")
+    
+    return {"shapes": await repository.parse_failure_shapes(limit)}
+
+@app.post("/api/admin/parse-templates")
+async def create_parse_template(template: ParseTemplateCreate, current_user: dict = Depends(get_current_user)):
+    """
+    격리된 형태에 템플릿 등록 (관리자만)
+    해당 형태의 최근 격리 원문에 모두 맞아야 등록되며, 모든 워커의 파서에 바로 반영
+    """
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="관리자만 접근 가능합니다")
+    
+    try:
+        compiled = compile_template(template.pattern)
+    except (re.error, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"잘못된 템플릿입니다: {e}")
+    
+    samples = await repository.quarantine_samples(template.shape_signature, 20)
+    if not samples:
+        raise HTTPException(status_code=404, detail="격리된 메시지가 없는 형태입니다")
+    unmatched = [
+        sample for sample in samples
+        if not (match := compiled.search(sample))
+        or match.group("type") not in TRANSACTION_TYPES
+        or not match.group("amount").replace(",", "").isdigit()
+    ]
+    if unmatched:
+        raise HTTPException(status_code=400, detail={
+            "message": f"최근 원문 {len(samples)}건 중 {len(unmatched)}건이 템플릿과 맞지 않습니다",
+            "sample": unmatched[0]
+        })
+    
+    await repository.save_shape_template(template.shape_signature, template.pattern, template.bank_name)
+    await manager.broadcast_to_channel(PARSER_CHANNEL, template.model_dump())
+    logger.info(f"형태별 템플릿 등록: {template.shape_signature}")
+    
+    return {"status": "success", "shape_signature": template.shape_signature, "verified_samples": len(samples)}
+
+@app.delete("/api/admin/parse-templates/{shape_signature}")
+async def delete_parse_template(shape_signature: str, current_user: dict = Depends(get_current_user)):
+    """형태별 템플릿 삭제 (관리자만)"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="관리자만 접근 가능합니다")
+    
+    if not await repository.delete_shape_template(shape_signature):
+        raise HTTPException(status_code=404, detail="등록된 템플릿이 없습니다")
+    await manager.broadcast_to_channel(PARSER_CHANNEL, {"shape_signature": shape_signature, "pattern": None})
+    
+    return {"status": "success"}
+
+@app.get("/api/admin/balance-flags")
+async def balance_flags(
+    company_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: dict = Depends(get_current_user)
+):
+    """잔액 연쇄가 끊긴 거래 (누락/중복 문자 의심, 최신순, 관리자만)"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="관리자만 접근 가능합니다")
+    
+    return {"flags": await repository.list_balance_flags(company_id, limit)}
 
 @app.websocket("/ws/admin")
 async def websocket_admin(websocket: WebSocket):
     """관리자 WebSocket"""
-    await manager.connect(websocket, "admin")
-    try:
-        while True:
-            data = await websocket.receive_text()
-            # 연결 유지를 위한 ping-pong
-    except WebSocketDisconnect:
-        manager.disconnect(websocket, "admin")
+    claims = await authenticate_websocket(websocket)
+    if claims:
+        await serve_websocket(websocket, "admin", claims)
 
 @app.websocket("/ws/company/{company_id}")
 async def websocket_company(websocket: WebSocket, company_id: int):
     """업체별 WebSocket"""
-    await manager.connect(websocket, f"company_{company_id}")
-    try:
-        while True:
-            data = await websocket.receive_text()
-            # 연결 유지를 위한 ping-pong
-    except WebSocketDisconnect:
-        manager.disconnect(websocket, f"company_{company_id}")
+    claims = await authenticate_websocket(websocket, company_id)
+    if claims:
+        await serve_websocket(websocket, f"company_{company_id}", claims)
 
 # 애플리케이션 시작 시 실행
 @app.on_event("startup")
 async def startup_event():
     """앱 시작 시 실행"""
-    init_database()
+    await repository.start()
+    for template in await repository.shape_templates():
+        SMSParser.register_shape_template(template["shape_signature"], template["pattern"], template["bank_name"])
+    business_date = business_date_today()
+    dashboard_state.load(business_date, await repository.dashboard_companies(business_date))
+    if BROADCAST_BACKEND == "memory":
+        since_date = (datetime.now().date() - timedelta(days=BALANCE_CHAIN_WARM_DAYS)).isoformat()
+        balance_reconciler.load(await repository.balance_chain_heads(since_date))
+    else:
+        logger.warning("잔액 연쇄 실시간 검증은 BROADCAST_BACKEND=memory에서만 동작합니다 (reconcile-balances를 주기적으로 실행하세요)")
+    await manager.start()
+    if INGEST_MODE == "queue":
+        await ingest_queue.start()
     logger.info("🚀 Pay System v4.0 Backend Started!")
     logger.info(f"📖 API 문서: http://localhost:8000/docs")
     logger.info(f"🔗 CORS Origins: {CORS_ORIGINS}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """앱 종료 시 실행"""
+    await ingest_queue.stop()
+    await manager.stop()
+    await repository.close()
+    password_executor.shutdown(wait=False)
+
+def settle_command(args):
+    """영업일 정산 일괄 계산/대조 명령 (python main.py settle [--date YYYY-MM-DD])"""
+    if db_pool is None:
+        print("settle은 SQLite DATABASE_URL에서만 지원합니다")
+        return 2
+    init_database()
+    with get_db() as conn:
+        result = settle_business_day(conn, args.date or business_date_today())
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 1 if result["fee_mismatches"] or result["stats_mismatches"] else 0
+
+def archive_raw_command(args):
+    """오래된 원문 보관 명령 (python main.py archive-raw [--days N] [--vacuum])"""
+    if db_pool is None:
+        print("archive-raw는 SQLite DATABASE_URL에서만 지원합니다")
+        return 2
+    init_database()
+    before_date = (datetime.now().date() - timedelta(days=args.days)).isoformat()
+    with get_db() as conn:
+        moved = archive_raw_messages(conn, before_date, raw_archive)
+        if args.vacuum:
+            # 비운 페이지를 파일 크기에서 실제로 회수 (DB 전체를 다시 쓰므로 한산한 시간에 실행)
+            conn.execute("VACUUM")
+    print(json.dumps({"before_date": before_date, "archived": moved}, ensure_ascii=False, indent=2))
+    return 0
+
+def reconcile_balances_command(args):
+    """잔액 연쇄 일괄 검증 명령 (python main.py reconcile-balances [--since YYYY-MM-DD] [--restart])"""
+    if db_pool is None:
+        print("reconcile-balances는 SQLite DATABASE_URL에서만 지원합니다")
+        return 2
+    init_database()
+    with get_db() as conn:
+        result = reconcile_balances(conn, args.since, restart=args.restart)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 1 if result["flags"] else 0
+
+def reconcile_stats_command(args):
+    """일일 집계 검증 명령 (python main.py reconcile-stats [--date YYYY-MM-DD] [--fix])"""
+    if db_pool is None:
+        print("reconcile-stats는 SQLite DATABASE_URL에서만 지원합니다")
+        return 2
+    init_database()
+    with get_db() as conn:
+        mismatches = reconcile_daily_stats(conn, args.date, fix=args.fix)
+    for item in mismatches:
+        print(json.dumps(item, ensure_ascii=False))
+    action = "재계산 완료" if args.fix else "발견"
+    print(f"불일치 {len(mismatches)}건 {action}")
+    return 1 if mismatches and not args.fix else 0
+
 if __name__ == "__main__":
+    import argparse
+    import sys
+    
+    parser = argparse.ArgumentParser(description="Pay System v4.0 Backend")
+    subcommands = parser.add_subparsers(dest="command")
+    reconcile_parser = subcommands.add_parser("reconcile-stats", help="일일 집계 테이블 검증/재계산")
+    reconcile_parser.add_argument("--date", help="대상 영업일 (기본: 전체)")
+    reconcile_parser.add_argument("--fix", action="store_true", help="불일치 행을 원본 거래 기준으로 재계산")
+    settle_parser = subcommands.add_parser("settle", help="영업일 정산 일괄 계산 및 저장값 대조")
+    settle_parser.add_argument("--date", help="대상 영업일 (기본: 오늘)")
+    archive_parser = subcommands.add_parser("archive-raw", help="오래된 SMS 원문을 월별 압축 파일로 보관")
+    archive_parser.add_argument("--days", type=int, default=RAW_MESSAGE_RETENTION_DAYS,
+                                help="이 일수보다 오래된 영업일 대상 (기본: RAW_MESSAGE_RETENTION_DAYS)")
+    archive_parser.add_argument("--vacuum", action="store_true", help="보관 후 VACUUM으로 파일 크기 회수")
+    balances_parser = subcommands.add_parser("reconcile-balances", help="계좌별 잔액 연쇄 일괄 검증")
+    balances_parser.add_argument("--since", help="이 영업일부터 검증 (기본: 전체)")
+    balances_parser.add_argument("--restart", action="store_true", help="중단된 진행 위치를 버리고 처음부터 검증")
+    args = parser.parse_args()
+    
+    if args.command == "reconcile-stats":
+        sys.exit(reconcile_stats_command(args))
+    if args.command == "settle":
+        sys.exit(settle_command(args))
+    if args.command == "archive-raw":
+        sys.exit(archive_raw_command(args))
+    if args.command == "reconcile-balances":
+        sys.exit(reconcile_balances_command(args))
+    
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=int(os.getenv("PORT", 8000)),
         reload=True
-    ) 
\ No newline at end of file
+    )
@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# main은 가져올 때 환경 변수를 읽으므로 임시 DB/보관 경로를 먼저 지정
+_tmp = tempfile.mkdtemp(prefix="pay-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ["ARCHIVE_DIR"] = os.path.join(_tmp, "archive")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    # 종료 시 비밀번호 해시 스레드 풀이 닫히므로 앱 수명 주기는 세션에서 한 번만
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    token = client.post("/api/auth/login", json={"username": "fjrzl7979", "password": "79797979"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+def create_company(client, admin_headers):
+    """테스트용 업체 생성 (생성 응답의 id, api_key 등 반환)"""
+    def create(login_id, **fields):
+        response = client.post("/api/admin/companies", headers=admin_headers, json={
+            "company_name": login_id, "login_id": login_id, "password": "pw", "bank_name": "농협",
+            "account_number": "302-0000-5080-61", "account_holder": "홍길동", "fee_rate": 0.03, **fields
+        })
+        return response.json()
+    return create
@@ -0,0 +1,116 @@
+"""잔액 연쇄 검증 (잔액이 없는 문자는 연쇄에서 제외, 실시간 검증은 단일 프로세스에서만)"""
+
+import asyncio
+
+import pytest
+
+import main
+
+
+def message(amount, balance=None):
+    text = f"[Web발신]\n농협 입금{amount:,}원\n06/27 13:00 302-****-7777-61 홍길동"
+    return text + (f" 잔액{balance:,}원" if balance is not None else "")
+
+
+def test_parser_leaves_missing_balance_empty():
+    assert main.SMSParser.parse_message(message(30000)).balance is None
+    assert main.SMSParser.parse_message(message(30000, 1080000)).balance == 1080000
+
+
+def send_chain(client, admin_headers, login_id, chain):
+    """업체를 만들고 (금액, 잔액) 입금 문자를 차례로 보내 (업체 ID, 거래 ID 목록) 반환"""
+    response = client.post("/api/admin/companies", headers=admin_headers, json={
+        "company_name": login_id, "login_id": login_id, "password": "pw", "bank_name": "농협",
+        "account_number": "302-0000-7777-61", "account_holder": "홍길동", "fee_rate": 0.03
+    })
+    company_id, api_key = response.json()["id"], response.json()["api_key"]
+    ids = []
+    for i, (amount, balance) in enumerate(chain):
+        result = client.post(f"/api/webhook/{api_key}", json={"date": f"2025-06-27 13:0{i}", "message": message(amount, balance)})
+        ids.append(result.json()["transaction_id"])
+    return company_id, ids
+
+
+def test_message_without_balance_does_not_break_chain(client, admin_headers):
+    company_id, ids = send_chain(client, admin_headers, "balance_test",
+                                 [(1000000, 1000000), (50000, 1050000), (30000, None), (30000, 1080000)])
+    
+    assert client.get(f"/api/transactions/{ids[2]}", headers=admin_headers).json()["balance"] is None
+    flags = client.get("/api/admin/balance-flags", headers=admin_headers, params={"company_id": company_id}).json()
+    assert flags["flags"] == []
+    
+    with main.get_db() as conn:
+        assert main.reconcile_balances(conn)["flags"] == {}
+
+
+def test_warm_load_skips_last_message_without_balance(client, admin_headers):
+    company_id, ids = send_chain(client, admin_headers, "balance_warm_test", [(1000000, 1000000), (30000, None)])
+    
+    with main.get_db() as conn:
+        heads = [dict(row) for row in conn.execute(main.BALANCE_CHAIN_HEADS_SQL, ("2000-01-01",))
+                 if row["company_id"] == company_id]
+    assert [(head["id"], head["balance"]) for head in heads] == [(ids[0], 1000000)]
+    
+    reconciler = main.BalanceChainReconciler()
+    reconciler.load(heads)
+    assert reconciler.check({**heads[0], "id": ids[1] + 1, "amount": 60000, "balance": 1060000}) is None
+
+
+def test_live_check_is_skipped_with_multi_worker_backend(monkeypatch):
+    published = []
+    
+    async def publish(channel, message):
+        published.append(channel)
+    
+    monkeypatch.setattr(main.manager, "broadcast_to_channel", publish)
+    rows = [{"id": 1, "company_id": 1, "bank_name": "농협", "account_number": "1",
+             "transaction_type": "deposit", "amount": 1, "balance": 1}]
+    
+    monkeypatch.setattr(main, "BROADCAST_BACKEND", "sqlite")
+    asyncio.run(main.publish_balance_rows(rows))
+    assert published == []
+    
+    monkeypatch.setattr(main, "BROADCAST_BACKEND", "memory")
+    asyncio.run(main.publish_balance_rows(rows))
+    assert published == [main.BALANCE_CHANNEL]
+
+
+@pytest.fixture
+def chain_db(tmp_path, monkeypatch):
+    """다른 테스트의 거래와 섞이지 않는 별도 DB (계좌 A는 세 번째 거래에서 끊김)"""
+    monkeypatch.setattr(main, "db_pool", main.ConnectionPool(str(tmp_path / "chain.db"), 2))
+    main.init_database()
+    with main.get_db() as conn:
+        conn.executemany("""
+            INSERT INTO transactions (company_id, transaction_type, bank_name, account_number, amount, balance,
+                                      raw_message, business_date)
+            VALUES (1, 'deposit', '농협', ?, 100, ?, '', '2025-06-27')
+        """, [("A", 100), ("B", 1000), ("A", 200), ("B", 1100), ("A", 250), ("A", 350), ("B", 1200)])
+        conn.commit()
+        yield conn
+
+
+def test_reconcile_balances_resumes_after_interruption(chain_db, monkeypatch):
+    class Interrupted(Exception):
+        pass
+    
+    check = main.BalanceChainReconciler.check
+    def interrupt_at_fifth(self, row):
+        if row["id"] == 5:
+            raise Interrupted
+        return check(self, row)
+    
+    monkeypatch.setattr(main.BalanceChainReconciler, "check", interrupt_at_fifth)
+    with pytest.raises(Interrupted):
+        main.reconcile_balances(chain_db, chunk_size=2)
+    assert not chain_db.in_transaction
+    assert chain_db.execute("SELECT last_id, checked FROM balance_reconcile_progress").fetchone()[:] == (4, 4)
+    
+    monkeypatch.setattr(main.BalanceChainReconciler, "check", check)
+    resumed = main.reconcile_balances(chain_db, chunk_size=2)
+    assert resumed == {"since_date": None, "resumed_from": 4, "checked": 7, "chains": 2, "flags": {"mismatch": 1}}
+    assert chain_db.execute("SELECT COUNT(*) FROM balance_reconcile_progress").fetchone()[0] == 0
+    assert [row["transaction_id"] for row in chain_db.execute("SELECT transaction_id FROM balance_flags")] == [5]
+    
+    fresh = main.reconcile_balances(chain_db, chunk_size=2, restart=True)
+    assert fresh == {**resumed, "resumed_from": None}
@@ -0,0 +1,73 @@
+"""SQLite 브로드캐스트 (같은 DB 파일을 쓰는 두 워커 사이의 전달 순서와 오래된 이벤트 정리)"""
+
+import asyncio
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def broadcast_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "db_pool", main.ConnectionPool(str(tmp_path / "broadcast.db"), 2))
+    main.init_database()
+
+
+def subscriber(received: list) -> main.SQLiteBroadcast:
+    backend = main.SQLiteBroadcast(poll_interval=0.01)
+    backend.attach(lambda channel, text: received.append((channel, text)))
+    return backend
+
+
+def test_events_reach_other_worker_in_order(broadcast_db):
+    async def scenario():
+        first_received, second_received = [], []
+        first, second = subscriber(first_received), subscriber(second_received)
+        await first.start()
+        await second.start()
+        try:
+            for i in range(3):
+                await first.publish("admin", f"a{i}")
+            await second.publish(main.DASHBOARD_CHANNEL, "b0")
+            await asyncio.sleep(0.2)
+        finally:
+            await first.stop()
+            await second.stop()
+        return first_received, second_received
+    
+    first_received, second_received = asyncio.run(scenario())
+    
+    # 자기 워커에는 즉시, 다른 워커에는 발행 순서대로 한 번씩
+    assert first_received == [("admin", "a0"), ("admin", "a1"), ("admin", "a2"), (main.DASHBOARD_CHANNEL, "b0")]
+    assert second_received == [(main.DASHBOARD_CHANNEL, "b0"), ("admin", "a0"), ("admin", "a1"), ("admin", "a2")]
+
+
+def test_new_subscriber_starts_after_existing_events(broadcast_db):
+    async def scenario():
+        publisher, received = subscriber([]), []
+        await publisher.publish("admin", "old")
+        late = subscriber(received)
+        await late.start()
+        try:
+            await publisher.publish("admin", "new")
+            await asyncio.sleep(0.1)
+        finally:
+            await late.stop()
+        return received
+    
+    assert asyncio.run(scenario()) == [("admin", "new")]
+
+
+def test_prune_removes_events_older_than_retention(broadcast_db):
+    asyncio.run(subscriber([]).publish("admin", "old"))
+    asyncio.run(subscriber([]).publish("admin", "recent"))
+    with main.get_db() as conn:
+        conn.execute("UPDATE broadcast_events SET created_at = datetime('now', '-120 seconds') WHERE payload = 'old'")
+        conn.commit()
+        
+        reader = main.SQLiteBroadcast(retention_seconds=60)
+        events = reader._fetch_events(conn, prune=True)
+        remaining = [row[0] for row in conn.execute("SELECT payload FROM broadcast_events")]
+    
+    assert [payload for _, _, payload in events] == ["recent"]
+    assert remaining == ["recent"]
@@ -0,0 +1,70 @@
+"""업체 캐시 (웹훅 경로의 적중/미스 집계, 업체 변경 시 모든 워커에서 무효화)"""
+
+import json
+
+import pytest
+
+import main
+
+MESSAGE = "[Web발신]\n농협 입금{amount:,}원\n06/27 13:00 302-****-5080-61 홍길동 잔액1,000,000원"
+
+
+@pytest.fixture(scope="module")
+def api_key(client, admin_headers):
+    response = client.post("/api/admin/companies", headers=admin_headers, json={
+        "company_name": "캐시테스트", "login_id": "cache_test", "password": "pw", "bank_name": "농협",
+        "account_number": "302-0000-5080-61", "account_holder": "홍길동", "fee_rate": 0.03
+    })
+    return response.json()["api_key"]
+
+
+def cache_stats(client, admin_headers):
+    return client.get("/api/admin/cache/stats", headers=admin_headers).json()["company_cache"]
+
+
+def send(client, api_key, amount):
+    response = client.post(f"/api/webhook/{api_key}", json={"date": f"cache {amount}", "message": MESSAGE.format(amount=amount)})
+    assert response.json()["status"] == "success"
+
+
+def test_lru_cache_counts_hits_and_misses():
+    cache = main.LRUCache(max_size=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # 가장 오래 안 쓴 b 제거
+    assert cache.get("b") is None
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+    
+    expired = main.LRUCache(ttl=0)
+    expired.put("a", 1)
+    assert expired.get("a") is None
+
+
+def test_webhook_reads_company_from_cache(client, admin_headers, api_key):
+    main.company_cache.invalidate(api_key)
+    before = cache_stats(client, admin_headers)
+    send(client, api_key, 1000)
+    send(client, api_key, 2000)
+    after = cache_stats(client, admin_headers)
+    
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+
+def test_invalidate_company_drops_entry(client, admin_headers, api_key):
+    send(client, api_key, 3000)
+    assert main.company_cache.get(api_key) is not None
+    
+    client.portal.call(main.invalidate_company, api_key)
+    assert main.company_cache.get(api_key) is None
+    
+    # 다른 워커가 발행한 무효화도 브로드캐스트 수신으로 반영
+    send(client, api_key, 4000)
+    main.manager.deliver_local(main.COMPANY_CHANNEL, json.dumps({"api_key": api_key}))
+    before = cache_stats(client, admin_headers)
+    send(client, api_key, 5000)
+    assert cache_stats(client, admin_headers)["misses"] - before["misses"] == 1
@@ -0,0 +1,42 @@
+"""일일 집계 (저장과 함께 갱신되어 대시보드가 거래를 다시 세지 않음, reconcile-stats로 검증/재계산)"""
+
+import main
+
+
+def message(kind, amount):
+    return f"[Web발신]\n농협 {kind}{amount:,}원\n06/27 13:00 302-****-5080-61 홍길동 잔액1,000,000원"
+
+
+def dashboard_row(client, admin_headers, company_id):
+    companies = client.get("/api/admin/dashboard", headers=admin_headers).json()["companies"]
+    return next(row for row in companies if row["id"] == company_id)
+
+
+def test_webhook_updates_daily_stats(client, admin_headers, create_company):
+    company = create_company("daily_stats_test")
+    for i, (kind, amount) in enumerate([("입금", 100000), ("입금", 50000), ("출금", 30000)]):
+        client.post(f"/api/webhook/{company['api_key']}", json={"date": f"stats {i}", "message": message(kind, amount)})
+    
+    row = dashboard_row(client, admin_headers, company["id"])
+    assert (row["today_deposits"], row["today_withdrawals"], row["today_fees"], row["today_transactions"]) == \
+        (150000, 30000, 4500, 3)
+    with main.get_db() as conn:
+        stored = conn.execute("SELECT * FROM daily_company_stats WHERE company_id = ?", (company["id"],)).fetchone()
+    assert (stored["business_date"], stored["deposits"], stored["transaction_count"]) == (main.business_date_today(), 150000, 3)
+
+
+def test_reconcile_daily_stats_finds_and_fixes_drift(client, create_company):
+    company = create_company("daily_stats_drift_test")
+    client.post(f"/api/webhook/{company['api_key']}", json={"date": "drift", "message": message("입금", 20000)})
+    business_date = main.business_date_today()
+    
+    with main.get_db() as conn:
+        conn.execute("UPDATE daily_company_stats SET deposits = 1 WHERE company_id = ?", (company["id"],))
+        conn.commit()
+        
+        [mismatch] = [item for item in main.reconcile_daily_stats(conn, business_date) if item["company_id"] == company["id"]]
+        assert mismatch["stored"]["deposits"] == 1
+        assert mismatch["expected"] == {"deposits": 20000, "withdrawals": 0, "fees": 600, "transaction_count": 1}
+        
+        main.reconcile_daily_stats(conn, business_date, fix=True)
+        assert not [item for item in main.reconcile_daily_stats(conn, business_date) if item["company_id"] == company["id"]]
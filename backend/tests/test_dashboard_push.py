@@ -0,0 +1,44 @@
+"""대시보드 푸시 (연결 시 스냅샷, 이후 순번 없는 stats_delta와 순번 있는 거래 알림)"""
+
+import main
+
+MESSAGE = "[Web발신]\n농협 입금10,000원\n06/27 13:00 302-****-5080-61 홍길동 잔액1,000,000원"
+
+
+def test_admin_snapshot_matches_dashboard_endpoint(client, admin_headers, create_company):
+    create_company("push_admin_test")
+    token = admin_headers["Authorization"].split()[1]
+    
+    with client.websocket_connect(f"/ws/admin?token={token}") as websocket:
+        snapshot = websocket.receive_json()
+    dashboard = client.get("/api/admin/dashboard", headers=admin_headers).json()
+    
+    assert {key: snapshot[key] for key in ("type", "epoch", "reason")} == \
+        {"type": "snapshot", "epoch": main.manager.epoch, "reason": "connect"}
+    assert isinstance(snapshot["seq"], int)
+    assert snapshot["data"]["business_date"] == main.business_date_today()
+    assert snapshot["data"]["summary"] == dashboard["summary"]
+    # 입금액이 같은 업체끼리는 순서가 다를 수 있음
+    assert sorted(row["id"] for row in snapshot["data"]["companies"]) == sorted(row["id"] for row in dashboard["companies"])
+
+
+def test_company_gets_delta_and_sequenced_transaction(client, create_company):
+    company = create_company("push_company_test")
+    token = main.create_jwt_token({"user_id": company["id"], "role": "company", "company_id": company["id"]})
+    
+    with client.websocket_connect(f"/ws/company/{company['id']}?token={token}") as websocket:
+        snapshot = websocket.receive_json()
+        assert (snapshot["seq"], snapshot["data"]["company"]["today_transactions"]) == (0, 0)
+        
+        transaction_id = client.post(f"/api/webhook/{company['api_key']}", json={"date": "push", "message": MESSAGE}).json()["transaction_id"]
+        messages = {message["type"]: message for message in (websocket.receive_json(), websocket.receive_json())}
+    
+    delta = messages["stats_delta"]
+    assert "seq" not in delta
+    assert delta["data"]["business_date"] == main.business_date_today()
+    assert {key: delta["data"]["company"][key] for key in ("id", "today_deposits", "today_fees", "today_transactions")} == \
+        {"id": company["id"], "today_deposits": 10000, "today_fees": 300, "today_transactions": 1}
+    
+    transaction = messages["new_transaction"]
+    assert transaction["seq"] == 1
+    assert (transaction["data"]["id"], transaction["data"]["amount"]) == (transaction_id, 10000)
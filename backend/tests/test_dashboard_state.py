@@ -0,0 +1,28 @@
+"""대시보드 메모리 상태 (워커 간 갱신 도착 순서와 무관하게 최신 누적값 유지)"""
+
+import main
+
+
+def totals(count, deposits):
+    return {"id": 1, "today_deposits": deposits, "today_withdrawals": 0, "today_fees": 0, "today_transactions": count}
+
+
+def test_late_older_update_does_not_regress_totals():
+    state = main.DashboardState()
+    state.load("2025-06-27", [{"id": 1, "company_name": "A", **totals(5, 500)}])
+    
+    state.apply("2025-06-27", [totals(6, 600)])
+    state.apply("2025-06-27", [totals(5, 500)])  # 다른 워커의 이전 갱신이 늦게 도착
+    
+    assert state.companies[1]["today_transactions"] == 6
+    assert state.companies[1]["today_deposits"] == 600
+
+
+def test_previous_business_date_update_keeps_only_company_fields():
+    state = main.DashboardState()
+    state.load("2025-06-28", [{"id": 1, "company_name": "A", **totals(1, 100)}])
+    
+    state.apply("2025-06-27", [{**totals(9, 900), "company_name": "B"}])
+    
+    assert state.companies[1]["company_name"] == "B"
+    assert state.companies[1]["today_deposits"] == 100
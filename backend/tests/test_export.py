@@ -0,0 +1,67 @@
+"""정산 내보내기 (CSV/NDJSON 스트리밍, 거래 행 뒤에 업체별 합계, 업체 계정은 자기 거래만)"""
+
+import asyncio
+import csv
+import io
+import json
+
+import pytest
+
+import main
+
+MESSAGE = "[Web발신]\n농협 {kind}{amount:,}원\n06/27 13:00 302-****-5080-61 홍길동 잔액1,000,000원"
+
+
+@pytest.fixture(scope="module")
+def company(client, create_company):
+    company = create_company("export_test")
+    for i, (kind, amount) in enumerate([("입금", 10000), ("입금", 20000), ("출금", 5000)]):
+        client.post(f"/api/webhook/{company['api_key']}", json={"date": f"export {i}", "message": MESSAGE.format(kind=kind, amount=amount)})
+    company["token"] = client.post("/api/auth/login", json={"username": "export_test", "password": "pw"}).json()["access_token"]
+    return company
+
+
+def export(client, company, **params):
+    today = main.business_date_today()
+    return client.get("/api/export/transactions", headers={"Authorization": f"Bearer {company['token']}"},
+                      params={"start_date": today, "end_date": today, **params})
+
+
+def test_csv_export_ends_with_company_totals(client, company):
+    response = export(client, company)
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.startswith("\ufeff")
+    
+    rows, summary = response.text.lstrip("\ufeff").split("\n\n")
+    rows = list(csv.DictReader(io.StringIO(rows)))
+    assert [(row["transaction_type"], row["amount"]) for row in rows] == \
+        [("deposit", "10000"), ("deposit", "20000"), ("withdrawal", "5000")]
+    assert {row["company_id"] for row in rows} == {str(company["id"])}
+    assert list(csv.reader(io.StringIO(summary))) == [
+        list(main.EXPORT_SUMMARY_COLUMNS), [str(company["id"]), "3", "30000", "5000", "900"]
+    ]
+
+
+def test_ndjson_export_with_raw_messages(client, company):
+    lines = [json.loads(line) for line in export(client, company, format="ndjson", include_raw=True).text.splitlines()]
+    assert [line["raw_message"] for line in lines[:-1]] == [
+        MESSAGE.format(kind=kind, amount=amount) for kind, amount in [("입금", 10000), ("입금", 20000), ("출금", 5000)]
+    ]
+    assert lines[-1] == {"type": "summary", "companies": [{
+        "company_id": company["id"], "transaction_count": 3, "deposits": 30000, "withdrawals": 5000, "fees": 900
+    }]}
+
+
+def test_company_cannot_export_other_company(client, company):
+    assert export(client, company, company_id=company["id"] + 1000).status_code == 403
+
+
+def test_stream_db_yields_chunks_and_releases_connection(company):
+    idle = main.db_pool._idle.qsize()
+    
+    async def collect():
+        sql, params = main.export_query("2000-01-01", "2999-12-31", company["id"])
+        return [len(rows) async for rows in main.stream_db(sql, params, chunk_size=2)]
+    
+    assert asyncio.run(collect()) == [2, 1]
+    assert main.db_pool._idle.qsize() == idle
@@ -0,0 +1,110 @@
+"""수신 대기열 (선점/임대 만료, 작업 실패 후 재시도, 중복 표시, 깊이/지연 통계)"""
+
+import pytest
+
+import main
+
+MESSAGE = "[Web발신]\n농협 입금{amount:,}원\n06/27 13:00 302-****-5080-61 홍길동 잔액1,000,000원"
+
+
+@pytest.fixture(scope="module")
+def api_key(client, admin_headers):
+    response = client.post("/api/admin/companies", headers=admin_headers, json={
+        "company_name": "대기열테스트", "login_id": "queue_test", "password": "pw", "bank_name": "농협",
+        "account_number": "302-0000-5080-61", "account_holder": "홍길동", "fee_rate": 0.03
+    })
+    return response.json()["api_key"]
+
+
+@pytest.fixture(autouse=True)
+def empty_queue(client):
+    with main.get_db() as conn:
+        conn.execute("DELETE FROM ingest_queue")
+        conn.commit()
+
+
+def enqueue(client, queue, api_key, *amounts, date="2025-06-27 13:00"):
+    items = [main.SMSWebhookData(date=date, message=MESSAGE.format(amount=amount)) for amount in amounts]
+    return client.portal.call(queue.enqueue, api_key, items)
+
+
+def queue_rows():
+    with main.get_db() as conn:
+        return {row["id"]: dict(row) for row in conn.execute("SELECT * FROM ingest_queue")}
+
+
+def expire_claims(queue):
+    with main.get_db() as conn:
+        conn.execute("UPDATE ingest_queue SET claimed_at = datetime('now', '-1 hour') WHERE status = 'processing'")
+        queue._maintain(conn)
+
+
+def test_claim_leases_pending_rows_in_order(client, api_key):
+    queue = main.IngestQueue(workers=0, batch_size=2, max_attempts=2)
+    ids = enqueue(client, queue, api_key, 1000, 2000, 3000, date="claim")
+    
+    with main.get_db() as conn:
+        assert [row["id"] for row in queue._claim(conn)] == ids[:2]
+        assert [row["id"] for row in queue._claim(conn)] == ids[2:]
+        assert queue._claim(conn) == []
+    assert {row["status"] for row in queue_rows().values()} == {"processing"}
+    
+    # 임대가 끝나면 다시 대기, 최대 시도 횟수를 넘으면 실패
+    expire_claims(queue)
+    assert {row["status"] for row in queue_rows().values()} == {"pending"}
+    with main.get_db() as conn:
+        while queue._claim(conn):
+            pass
+    expire_claims(queue)
+    assert {(row["status"], row["error"]) for row in queue_rows().values()} == {("failed", "max_attempts")}
+
+
+def test_rows_are_retried_after_worker_failure(client, api_key, admin_headers, monkeypatch):
+    queue = main.IngestQueue(workers=0)
+    [queue_id] = enqueue(client, queue, api_key, 4000, date="retry")
+    
+    def crash(self, conn):
+        raise RuntimeError("저장 중 워커 중단")
+    
+    with monkeypatch.context() as patch:
+        patch.setattr(main.TransactionBatch, "save", crash)
+        with pytest.raises(RuntimeError):
+            client.portal.call(queue.process_batch)
+    assert queue_rows()[queue_id]["status"] == "processing"
+    
+    expire_claims(queue)
+    assert client.portal.call(queue.process_batch) == 1
+    row = queue_rows()[queue_id]
+    assert (row["status"], row["attempts"]) == ("done", 2)
+    assert client.get(f"/api/transactions/{row['transaction_id']}", headers=admin_headers).json()["amount"] == 4000
+
+
+def test_duplicates_point_at_original_transaction(client, api_key):
+    queue = main.IngestQueue(workers=0)
+    first, repeated = enqueue(client, queue, api_key, 5000, 5000, date="duplicate")
+    client.portal.call(queue.process_batch)
+    [resent] = enqueue(client, queue, api_key, 5000, date="duplicate")
+    client.portal.call(queue.process_batch)
+    
+    rows = queue_rows()
+    assert rows[first]["status"] == "done"
+    original = rows[first]["transaction_id"]
+    assert (rows[repeated]["status"], rows[repeated]["transaction_id"]) == ("duplicate", original)
+    assert (rows[resent]["status"], rows[resent]["transaction_id"]) == ("duplicate", original)
+
+
+def test_stats_report_depth_and_lag(client, api_key, admin_headers):
+    queue = main.IngestQueue(workers=0)
+    enqueue(client, queue, api_key, 6000, 7000, date="stats")
+    with main.get_db() as conn:
+        conn.execute("UPDATE ingest_queue SET received_at = datetime('now', '-30 seconds')")
+        conn.commit()
+    
+    stats = client.get("/api/admin/ingest/stats", headers=admin_headers).json()
+    assert stats["depth"] == 2
+    assert stats["processing"] == 0
+    assert 30 <= stats["lag_seconds"] < 60
+    
+    client.portal.call(queue.process_batch)
+    stats = client.get("/api/admin/ingest/stats", headers=admin_headers).json()
+    assert (stats["depth"], stats["lag_seconds"]) == (0, 0.0)
@@ -0,0 +1,43 @@
+"""Prometheus 메트릭 (라우트 템플릿별 요청 지연, 수신 단계별 지연, 누적 버킷)"""
+
+import main
+
+MESSAGE = "[Web발신]\n농협 입금10,000원\n06/27 13:00 302-****-5080-61 홍길동 잔액1,000,000원"
+
+
+def test_histogram_renders_cumulative_buckets(monkeypatch):
+    monkeypatch.setattr(main, "metrics_registry", [])
+    histogram = main.Histogram("test_seconds", "테스트", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, "parse")
+    
+    assert histogram.render().splitlines() == [
+        "# HELP test_seconds 테스트",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="parse",le="0.1"} 1',
+        'test_seconds_bucket{stage="parse",le="1.0"} 3',
+        'test_seconds_bucket{stage="parse",le="+Inf"} 4',
+        'test_seconds_sum{stage="parse"} 4.25',
+        'test_seconds_count{stage="parse"} 4',
+    ]
+    assert main.metrics_registry == [histogram]
+
+
+def count_sample(text, prefix):
+    [line] = [line for line in text.splitlines() if line.startswith(prefix)]
+    return float(line.rsplit(" ", 1)[1])
+
+
+def test_metrics_endpoint_labels_routes_by_template(client, create_company):
+    api_key = create_company("metrics_test")["api_key"]
+    client.post(f"/api/webhook/{api_key}", json={"date": "metrics", "message": MESSAGE})
+    client.get("/api/no-such-route")
+    
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert api_key not in text
+    assert count_sample(text, 'pay_http_request_duration_seconds_count{method="POST",route="/api/webhook/{api_key}",status="200"}') >= 1
+    assert count_sample(text, 'pay_http_request_duration_seconds_count{method="GET",route="unmatched",status="404"}') >= 1
+    for stage in ("company_lookup", "parse", "insert", "broadcast_admin", "broadcast_company"):
+        assert count_sample(text, f'pay_ingest_stage_duration_seconds_count{{stage="{stage}"}}') >= 1
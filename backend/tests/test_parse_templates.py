@@ -0,0 +1,66 @@
+"""파싱 실패 격리와 형태별 템플릿 (원문 검증 후 등록, 등록 즉시 같은 형태를 파싱, 삭제 시 다시 격리)"""
+
+import pytest
+
+import main
+
+MESSAGE = "[알림] {amount:,}원이 입금되었습니다. 잔액 {balance:,}원"
+PATTERN = r"(?P<amount>[\d,]+)원이 (?P<type>입금|출금)되었습니다\. 잔액 (?P<balance>[\d,]+)원"
+
+
+@pytest.fixture(scope="module")
+def api_key(create_company):
+    return create_company("parse_template_test")["api_key"]
+
+
+@pytest.fixture(autouse=True)
+def parser_templates(monkeypatch):
+    # 등록한 템플릿이 다른 테스트의 파서에 남지 않도록
+    monkeypatch.setattr(main.SMSParser, "shape_templates", dict(main.SMSParser.shape_templates))
+
+
+def send(client, api_key, amount, balance):
+    return client.post(f"/api/webhook/{api_key}", json={
+        "date": f"template {amount}", "message": MESSAGE.format(amount=amount, balance=balance)
+    }).json()
+
+
+def test_unknown_format_is_quarantined_and_template_applies(client, admin_headers, api_key):
+    first, second = send(client, api_key, 12000, 50000), send(client, api_key, 3500, 53500)
+    assert first["status"] == second["status"] == "failed"
+    signature = first["shape_signature"]
+    assert second["shape_signature"] == signature
+    
+    shapes = client.get("/api/admin/parse-failures", headers=admin_headers).json()["shapes"]
+    [shape] = [shape for shape in shapes if shape["shape_signature"] == signature]
+    assert (shape["failures"], shape["sample"], shape["template"]) == (2, MESSAGE.format(amount=3500, balance=53500), None)
+    
+    response = client.post("/api/admin/parse-templates", headers=admin_headers, json={
+        "shape_signature": signature, "pattern": PATTERN, "bank_name": "알림은행"
+    })
+    assert response.json() == {"status": "success", "shape_signature": signature, "verified_samples": 2}
+    
+    transaction_id = send(client, api_key, 7000, 60500)["transaction_id"]
+    transaction = client.get(f"/api/transactions/{transaction_id}", headers=admin_headers).json()
+    assert (transaction["bank_name"], transaction["transaction_type"], transaction["amount"], transaction["balance"]) == \
+        ("알림은행", "deposit", 7000, 60500)
+    
+    assert client.delete(f"/api/admin/parse-templates/{signature}", headers=admin_headers).json() == {"status": "success"}
+    assert send(client, api_key, 8000, 68500)["status"] == "failed"
+    assert client.delete(f"/api/admin/parse-templates/{signature}", headers=admin_headers).status_code == 404
+
+
+def test_template_must_match_quarantined_samples(client, admin_headers, api_key):
+    signature = send(client, api_key, 1000, 2000)["shape_signature"]
+    
+    def register(shape_signature, pattern):
+        return client.post("/api/admin/parse-templates", headers=admin_headers, json={
+            "shape_signature": shape_signature, "pattern": pattern
+        })
+    
+    mismatch = register(signature, r"(?P<amount>[\d,]+)원이 (?P<type>출금)되었습니다")
+    assert mismatch.status_code == 400
+    assert mismatch.json()["detail"]["sample"] == MESSAGE.format(amount=1000, balance=2000)
+    assert register(signature, r"(?P<amount>[\d,]+)원").status_code == 400  # type 그룹 누락
+    assert register("0000000000000000", PATTERN).status_code == 404
+    assert signature not in main.SMSParser.shape_templates
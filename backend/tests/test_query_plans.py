@@ -0,0 +1,69 @@
+"""주요 조회가 transactions 인덱스를 타는지 EXPLAIN QUERY PLAN으로 확인"""
+
+import pytest
+
+import main
+
+
+@pytest.fixture(scope="module")
+def conn():
+    main.init_database()
+    with main.get_db() as conn:
+        yield conn
+
+
+def query_plan(conn, sql, params):
+    return [row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def test_dashboard_reads_daily_rollup_by_key(conn):
+    plan = query_plan(conn, main.DASHBOARD_COMPANIES_SQL, ("2025-06-27",))
+    assert any("USING INDEX sqlite_autoindex_daily_company_stats_1" in step for step in plan)
+    assert not any("transactions" in step for step in plan)
+
+
+def test_daily_settlement_searches_business_date_index(conn):
+    plan = query_plan(conn, main.SETTLEMENT_ROWS_SQL, ("2025-06-27",))
+    assert "SEARCH t USING INDEX idx_transactions_business_date (business_date=?)" in plan
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"since": "2025-06-01 00:00:00", "until": "2025-07-01 00:00:00"},
+    {"transaction_type": "deposit"},
+])
+def test_history_searches_company_created_index(conn, filters):
+    sql, params = main.transaction_list_query(1, 50, **filters)
+    plan = query_plan(conn, sql, params)
+    assert plan[0].startswith("SEARCH transactions USING INDEX idx_transactions_company_created (company_id=?")
+    assert not any("TEMP B-TREE" in step for step in plan)
+
+
+def test_history_cursor_page_is_an_index_range(conn):
+    sql, params = main.transaction_list_query(1, 50, page_cursor=("2025-06-27 13:00:00", 500))
+    plan = query_plan(conn, sql, params)
+    assert plan == [
+        "SEARCH transactions USING INDEX idx_transactions_company_created (company_id=? AND created_at<?)"
+    ]
+
+
+def test_new_transactions_search_company_id_index(conn):
+    sql, params = main.transaction_list_query(1, 50, since_id=500)
+    plan = query_plan(conn, sql, params)
+    assert plan == ["SEARCH transactions USING INDEX idx_transactions_company_id (company_id=? AND id>?)"]
+
+
+def test_export_searches_business_date_index(conn):
+    sql, params = main.export_query("2025-06-01", "2025-06-30")
+    plan = query_plan(conn, sql, params)
+    assert plan == [
+        "SEARCH transactions USING INDEX idx_transactions_business_date (business_date>? AND business_date<?)"
+    ]
+
+
+def test_company_export_streams_in_index_order(conn):
+    sql, params = main.export_query("2025-06-01", "2025-06-30", company_id=1)
+    plan = query_plan(conn, sql, params)
+    assert plan == [
+        "SEARCH transactions USING INDEX idx_transactions_business_date (business_date>? AND business_date<?)"
+    ]
@@ -0,0 +1,70 @@
+"""웹훅 수신 제한 (API 키별 토큰 버킷, 일괄 수신은 항목 수만큼 차감, 동시 처리 상한 초과 시 503)"""
+
+import asyncio
+
+import main
+
+MESSAGE = "[Web발신]\n농협 입금{amount:,}원\n06/27 13:00 302-****-5080-61 홍길동 잔액1,000,000원"
+
+
+def item(amount):
+    return {"date": f"limit {amount}", "message": MESSAGE.format(amount=amount)}
+
+
+def test_token_bucket_refills_and_evicts_idle_keys(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(main.time, "monotonic", lambda: now[0])
+    limiter = main.TokenBucketLimiter(rate=2, burst=3, idle_seconds=10)
+    
+    assert [limiter.acquire("a") for _ in range(4)] == [0, 0, 0, 0.5]
+    assert limiter.acquire("b") == 0
+    now[0] += 0.5
+    assert limiter.acquire("a") == 0
+    now[0] += 10
+    limiter.acquire("c")
+    assert len(limiter) == 1
+
+
+def test_key_limit_returns_429_and_batch_is_charged_per_item(client, create_company, monkeypatch):
+    monkeypatch.setattr(main.webhook_key_limiter, "rate", 0.01)
+    monkeypatch.setattr(main.webhook_key_limiter, "burst", 3.0)
+    api_key = create_company("rate_limit_test")["api_key"]
+    other_key = create_company("rate_limit_other_test")["api_key"]
+    
+    assert client.post(f"/api/webhook/{api_key}/batch", json=[item(1000), item(2000), item(3000)]).json()["inserted"] == 3
+    limited = client.post(f"/api/webhook/{api_key}", json=item(4000))
+    assert limited.status_code == 429
+    assert limited.json()["reason"] == "key_rate_limited"
+    assert int(limited.headers["Retry-After"]) >= 1
+    assert client.post(f"/api/webhook/{other_key}", json=item(4000)).json()["status"] == "success"
+
+
+def test_in_flight_cap_rejects_with_503():
+    release = asyncio.Event()
+    
+    async def slow_app(scope, receive, send):
+        await release.wait()
+    
+    async def call(middleware, path):
+        sent = []
+        scope = {"type": "http", "method": "POST", "path": path, "client": ("10.0.0.1", 1234), "headers": []}
+        
+        async def send(message):
+            sent.append(message)
+        await middleware(scope, None, send)
+        return sent[0]["status"] if sent else None
+    
+    async def scenario():
+        limiter = main.TokenBucketLimiter(rate=0, burst=1)
+        middleware = main.WebhookAdmissionMiddleware(slow_app, limiter, limiter, max_in_flight=1)
+        first = asyncio.create_task(call(middleware, "/api/webhook/key"))
+        await asyncio.sleep(0)
+        rejected = await call(middleware, "/api/webhook/key/batch")
+        # 웹훅이 아닌 요청은 상한과 무관하게 통과 (앱이 응답하지 않으므로 None)
+        other_route = asyncio.create_task(call(middleware, "/api/admin/dashboard"))
+        await asyncio.sleep(0)
+        release.set()
+        await first
+        return rejected, await other_route, middleware.in_flight
+    
+    assert asyncio.run(scenario()) == (503, None, 0)
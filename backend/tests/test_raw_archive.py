@@ -0,0 +1,37 @@
+"""원문 보관 파일 조회 (요청 ID가 든 멤버만 읽고 월 전체를 메모리에 올리지 않음)"""
+
+import gzip
+import json
+import os
+
+import main
+
+
+def test_load_reads_only_members_with_requested_ids(tmp_path):
+    archive = main.RawMessageArchive(str(tmp_path))
+    archive.append("2025-05", [(1, "a"), (2, "b")])
+    archive.append("2025-05", [(10, "c"), (11, "d")])
+    
+    assert archive.load("2025-05", {11}) == {11: "d"}
+    assert archive.cache.stats()["size"] == 1
+    assert archive.load("2025-05", {1, 10, 99}) == {1: "a", 10: "c"}
+    assert archive.load("2025-06", {1}) == {}
+
+
+def test_load_prefers_last_record(tmp_path):
+    archive = main.RawMessageArchive(str(tmp_path))
+    archive.append("2025-05", [(1, "old"), (2, "b")])
+    archive.append("2025-05", [(1, "new")])  # 중단 후 재실행으로 다시 기록된 경우
+    
+    assert archive.load("2025-05", {1, 2}) == {1: "new", 2: "b"}
+
+
+def test_load_scans_file_without_index(tmp_path):
+    archive = main.RawMessageArchive(str(tmp_path))
+    archive.append("2025-05", [(1, "old"), (2, "b")])
+    archive.append("2025-05", [(1, "new")])
+    os.remove(archive.index_path("2025-05"))
+    
+    assert archive.load("2025-05", {1}) == {1: "new"}
+    with gzip.open(archive.path("2025-05"), "rt", encoding="utf-8") as f:
+        assert [json.loads(line)["id"] for line in f] == [1, 2, 1]
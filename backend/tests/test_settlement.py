@@ -0,0 +1,51 @@
+"""정수 원 단위 정산 (ppm 수수료율로 절사, 열 단위 일괄 정산과 저장값 대조)"""
+
+import main
+
+MESSAGE = "[Web발신]\n농협 {kind}{amount:,}원\n06/27 13:00 302-****-5080-61 홍길동 잔액1,000,000원"
+
+
+def test_fee_uses_integer_rate_without_float_error():
+    assert main.fee_rate_ppm(0.0029) == 2900
+    assert int(10000 * 0.0029) == 28  # 실수 계산은 1원 모자람
+    assert main.calculate_fee(10000, main.fee_rate_ppm(0.0029)) == 29
+    assert main.calculate_fee(12345, main.fee_rate_ppm(0.035)) == 432
+
+
+def test_settle_columns_matches_row_by_row_fees():
+    company_ids = [1, 1, 1, 2, 2]
+    types = ["deposit", "withdrawal", "deposit", "deposit", "deposit"]
+    amounts = [12345, 5000, 999, 10000, 1]
+    rates = [35000, 35000, 35000, 2900, 2900]
+    
+    fees, totals = main.settle_columns(company_ids, types, amounts, rates)
+    assert fees == [432, 0, 34, 29, 0]
+    assert totals == {
+        1: {"deposits": 13344, "withdrawals": 5000, "fees": 466, "transaction_count": 3},
+        2: {"deposits": 10001, "withdrawals": 0, "fees": 29, "transaction_count": 2},
+    }
+
+
+def test_settle_business_day_flags_changed_fee(client, create_company):
+    company = create_company("settlement_test", fee_rate=0.035)
+    ids = []
+    for i, (kind, amount) in enumerate([("입금", 12345), ("출금", 5000), ("입금", 999)]):
+        response = client.post(f"/api/webhook/{company['api_key']}", json={
+            "date": f"settle {i}", "message": MESSAGE.format(kind=kind, amount=amount)
+        })
+        ids.append(response.json()["transaction_id"])
+    business_date = main.business_date_today()
+    
+    with main.get_db() as conn:
+        result = main.settle_business_day(conn, business_date)
+        assert result["companies"][company["id"]] == {"deposits": 13344, "withdrawals": 5000, "fees": 466, "transaction_count": 3}
+        assert company["id"] not in result["stats_mismatches"]
+        assert not [item for item in result["fee_mismatches"] if item["company_id"] == company["id"]]
+        
+        conn.execute("UPDATE transactions SET fee_amount = 400 WHERE id = ?", (ids[0],))
+        conn.commit()
+        result = main.settle_business_day(conn, business_date)
+    
+    assert [item for item in result["fee_mismatches"] if item["company_id"] == company["id"]] == \
+        [{"id": ids[0], "company_id": company["id"], "expected": 432, "stored": 400}]
+    assert company["id"] in result["stats_mismatches"]
@@ -0,0 +1,71 @@
+"""느린 연결 정책 (coalesce는 대시보드 상태를 병합, drop_oldest는 오래된 메시지 폐기, disconnect는 연결 제거)"""
+
+import asyncio
+import json
+
+import main
+
+
+class StalledWebSocket:
+    """수락 후 아무것도 받지 못하는 클라이언트 (송신이 끝나지 않음)"""
+    
+    async def accept(self):
+        pass
+    
+    async def send_text(self, text):
+        await asyncio.Event().wait()
+    
+    async def close(self, code=1000):
+        pass
+
+
+def delta(company_id, deposits):
+    return {"type": "stats_delta", "data": {"business_date": "2025-06-27", "companies": [
+        {"id": company_id, "today_deposits": deposits}
+    ]}}
+
+
+def queued(connection):
+    return [item.message if isinstance(item, main.PendingState) else item for item in connection.pending]
+
+
+def run_with_queue(policy, max_size, fill):
+    async def scenario():
+        connection = main.ConnectionQueue(StalledWebSocket(), max_size, policy, on_dead=lambda dead: None)
+        fill(connection)
+        connection.close()
+        return connection
+    return asyncio.run(scenario())
+
+
+def test_drop_oldest_keeps_latest_messages():
+    connection = run_with_queue("drop_oldest", 2, lambda queue: [queue.put(text) for text in "abc"])
+    assert (queued(connection), connection.dropped) == (["b", "c"], 1)
+
+
+def test_coalesce_merges_pending_deltas_and_keeps_them_when_full():
+    def fill(queue):
+        for company_id, deposits in [(1, 100), (2, 50), (1, 300)]:
+            message = delta(company_id, deposits)
+            queue.put_state("stats_delta", message, json.dumps(message))
+        for text in "abc":
+            queue.put(text)
+    
+    connection = run_with_queue("coalesce", 3, fill)
+    [state, *messages] = queued(connection)
+    assert state["data"]["companies"] == [{"id": 1, "today_deposits": 300}, {"id": 2, "today_deposits": 50}]
+    assert messages == ["b", "c"]
+    assert (connection.coalesced, connection.dropped) == (2, 1)
+
+
+def test_disconnect_policy_drops_slow_connection():
+    async def scenario():
+        manager = main.WebSocketManager(queue_size=2, policy="disconnect")
+        await manager.connect(StalledWebSocket(), "company_1")
+        for i in range(3):
+            manager.deliver_local("company_1", json.dumps({"type": "new_transaction", "data": {"id": i}}))
+        return manager
+    
+    manager = asyncio.run(scenario())
+    assert "company_1" not in manager.active_connections
+    assert manager.sequences["company_1"] == 3
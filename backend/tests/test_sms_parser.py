@@ -0,0 +1,54 @@
+"""은행별 템플릿 파싱 (은행 판별과 필드 추출을 한 번의 검색으로)"""
+
+import pytest
+
+import main
+
+# 은행별 실제 형식 예시 (BANK_TEMPLATES의 모든 은행)
+SAMPLES = {
+    bank: (f"[Web발신]\n{bank} 입금50,000원\n06/27 13:00 110-***-123456 홍길동 잔액1,050,000원",
+           ("deposit", bank, 50000, 1050000, "홍길동", "110-***-123456"))
+    for bank in main.BANK_TEMPLATES
+}
+SAMPLES["농협"] = ("[Web발신]\n농협 출금700,000원\n06/27 13:00 302-****-5080-61 신주일 잔액307,006원",
+                 ("withdrawal", "농협", 700000, 307006, "신주일", "302-****-5080-61"))
+SAMPLES["카카오뱅크"] = ("[Web발신]\n카카오뱅크 입금3,000,000원\n06/28 10:30 333-**-**1234 PARK JIMIN 잔액3,120,500원",
+                    ("deposit", "카카오뱅크", 3000000, 3120500, "PARK JIMIN", "333-**-**1234"))
+SAMPLES["토스뱅크"] = ("[Web발신]\n토스뱅크 입금 15,000원 잔액 215,000원",
+                   ("deposit", "토스뱅크", 15000, 215000, None, None))
+
+
+def fields(parsed):
+    return (parsed.transaction_type, parsed.bank_name, parsed.amount, parsed.balance,
+            parsed.sender_name, parsed.account_number)
+
+
+@pytest.mark.parametrize("bank", sorted(main.BANK_TEMPLATES))
+def test_bank_template(bank):
+    message, expected = SAMPLES[bank]
+    parsed = main.SMSParser.parse_message(message)
+    
+    assert main.SMSParser.bank_template_pattern.search(message) is not None
+    assert parsed.parsed
+    assert fields(parsed) == expected
+
+
+def test_message_without_template_falls_back_to_fields():
+    message = "[Web발신]\n[우리] 입금1,000원 302-1234 홍길동"
+    parsed = main.SMSParser.parse_message(message)
+    
+    assert main.SMSParser.bank_template_pattern.search(message) is None
+    assert (parsed.bank_name, parsed.transaction_type, parsed.amount, parsed.balance) == ("우리", "deposit", 1000, None)
+
+
+def test_register_bank_template_replaces_only_that_bank(monkeypatch):
+    for attribute in ("bank_templates", "bank_template_pattern", "bank_template_groups"):
+        monkeypatch.setattr(main.SMSParser, attribute, getattr(main.SMSParser, attribute))
+    main.SMSParser.register_bank_template("하나", r"(?P<name>\S+)님 (?P<amount>[\d,]+)원 (?P<type>입금|출금)")
+    
+    parsed = main.SMSParser.parse_message("하나 홍길동님 20,000원 출금")
+    assert fields(parsed) == ("withdrawal", "하나", 20000, None, "홍길동", None)
+    assert fields(main.SMSParser.parse_message(SAMPLES["신한"][0])) == SAMPLES["신한"][1]
+    
+    with pytest.raises(ValueError):
+        main.SMSParser.register_bank_template("하나", r"(?P<amount>[\d,]+)원")
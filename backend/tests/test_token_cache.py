@@ -0,0 +1,51 @@
+"""JWT 클레임 캐시 (적중 시 서명 검증 생략, 만료된 토큰은 캐시에 남지 않음, 만료 시 WebSocket 1008 종료)"""
+
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from starlette.websockets import WebSocketDisconnect
+
+import main
+
+
+def token_for(exp, **claims):
+    return jwt.encode({"user_id": 1, "role": "admin", "exp": exp, **claims}, main.JWT_SECRET, algorithm="HS256")
+
+
+def test_verified_claims_are_cached(monkeypatch):
+    decoded = []
+    decode = jwt.decode
+    
+    def counting_decode(*args, **kwargs):
+        decoded.append(args[0])
+        return decode(*args, **kwargs)
+    
+    monkeypatch.setattr(main.jwt, "decode", counting_decode)
+    token = token_for(int(time.time()) + 60, username="cache_test")
+    
+    assert main.verify_token(token)["username"] == "cache_test"
+    assert main.verify_token(token)["username"] == "cache_test"
+    assert len(decoded) == 1
+
+
+def test_expired_cached_claims_are_verified_again_and_evicted():
+    token = token_for(int(time.time()) - 1)
+    main.token_claims_cache.put(token, {"user_id": 1, "role": "admin", "exp": time.time() - 1})
+    
+    with pytest.raises(HTTPException) as rejected:
+        main.verify_token(token)
+    assert rejected.value.status_code == 401
+    assert main.token_claims_cache.get(token) is None
+
+
+def test_company_channel_closes_when_token_expires(client, create_company):
+    company_id = create_company("token_expiry_test")["id"]
+    token = token_for(int(time.time()) + 2, role="company", company_id=company_id)
+    
+    with client.websocket_connect(f"/ws/company/{company_id}?token={token}") as websocket:
+        assert websocket.receive_json()["type"] == "snapshot"
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_text()
+    assert closed.value.code == 1008
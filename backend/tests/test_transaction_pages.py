@@ -0,0 +1,52 @@
+"""업체별 거래 내역 페이지 (커서로 빠짐없이 이어지고, since_id는 새 거래만 오래된 순)"""
+
+import pytest
+
+MESSAGE = "[Web발신]\n농협 {kind}{amount:,}원\n06/27 13:00 302-****-5080-61 홍길동 잔액1,000,000원"
+
+
+@pytest.fixture(scope="module")
+def company(client, create_company):
+    company = create_company("pages_test")
+    company["ids"] = [
+        client.post(f"/api/webhook/{company['api_key']}", json={
+            "date": f"page {i}", "message": MESSAGE.format(kind="출금" if i % 3 == 2 else "입금", amount=1000 + i)
+        }).json()["transaction_id"]
+        for i in range(7)
+    ]
+    return company
+
+
+def test_cursor_pages_cover_every_transaction_newest_first(client, admin_headers, company):
+    url = f"/api/companies/{company['id']}/transactions"
+    pages, params = [], {"limit": 3}
+    while True:
+        page = client.get(url, headers=admin_headers, params=params).json()
+        pages.append([tx["id"] for tx in page["transactions"]])
+        if not page["has_more"]:
+            assert page["next_cursor"] is None
+            break
+        params = {"limit": 3, "cursor": page["next_cursor"]}
+    
+    assert [len(ids) for ids in pages] == [3, 3, 1]
+    assert sum(pages, []) == company["ids"][::-1]
+
+
+def test_filters_and_since_id(client, admin_headers, company):
+    url = f"/api/companies/{company['id']}/transactions"
+    withdrawals = client.get(url, headers=admin_headers, params={"type": "withdrawal"}).json()["transactions"]
+    assert [tx["id"] for tx in withdrawals] == [company["ids"][5], company["ids"][2]]
+    
+    newer = client.get(url, headers=admin_headers, params={"since_id": company["ids"][3]}).json()
+    assert [tx["id"] for tx in newer["transactions"]] == company["ids"][4:]
+    assert newer["next_cursor"] is None
+
+
+def test_invalid_cursor_and_other_company_are_rejected(client, admin_headers, company):
+    url = f"/api/companies/{company['id']}/transactions"
+    assert client.get(url, headers=admin_headers, params={"cursor": "어제|1"}).status_code == 400
+    
+    # 업체 계정은 자기 거래만 조회
+    token = client.post("/api/auth/login", json={"username": "pages_test", "password": "pw"}).json()["access_token"]
+    response = client.get(f"/api/companies/{company['id'] + 1000}/transactions", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
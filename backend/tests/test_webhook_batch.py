@@ -0,0 +1,37 @@
+"""일괄 웹훅 수신 (항목별 결과와 배치 내/재전송 중복, 최대 건수 초과 시 413)"""
+
+import main
+
+MESSAGE = "[Web발신]\n농협 입금{amount:,}원\n06/27 13:00 302-****-5080-61 홍길동 잔액1,000,000원"
+
+
+def item(amount, date="2025-06-27 13:00"):
+    return {"date": date, "from": "1588-2100", "message": MESSAGE.format(amount=amount)}
+
+
+def test_batch_reports_result_per_item(client, create_company):
+    api_key = create_company("batch_test")["api_key"]
+    items = [item(10000), item(10000), {"date": "2025-06-27 13:01", "message": "광고 문자입니다"}, item(20000)]
+    
+    response = client.post(f"/api/webhook/{api_key}/batch", json=items).json()
+    results = response["results"]
+    assert (response["received"], response["inserted"], response["duplicates"], response["failed"]) == (4, 2, 1, 1)
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert [result["status"] for result in results] == ["success", "duplicate", "failed", "success"]
+    assert results[1]["transaction_id"] == results[0]["transaction_id"]
+    assert results[2]["reason"] == "parsing_failed"
+    
+    # 같은 배치를 다시 보내면 저장된 거래를 가리키는 중복
+    resent = client.post(f"/api/webhook/{api_key}/batch", json=items).json()
+    assert resent["inserted"] == 0
+    assert [result.get("transaction_id") for result in resent["results"]] == \
+        [results[0]["transaction_id"], results[0]["transaction_id"], None, results[3]["transaction_id"]]
+
+
+def test_batch_over_max_size_is_rejected(client, create_company, monkeypatch):
+    api_key = create_company("batch_limit_test")["api_key"]
+    monkeypatch.setattr(main, "WEBHOOK_MAX_BATCH_SIZE", 2)
+    
+    response = client.post(f"/api/webhook/{api_key}/batch", json=[item(1000), item(2000), item(3000)])
+    assert response.status_code == 413
+    assert client.post(f"/api/webhook/{api_key}/batch", json=[item(1000), item(2000)]).json()["inserted"] == 2
@@ -0,0 +1,33 @@
+"""웹훅 중복 판별 키 (같은 문자의 재전송만 중복으로 처리)"""
+
+import pytest
+
+import main
+
+MESSAGE = "[Web발신]\n농협 입금50,000원\n06/27 13:00 302-****-5080-61 홍길동 잔액1,050,000원"
+
+
+@pytest.fixture(scope="module")
+def api_key(client):
+    token = client.post("/api/auth/login", json={"username": "fjrzl7979", "password": "79797979"}).json()["access_token"]
+    response = client.post("/api/admin/companies", headers={"Authorization": f"Bearer {token}"}, json={
+        "company_name": "중복테스트", "login_id": "dedup_test", "password": "pw", "bank_name": "농협",
+        "account_number": "302-0000-5080-61", "account_holder": "홍길동", "fee_rate": 0.03
+    })
+    return response.json()["api_key"]
+
+
+def test_from_field_uses_json_alias():
+    data = main.SMSWebhookData.model_validate({"date": "d", "from": "010-1234-5678", "message": "m"})
+    assert data.from_ == "010-1234-5678"
+
+
+def test_sender_is_part_of_dedup_key(client, api_key):
+    first = client.post(f"/api/webhook/{api_key}", json={"date": "2025-06-27 13:00", "from": "1588-2100", "message": MESSAGE})
+    other_sender = client.post(f"/api/webhook/{api_key}", json={"date": "2025-06-27 13:00", "from": "1588-9999", "message": MESSAGE})
+    resent = client.post(f"/api/webhook/{api_key}", json={"date": "2025-06-27 13:00", "from": "1588-2100", "message": MESSAGE})
+    
+    assert first.json()["status"] == "success"
+    assert other_sender.json()["status"] == "success"
+    assert other_sender.json()["transaction_id"] != first.json()["transaction_id"]
+    assert resent.json() == {"status": "duplicate", "transaction_id": first.json()["transaction_id"]}
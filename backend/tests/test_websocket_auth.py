@@ -0,0 +1,31 @@
+"""WebSocket 구독 거절(1008 인증, 1013 채널 상한)은 핸드셰이크 수락 후 종료 코드로 전달 (브라우저가 재연결 여부를 판단)"""
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+import main
+
+
+def close_code(client, url) -> int:
+    # 수락 전에 닫으면 websocket_connect 자체가 실패하므로 with 안에서만 종료를 받아야 함
+    with client.websocket_connect(url) as websocket:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_text()
+    return closed.value.code
+
+
+def test_invalid_token_closes_with_policy_violation(client):
+    assert close_code(client, "/ws/admin?token=invalid") == 1008
+
+
+def test_company_token_cannot_join_other_company(client):
+    token = main.create_jwt_token({"user_id": 1, "username": "a1", "role": "company", "company_id": 1})
+    assert close_code(client, f"/ws/company/2?token={token}") == 1008
+
+
+def test_full_channel_closes_with_try_again_later(client, monkeypatch):
+    monkeypatch.setattr(main.manager, "max_per_channel", 1)
+    token = client.post("/api/auth/login", json={"username": "fjrzl7979", "password": "79797979"}).json()["access_token"]
+    with client.websocket_connect(f"/ws/admin?token={token}") as first:
+        assert first.receive_json()["type"] == "snapshot"
+        assert close_code(client, f"/ws/admin?token={token}") == 1013
@@ -0,0 +1,72 @@
+"""하트비트 정리 (송신 큐가 가득 찬 연결 제거, 이미 닫은 소켓은 다시 닫지 않음)"""
+
+import asyncio
+import time
+
+from starlette.websockets import WebSocketState
+
+import main
+
+
+class StalledWebSocket:
+    """수락 후 아무것도 보내거나 받지 못하는 클라이언트"""
+    
+    def __init__(self):
+        self.application_state = WebSocketState.CONNECTING
+        self.query_params = {}
+        self.closed = []
+    
+    async def accept(self):
+        self.application_state = WebSocketState.CONNECTED
+    
+    async def send_text(self, text):
+        await asyncio.Event().wait()
+    
+    async def receive_text(self):
+        await asyncio.Event().wait()
+    
+    async def close(self, code=1000):
+        if self.application_state != WebSocketState.CONNECTED:
+            raise RuntimeError("이미 닫힌 소켓")
+        self.application_state = WebSocketState.DISCONNECTED
+        self.closed.append(code)
+
+
+def test_heartbeat_drops_connection_with_full_queue():
+    async def scenario():
+        manager = main.WebSocketManager(queue_size=1, policy="disconnect", heartbeat_interval=0.01)
+        websocket = StalledWebSocket()
+        await manager.connect(websocket, "admin")
+        await manager.start()
+        try:
+            for _ in range(100):
+                if "admin" not in manager.active_connections:
+                    break
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0)
+        finally:
+            await manager.stop()
+        return manager, websocket
+    
+    manager, websocket = asyncio.run(scenario())
+    assert manager.active_connections == {}
+    assert websocket.closed == [1000]
+
+
+def test_token_expiry_after_heartbeat_close_does_not_close_again(monkeypatch):
+    manager = main.WebSocketManager()
+    monkeypatch.setattr(main, "manager", manager)
+    
+    async def scenario():
+        websocket = StalledWebSocket()
+        served = asyncio.create_task(main.serve_websocket(websocket, "admin", {"exp": time.time() + 0.2}))
+        await asyncio.sleep(0.05)
+        # 하트비트 제한 시간 초과로 정리된 경우
+        [connection] = manager.active_connections["admin"]
+        manager._drop(connection, "admin")
+        await served
+        return websocket
+    
+    websocket = asyncio.run(scenario())
+    assert websocket.closed == [1000]
+    assert manager.active_connections == {}
@@ -0,0 +1,50 @@
+"""재연결 이어받기 (last_seq 이후 누락분 재전송, 버퍼를 벗어났거나 다른 프로세스 순번이면 스냅샷)"""
+
+import asyncio
+import json
+
+import main
+
+
+class IdleWebSocket:
+    async def accept(self):
+        pass
+    
+    async def send_text(self, text):
+        await asyncio.Event().wait()
+
+
+def reconnect(last_seq, epoch=None, replay_size=3):
+    """company_1 채널에 거래 알림 5건 후 재연결해 송신 대기 메시지 반환"""
+    async def scenario():
+        manager = main.WebSocketManager(replay_size=replay_size)
+        for i in range(1, 6):
+            manager.deliver_local("company_1", json.dumps({"type": "new_transaction", "data": {"id": i}}))
+        connection = await manager.connect(IdleWebSocket(), "company_1", last_seq, epoch or manager.epoch)
+        connection.close()
+        return [
+            json.loads(item.text) if isinstance(item, main.PendingState) else json.loads(item)
+            for item in connection.pending
+        ]
+    return asyncio.run(scenario())
+
+
+def test_resume_replays_missed_messages_then_current_state():
+    messages = reconnect(last_seq=3)
+    assert [(message["type"], message.get("seq")) for message in messages] == \
+        [("new_transaction", 4), ("new_transaction", 5), ("stats_delta", None)]
+    assert [message["data"]["id"] for message in messages[:2]] == [4, 5]
+
+
+def test_resume_outside_buffer_or_other_epoch_gets_snapshot():
+    for messages in (reconnect(last_seq=1), reconnect(last_seq=3, epoch="other"), reconnect(last_seq=9)):
+        [snapshot] = messages
+        assert (snapshot["type"], snapshot["seq"], snapshot["reason"]) == ("snapshot", 5, "too_old")
+
+
+def test_resync_request_sends_snapshot(client, admin_headers):
+    token = admin_headers["Authorization"].split()[1]
+    with client.websocket_connect(f"/ws/admin?token={token}") as websocket:
+        assert websocket.receive_json()["reason"] == "connect"
+        websocket.send_json({"type": "resync"})
+        assert websocket.receive_json()["reason"] == "resync"
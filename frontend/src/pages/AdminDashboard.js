@@ -20,18 +20,29 @@ const AdminDashboard = () => {
       return response.data;
     },
     {
-      refetchInterval: 30000, // 30초마다 자동 갱신
-      refetchOnWindowFocus: true,
+      // 최초 1회만 조회, 이후에는 WebSocket 스냅샷/변경분으로 갱신
+      refetchOnWindowFocus: false,
     }
   );
 
-  // WebSocket 메시지 수신 시 데이터 갱신
+  // WebSocket 스냅샷/변경분을 캐시에 반영 (폴링 없음)
   useEffect(() => {
     const handleSocketMessage = (event) => {
       const data = event.detail;
-      if (data.type === 'new_transaction' || data.type === 'company_created') {
-        // 실시간 데이터 갱신
-        queryClient.invalidateQueries('adminDashboard');
+      if (data.type === 'snapshot') {
+        queryClient.setQueryData('adminDashboard', data.data);
+      } else if (data.type === 'stats_delta') {
+        queryClient.setQueryData('adminDashboard', (current) => {
+          const companies = new Map((current?.companies || []).map(company => [company.id, company]));
+          data.data.companies.forEach(row => {
+            companies.set(row.id, { ...companies.get(row.id), ...row });
+          });
+          return {
+            ...current,
+            summary: data.data.summary,
+            companies: [...companies.values()].sort((a, b) => b.today_deposits - a.today_deposits)
+          };
+        });
       }
     };
 
@@ -10,28 +10,62 @@ const CompanyDashboard = () => {
   const { isConnected } = useSocket();
   const queryClient = useQueryClient();
 
-  // 업체 거래내역 가져오기
+  // 업체 거래내역 가져오기 (최초 1회 전체, 이후에는 마지막 ID 이후의 새 거래만)
   const { data: transactionData, isLoading } = useQuery(
     ['companyTransactions', user?.company_id],
     async () => {
       if (!user?.company_id) return { transactions: [] };
-      const response = await axios.get(`/api/companies/${user.company_id}/transactions`);
-      return response.data;
+      const url = `/api/companies/${user.company_id}/transactions`;
+      const cached = queryClient.getQueryData(['companyTransactions', user.company_id]);
+      const cachedTransactions = cached?.transactions || [];
+
+      if (cachedTransactions.length === 0) {
+        const response = await axios.get(url);
+        return response.data;
+      }
+
+      const latestId = Math.max(...cachedTransactions.map(tx => tx.id));
+      const response = await axios.get(url, { params: { since_id: latestId, limit: 500 } });
+      if (response.data.has_more) {
+        // 누락 구간이 너무 크면 전체 다시 조회
+        const full = await axios.get(url);
+        return full.data;
+      }
+
+      // since_id 응답은 오래된 순이므로 뒤집어서 앞에 추가
+      const newTransactions = [...response.data.transactions].reverse();
+      return {
+        ...cached,
+        transactions: [...newTransactions, ...cachedTransactions].slice(0, 100)
+      };
     },
     {
-      refetchInterval: 10000, // 10초마다 자동 갱신
-      refetchOnWindowFocus: true,
+      // 폴링 없음: 새 거래는 WebSocket으로 받고, 재연결/재동기화 시에만 since_id로 보충
+      refetchOnWindowFocus: false,
       enabled: !!user?.company_id
     }
   );
 
+  // 서버가 보내는 오늘 누적 통계 (snapshot / stats_delta)
+  const [liveStats, setLiveStats] = useState(null);
+
   // WebSocket 메시지 수신 시 데이터 갱신
   useEffect(() => {
+    const queryKey = ['companyTransactions', user?.company_id];
     const handleSocketMessage = (event) => {
       const data = event.detail;
-      if (data.type === 'new_transaction') {
-        // 실시간 데이터 갱신
-        queryClient.invalidateQueries(['companyTransactions', user?.company_id]);
+      if (data.type === 'snapshot' || data.type === 'stats_delta') {
+        if (data.data.company) setLiveStats(data.data.company);
+        // 스냅샷은 (재)연결 또는 누락 후 재동기화 → 그 사이 거래 보충
+        if (data.type === 'snapshot') queryClient.invalidateQueries(queryKey);
+      } else if (data.type === 'new_transaction' || data.type === 'new_transactions') {
+        const incoming = data.type === 'new_transaction' ? [data.data] : [...data.data].reverse();
+        queryClient.setQueryData(queryKey, (current) => {
+          const existing = current?.transactions || [];
+          const known = new Set(existing.map(tx => tx.id));
+          const fresh = incoming.filter(tx => !known.has(tx.id));
+          return { ...current, transactions: [...fresh, ...existing].slice(0, 100) };
+        });
       }
     };
 
@@ -83,7 +117,15 @@ const CompanyDashboard = () => {
   };
 
   const transactions = transactionData?.transactions || [];
-  const todayStats = calculateTodayStats(transactions);
+  const todayStats = liveStats
+    ? {
+        totalDeposits: liveStats.today_deposits,
+        totalWithdrawals: liveStats.today_withdrawals,
+        totalFees: liveStats.today_fees,
+        netAmount: liveStats.today_deposits - liveStats.today_withdrawals,
+        transactionCount: liveStats.today_transactions
+      }
+    : calculateTodayStats(transactions);
 
   if (isLoading) {
     return (
@@ -285,7 +327,7 @@ const CompanyDashboard = () => {
                         {formatCurrency(transaction.fee_amount)}원
                       </td>
                       <td className="px-6 py-4 whitespace-nowrap text-sm text-right text-gray-900 font-medium">
-                        {formatCurrency(transaction.balance)}원
+                        {transaction.balance == null ? '-' : `${formatCurrency(transaction.balance)}원`}
                       </td>
                       <td className="px-6 py-4 whitespace-nowrap text-center">
                         {transaction.is_rolling ? (
@@ -34,25 +34,45 @@ export const SocketProvider = ({ children }) => {
       ? 'wss://your-backend.railway.app' 
       : 'ws://localhost:8000';
     
+    // 브라우저 WebSocket은 헤더를 지정할 수 없어 토큰을 쿼리로 전달
+    const token = encodeURIComponent(localStorage.getItem('authToken') || '');
+    
     let wsUrl;
     if (user.role === 'admin') {
-      wsUrl = `${baseURL}/ws/admin`;
+      wsUrl = `${baseURL}/ws/admin?token=${token}`;
     } else if (user.role === 'company') {
-      wsUrl = `${baseURL}/ws/company/${user.company_id}`;
+      wsUrl = `${baseURL}/ws/company/${user.company_id}?token=${token}`;
     }
 
-    if (wsUrl) {
-      const ws = new WebSocket(wsUrl);
+    // 채널 순번 (snapshot 이후 seq가 1씩 증가, 건너뛰면 resync 요청)
+    // 재연결 시 last_seq/epoch를 보내 끊긴 동안의 메시지만 이어받음
+    let lastSeq = null;
+    let epoch = null;
+    let ws = null;
+    let reconnectTimer = null;
+    let retryDelay = 1000;
+    let closedByUser = false;
+
+    const connect = () => {
+      const resume = lastSeq !== null && epoch
+        ? `&last_seq=${lastSeq}&epoch=${epoch}`
+        : '';
+      ws = new WebSocket(wsUrl + resume);
       
       ws.onopen = () => {
         console.log('✅ WebSocket 연결됨:', user.role);
         setIsConnected(true);
+        retryDelay = 1000;
         toast.success('실시간 연결 활성화됨');
       };
 
-      ws.onclose = () => {
+      ws.onclose = (event) => {
         console.log('❌ WebSocket 연결 끊김');
         setIsConnected(false);
+        // 인증 실패/토큰 만료(1008)는 재연결하지 않음
+        if (closedByUser || event.code === 1008) return;
+        reconnectTimer = setTimeout(connect, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, 30000);
       };
 
       ws.onerror = (error) => {
@@ -63,6 +83,24 @@ export const SocketProvider = ({ children }) => {
       ws.onmessage = (event) => {
         try {
           const data = JSON.parse(event.data);
+          // 서버 heartbeat에 응답 (응답이 없으면 서버가 연결을 정리)
+          if (data.type === 'ping') {
+            ws.send(JSON.stringify({ type: 'pong' }));
+            return;
+          }
+          if (data.type === 'snapshot') {
+            lastSeq = data.seq;
+            epoch = data.epoch;
+          } else if (data.seq !== undefined) {
+            if (lastSeq !== null && data.seq !== lastSeq + 1) {
+              // 누락 구간 발생 → 스냅샷 재요청 (스냅샷 수신 전 메시지는 무시)
+              lastSeq = null;
+              ws.send(JSON.stringify({ type: 'resync' }));
+              return;
+            }
+            if (lastSeq === null) return;
+            lastSeq = data.seq;
+          }
           handleSocketMessage(data);
         } catch (error) {
           console.error('메시지 파싱 오류:', error);
@@ -70,12 +108,18 @@ export const SocketProvider = ({ children }) => {
       };
 
       setSocket(ws);
+    };
+
+    if (wsUrl) {
+      connect();
     }
 
     // 정리
     return () => {
-      if (socket) {
-        socket.close();
+      closedByUser = true;
+      clearTimeout(reconnectTimer);
+      if (ws) {
+        ws.close();
       }
     };
   }, [user]);
@@ -98,6 +142,29 @@ export const SocketProvider = ({ children }) => {
         );
         break;
         
+      case 'new_transactions': {
+        // 일괄 수신 알림 (배치 웹훅)
+        const total = data.data.reduce((sum, item) => sum + (item.amount || 0), 0);
+        playNotificationSound();
+        toast.success(
+          `💰 거래 ${data.data.length}건 수신 (합계 ${new Intl.NumberFormat('ko-KR').format(total)}원)`,
+          { duration: 6000 }
+        );
+        break;
+      }
+        
+      case 'balance_flags':
+        // 잔액 연쇄 불일치 (누락/중복 문자 의심)
+        toast.error(`⚠️ 잔액 불일치 ${data.data.length}건 감지 (${data.data[0].bank_name} ${data.data[0].account_number})`, {
+          duration: 10000
+        });
+        break;
+        
+      case 'snapshot':
+      case 'stats_delta':
+        // 대시보드 상태 (각 페이지에서 socketMessage 이벤트로 반영)
+        break;
+        
       case 'company_created':
         // 업체 생성 알림
         toast.success(`🏢 새 업체 생성됨: ${data.data.company_name}`);